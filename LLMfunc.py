@@ -1,9 +1,317 @@
 import os
+import json
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager, asynccontextmanager, nullcontext, ExitStack, AsyncExitStack
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
 
-# Load environment variables
-load_dotenv()
+from ranking import estimate_tokens
+from tracing import span, start_span
+from resilience import get_resilient_caller
+from scheduler import get_scheduler, llm_upstream
+
+# huggingface_hub and httpx take most of the startup time, so they are imported on first use
+if TYPE_CHECKING:
+    from huggingface_hub import InferenceClient, AsyncInferenceClient
+
+
+def _import_httpx():
+    try:
+        import httpx2 as httpx
+    except ImportError:
+        import httpx
+    return httpx
+
+
+class InferenceClientManager:
+    """
+    Process-wide owner of the Hugging Face Inference client and its HTTP connection pool
+
+    All LLM calls share one InferenceClient backed by a keep-alive connection pool, so
+    consecutive calls in a search turn reuse the same TLS connection instead of opening
+    a new one each time. Async calls get one AsyncInferenceClient per event loop with
+    the same pool settings. Use InferenceClientManager.get_instance() rather than
+    creating managers directly.
+
+    Configuration (environment variables):
+        HTTP_POOL_SIZE: Maximum number of pooled connections (default: 10)
+        HTTP_TIMEOUT: Request timeout in seconds (default: 60)
+        HTTP_KEEPALIVE_EXPIRY: Seconds an idle connection is kept open (default: 30)
+        HUGGINGFACE_BASE_URL: Send requests to this OpenAI-compatible endpoint instead of
+            Inference Providers (e.g. a self-hosted or mock server)
+        MODEL_CONCURRENCY: Maximum in-flight requests per upstream model, 0 for no limit (default: 0)
+        MODEL_CONCURRENCY_LIMITS: Per-model overrides, e.g. "google/gemma-2-2b-it=4,microsoft/phi-4=2"
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, pool_size: int = None, timeout: float = None, keepalive_expiry: float = None):
+        load_dotenv()
+        self.pool_size = pool_size or int(os.getenv('HTTP_POOL_SIZE', 10))
+        self.timeout = timeout or float(os.getenv('HTTP_TIMEOUT', 60))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv('HTTP_KEEPALIVE_EXPIRY', 30))
+        self.base_url = os.getenv('HUGGINGFACE_BASE_URL') or None
+
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._model_semaphores = {}
+        self._async_model_semaphores = weakref.WeakKeyDictionary()
+        # Live connection streams only: ids of closed streams could be reused by new connections
+        self._seen_connections = weakref.WeakSet()
+        self._requests = 0
+        self._new_connections = 0
+
+    @classmethod
+    def get_instance(cls) -> "InferenceClientManager":
+        """Return the process-wide manager, creating it on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def get_client(self) -> "InferenceClient":
+        """
+        Return the shared InferenceClient, creating it and its connection pool on first use
+
+        Raises:
+            ValueError: If API token is not configured
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    api_token = os.getenv('HUGGINGFACE_API_TOKEN')
+                    if not api_token:
+                        raise ValueError("HUGGINGFACE_API_TOKEN not found in environment variables")
+
+                    from huggingface_hub import InferenceClient, set_client_factory
+                    
+                    # huggingface_hub shares one HTTP session between all clients, so
+                    # installing our factory gives every call the same pooled connections
+                    set_client_factory(self._build_http_client)
+                    self._client = InferenceClient(api_key=api_token, base_url=self.base_url, timeout=self.timeout)
+        return self._client
+
+    def get_async_client(self) -> "AsyncInferenceClient":
+        """
+        Return the AsyncInferenceClient for the running event loop, creating it on first use
+        
+        Async HTTP connections are bound to the loop that opened them, so each loop
+        gets its own client and pool.
+        
+        Raises:
+            ValueError: If API token is not configured
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                api_token = os.getenv('HUGGINGFACE_API_TOKEN')
+                if not api_token:
+                    raise ValueError("HUGGINGFACE_API_TOKEN not found in environment variables")
+                
+                from huggingface_hub import AsyncInferenceClient, set_async_client_factory
+                
+                set_async_client_factory(self._build_async_http_client)
+                client = AsyncInferenceClient(api_key=api_token, base_url=self.base_url, timeout=self.timeout)
+                self._async_clients[loop] = client
+        return client
+
+    @staticmethod
+    def model_concurrency(model: str) -> int:
+        """Maximum in-flight requests allowed for a model, 0 for no limit"""
+        for entry in os.getenv('MODEL_CONCURRENCY_LIMITS', '').split(','):
+            name, _, limit = entry.strip().rpartition('=')
+            if name == model and limit.strip().isdigit():
+                return int(limit)
+        return int(os.getenv('MODEL_CONCURRENCY', 0))
+
+    @contextmanager
+    def model_slot(self, model: str, priority: str = 'helper'):
+        """Hold one of the model's concurrency slots for a blocking request, once its rate limit allows it"""
+        with self._lock:
+            if model not in self._model_semaphores:
+                limit = self.model_concurrency(model)
+                self._model_semaphores[model] = threading.BoundedSemaphore(limit) if limit > 0 else None
+            semaphore = self._model_semaphores[model]
+        
+        with semaphore if semaphore is not None else nullcontext():
+            get_scheduler().acquire(llm_upstream(model), priority)
+            yield
+
+    @asynccontextmanager
+    async def async_model_slot(self, model: str, priority: str = 'helper'):
+        """Hold one of the model's concurrency slots for a request on the running event loop, once its rate limit allows it"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._async_model_semaphores.setdefault(loop, {})
+            if model not in semaphores:
+                limit = self.model_concurrency(model)
+                semaphores[model] = asyncio.Semaphore(limit) if limit > 0 else None
+            semaphore = semaphores[model]
+        
+        async with semaphore if semaphore is not None else nullcontext():
+            await get_scheduler().aacquire(llm_upstream(model), priority)
+            yield
+
+    def _hf_hooks(self, name: str) -> list:
+        """huggingface_hub's own event hooks, so its headers, logging and error handling still apply"""
+        try:
+            from huggingface_hub.utils import _http
+            return [getattr(_http, name)]
+        except (ImportError, AttributeError):
+            return []
+
+    def _limits(self):
+        """Connection pool limits shared by the sync and async clients"""
+        return _import_httpx().Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def _build_async_http_client(self):
+        """Build the keep-alive async HTTP client used by huggingface_hub"""
+        async def record_connection(response):
+            self._record_connection(response)
+        
+        return _import_httpx().AsyncClient(
+            limits=self._limits(),
+            event_hooks={"request": self._hf_hooks('async_hf_request_event_hook'),
+                         "response": self._hf_hooks('async_hf_response_event_hook') + [record_connection]},
+            follow_redirects=True,
+            timeout=self.timeout
+        )
+
+    def _build_http_client(self):
+        """Build the keep-alive HTTP client used by huggingface_hub"""
+        return _import_httpx().Client(
+            limits=self._limits(),
+            event_hooks={"request": self._hf_hooks('hf_request_event_hook'), "response": [self._record_connection]},
+            follow_redirects=True,
+            timeout=self.timeout
+        )
+
+    def _record_connection(self, response):
+        """Count whether a response was served over a new or a reused connection"""
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self._requests += 1
+            if stream is None or stream not in self._seen_connections:
+                self._new_connections += 1
+                if stream is not None:
+                    self._seen_connections.add(stream)
+
+    def stats(self) -> dict:
+        """
+        Get connection pool counters
+
+        Returns:
+            dict: requests, new_connections (handshakes), reused_connections and pool_size
+        """
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'new_connections': self._new_connections,
+                'reused_connections': self._requests - self._new_connections,
+                'pool_size': self.pool_size
+            }
+
+
+def get_inference_client() -> "InferenceClient":
+    """
+    Get the shared, connection-pooled Hugging Face Inference client
+
+    Returns:
+        InferenceClient: The process-wide client
+
+    Raises:
+        ValueError: If API token is not configured
+    """
+    return InferenceClientManager.get_instance().get_client()
+
+
+def get_async_inference_client() -> "AsyncInferenceClient":
+    """
+    Get the connection-pooled async Hugging Face Inference client for the running event loop
+    
+    Returns:
+        AsyncInferenceClient: The client bound to the current loop
+    
+    Raises:
+        ValueError: If API token is not configured
+    """
+    return InferenceClientManager.get_instance().get_async_client()
+
+
+async def awarm_up_connection():
+    """
+    Create the async client of the running event loop and open a pooled connection
+    
+    Lets the first LLM call of a session skip client construction and the TCP/TLS
+    handshake. Sends a GET to the endpoint's model list; its response is ignored.
+    
+    Raises:
+        ValueError: If API token is not configured
+    """
+    client = get_async_inference_client()
+    base_url = InferenceClientManager.get_instance().base_url or "https://router.huggingface.co/v1"
+    
+    # huggingface_hub opens the client's HTTP session lazily; open it now if possible
+    open_session = getattr(client, '_get_async_client', None)
+    if open_session is None:
+        return
+    http_client = await open_session()
+    with span('llm.warmup'):
+        await http_client.get(f"{base_url.rstrip('/')}/models")
+
+
+def get_connection_stats() -> dict:
+    """Get connection reuse counters for the shared Inference client"""
+    return InferenceClientManager.get_instance().stats()
+
+
+def get_resilience_stats() -> dict:
+    """Get retry, fallback and hedging counters and the rolling health of each model"""
+    return get_resilient_caller().stats()
+
+
+def _record_usage(llm_span, messages: list, response: str, usage=None):
+    """Attach token counts to an LLM span, estimating them when the provider reports no usage"""
+    llm_span.set(
+        input_tokens=getattr(usage, 'prompt_tokens', None) or sum(estimate_tokens(m['content']) for m in messages),
+        output_tokens=getattr(usage, 'completion_tokens', None) or estimate_tokens(response)
+    )
+
+def _complete(client: "InferenceClient", messages: list, model_name: str, max_tokens: int, temperature: float, span_name: str,
+              priority: str = 'helper') -> str:
+    """
+    Run a chat completion on the shared client, retrying and falling back to other models as needed
+    
+    Each attempt holds its model's concurrency slot, is scheduled at the given
+    priority class and gets its own span.
+    """
+    manager = InferenceClientManager.get_instance()
+    
+    def attempt(model: str) -> str:
+        with manager.model_slot(model, priority), span(span_name, model=model) as llm_span:
+            completion = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=False
+            )
+            response = completion.choices[0].message.content
+            _record_usage(llm_span, messages, response, completion.usage)
+        return response
+    
+    return get_resilient_caller().call(model_name, attempt)
+
 
 def get_llm_instruction_response(query_instruction: str, content: str, model: str = None, max_tokens: int = None) -> str:
     """
@@ -24,17 +332,13 @@ def get_llm_instruction_response(query_instruction: str, content: str, model: st
     """
     
     # Get configuration from environment variables
-    api_token = os.getenv('HUGGINGFACE_API_TOKEN')
-    if not api_token:
-        raise ValueError("HUGGINGFACE_API_TOKEN not found in environment variables")
-    
     # Use provided model or fallback to instruction model environment variable
     model_name = model or os.getenv('HUGGINGFACE_INSTRUCTION_MODEL', 'Qwen/Qwen2.5-7B-Instruct-1M')
     max_tokens = max_tokens or int(os.getenv('MAX_TOKENS', 150))
     temperature = float(os.getenv('TEMPERATURE', 0.5))
     
-    # Initialize the Inference Client
-    client = InferenceClient(api_key=api_token)
+    # Reuse the shared, connection-pooled Inference Client
+    client = get_inference_client()
     
     try:
         # Combine instruction and content into a single prompt
@@ -44,15 +348,9 @@ def get_llm_instruction_response(query_instruction: str, content: str, model: st
         messages = [{"role": "user", "content": full_prompt}]
         
         # Make the API call using chat completions
-        completion = client.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            stream=False
-        )
+        response = _complete(client, messages, model_name, max_tokens, temperature, 'llm.instruction')
         
-        return completion.choices[0].message.content.strip()
+        return response.strip()
         
     except Exception as e:
         raise Exception(f"Failed to get LLM response: {str(e)}")
@@ -77,17 +375,13 @@ def get_llm_instruction_response_bool(query_condition: str, content: str, model:
     """
     
     # Get configuration from environment variables
-    api_token = os.getenv('HUGGINGFACE_API_TOKEN')
-    if not api_token:
-        raise ValueError("HUGGINGFACE_API_TOKEN not found in environment variables")
-    
     # Use provided model or fallback to instruction model environment variable
     model_name = model or os.getenv('HUGGINGFACE_INSTRUCTION_MODEL', 'Qwen/Qwen2.5-7B-Instruct-1M')
     max_tokens = max_tokens or int(os.getenv('MAX_TOKENS', 150))
     temperature = float(os.getenv('TEMPERATURE', 0.5))
     
-    # Initialize the Inference Client
-    client = InferenceClient(api_key=api_token)
+    # Reuse the shared, connection-pooled Inference Client
+    client = get_inference_client()
     
     try:
         # Create a prompt that asks for a boolean response
@@ -97,33 +391,102 @@ def get_llm_instruction_response_bool(query_condition: str, content: str, model:
         messages = [{"role": "user", "content": full_prompt}]
         
         # Make the API call using chat completions
-        completion = client.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            stream=False
-        )
+        response = _complete(client, messages, model_name, max_tokens, temperature, 'llm.bool')
         
         # Get the response and convert to boolean
-        response = completion.choices[0].message.content.strip().lower()
-        
-        # Parse the response to boolean
-        if response in ['true', 'yes', '1', 'correct', 'positive']:
-            return True
-        elif response in ['false', 'no', '0', 'incorrect', 'negative']:
-            return False
-        else:
-            # If response is ambiguous, try to determine based on common patterns
-            if any(word in response for word in ['yes', 'true', 'correct', 'positive', 'valid']):
-                return True
-            else:
-                return False
+        return parse_bool_response(response)
         
     except Exception as e:
         raise Exception(f"Failed to get LLM boolean response: {str(e)}")
 
 
+def parse_bool_response(response: str) -> bool:
+    """
+    Interpret a yes/no style LLM response as a boolean
+    
+    Args:
+        response (str): The raw LLM response
+    
+    Returns:
+        bool: True if the response affirms, False otherwise
+    """
+    response = response.strip().lower()
+    
+    # Parse the response to boolean
+    if response in ['true', 'yes', '1', 'correct', 'positive']:
+        return True
+    elif response in ['false', 'no', '0', 'incorrect', 'negative']:
+        return False
+    else:
+        # If response is ambiguous, try to determine based on common patterns
+        if any(word in response for word in ['yes', 'true', 'correct', 'positive', 'valid']):
+            return True
+        else:
+            return False
+
+
+def get_llm_instruction_response_json(query_instruction: str, content: str, model: str = None, max_tokens: int = None) -> dict:
+    """
+    Get LLM instruction response parsed as a JSON object
+    
+    Args:
+        query_instruction (str): The instruction or prompt for the LLM (should describe the expected JSON fields)
+        content (str): The content to be processed by the LLM
+        model (str, optional): Model to use. If None, uses HUGGINGFACE_INSTRUCTION_MODEL from .env
+        max_tokens (int, optional): Maximum tokens to generate. If None, uses MAX_TOKENS from .env
+    
+    Returns:
+        dict: The parsed JSON object
+    
+    Raises:
+        ValueError: If API token is not configured or the response is not a JSON object
+        Exception: If API call fails
+    """
+    
+    response = get_llm_instruction_response(
+        query_instruction=f"{query_instruction}\n\nRespond with only a single JSON object and no other text.",
+        content=content,
+        model=model,
+        max_tokens=max_tokens
+    )
+    return parse_json_response(response)
+
+
+def parse_json_response(response: str) -> dict:
+    """
+    Strictly parse an LLM response as a JSON object
+    
+    Accepts the object on its own or wrapped in a single markdown code fence.
+    
+    Args:
+        response (str): The raw LLM response
+    
+    Returns:
+        dict: The parsed JSON object
+    
+    Raises:
+        ValueError: If the response is not exactly one JSON object
+    """
+    text = response.strip()
+    
+    # Models often wrap JSON in ```json ... ``` fences
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if not text.rstrip().endswith("```"):
+            raise ValueError("Unterminated code fence in JSON response")
+        text = text.rstrip()[:-3].strip()
+    
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Malformed JSON response: {str(e)}")
+    
+    if not isinstance(parsed, dict):
+        raise ValueError("JSON response is not an object")
+    
+    return parsed
+
+
 def get_llm_chat_response(messages: list, model: str = None, max_tokens: int = None) -> str:
     """
     Get LLM response using chat completions format
@@ -142,29 +505,293 @@ def get_llm_chat_response(messages: list, model: str = None, max_tokens: int = N
     """
     
     # Get configuration from environment variables
-    api_token = os.getenv('HUGGINGFACE_API_TOKEN')
-    if not api_token:
-        raise ValueError("HUGGINGFACE_API_TOKEN not found in environment variables")
-    
     # Use provided model or fallback to environment variable
     model_name = model or os.getenv('HUGGINGFACE_MODEL', 'google/gemma-2-2b-it')
     max_tokens = max_tokens or int(os.getenv('MAX_TOKENS', 150))
     temperature = float(os.getenv('TEMPERATURE', 0.5))
     
-    # Initialize the Inference Client
-    client = InferenceClient(api_key=api_token)
+    # Reuse the shared, connection-pooled Inference Client
+    client = get_inference_client()
     
     try:
         # Make the chat completions API call
-        completion = client.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            stream=False
-        )
+        response = _complete(client, messages, model_name, max_tokens, temperature, 'llm.chat', 'interactive')
+        
+        return response.strip()
         
-        return completion.choices[0].message.content.strip()
+    except Exception as e:
+        raise Exception(f"Failed to get LLM chat response: {str(e)}")
+
+
+def stream_llm_chat_response(messages: list, model: str = None, max_tokens: int = None):
+    """
+    Stream an LLM chat response token by token using chat completions format
+    
+    Args:
+        messages (list): List of message dictionaries with 'role' and 'content'
+        model (str, optional): Model to use. If None, uses HUGGINGFACE_MODEL from .env
+        max_tokens (int, optional): Maximum tokens to generate. If None, uses MAX_TOKENS from .env
+    
+    Yields:
+        str: Pieces of the response text as they arrive
+    
+    Raises:
+        ValueError: If API token is not configured
+        Exception: If API call fails
+    """
+    
+    # Get configuration from environment variables
+    model_name = model or os.getenv('HUGGINGFACE_MODEL', 'google/gemma-2-2b-it')
+    max_tokens = max_tokens or int(os.getenv('MAX_TOKENS', 150))
+    temperature = float(os.getenv('TEMPERATURE', 0.5))
+    
+    # Reuse the shared, connection-pooled Inference Client
+    client = get_inference_client()
+    
+    manager = InferenceClientManager.get_instance()
+    
+    def open_stream(model: str):
+        # The model's concurrency slot is held until the stream is fully read
+        slot = ExitStack()
+        slot.enter_context(manager.model_slot(model, 'interactive'))
+        try:
+            stream = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True
+            )
+        except BaseException:
+            slot.close()
+            raise
+        return model, stream, slot
+    
+    try:
+        # Not made current: a generator's steps run in its consumer's context
+        llm_span = start_span('llm.chat_stream', model=model_name)
+        response = ""
+        error = None
+        try:
+            # Only opening the stream is retried; tokens already yielded cannot be taken back
+            served_by, stream, slot = get_resilient_caller().call(model_name, open_stream, measure=False)
+            llm_span.set(model=served_by)
+            with slot:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not response:
+                            llm_span.set(first_token_ms=round(llm_span.elapsed_ms(), 1))
+                        response += chunk.choices[0].delta.content
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _record_usage(llm_span, messages, response)
+            llm_span.end(error)
         
+    except Exception as e:
+        raise Exception(f"Failed to stream LLM chat response: {str(e)}")
+
+
+
+async def _acreate_completion(messages: list, model_name: str, max_tokens: int = None, stream: bool = False):
+    """
+    Run a chat completion on the async client of the running event loop
+    
+    Callers hold the model's concurrency slot (async_model_slot) around this call,
+    and for streams until the stream has been read.
+    """
+    max_tokens = max_tokens or int(os.getenv('MAX_TOKENS', 150))
+    temperature = float(os.getenv('TEMPERATURE', 0.5))
+    
+    # Reuse the connection-pooled async client of this event loop
+    client = get_async_inference_client()
+    
+    return await client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stream=stream
+    )
+
+
+async def _acomplete(messages: list, model_name: str, max_tokens: int, span_name: str, priority: str = 'helper') -> str:
+    """Async version of _complete, which may also hedge slow requests"""
+    manager = InferenceClientManager.get_instance()
+    
+    async def attempt(model: str) -> str:
+        async with manager.async_model_slot(model, priority):
+            with span(span_name, model=model) as llm_span:
+                completion = await _acreate_completion(messages, model, max_tokens)
+                response = completion.choices[0].message.content
+                _record_usage(llm_span, messages, response, completion.usage)
+        return response
+    
+    return await get_resilient_caller().acall(model_name, attempt)
+
+
+async def aget_llm_instruction_response(query_instruction: str, content: str, model: str = None, max_tokens: int = None) -> str:
+    """
+    Async version of get_llm_instruction_response using AsyncInferenceClient
+    
+    Args:
+        query_instruction (str): The instruction or prompt for the LLM
+        content (str): The content to be processed by the LLM
+        model (str, optional): Model to use. If None, uses HUGGINGFACE_INSTRUCTION_MODEL from .env
+        max_tokens (int, optional): Maximum tokens to generate. If None, uses MAX_TOKENS from .env
+    
+    Returns:
+        str: The LLM response
+    
+    Raises:
+        ValueError: If API token is not configured
+        Exception: If API call fails
+    """
+    model_name = model or os.getenv('HUGGINGFACE_INSTRUCTION_MODEL', 'Qwen/Qwen2.5-7B-Instruct-1M')
+    messages = [{"role": "user", "content": f"{query_instruction}\n\nContent: {content}"}]
+    
+    try:
+        response = await _acomplete(messages, model_name, max_tokens, 'llm.instruction')
+        return response.strip()
+    except ValueError:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to get LLM response: {str(e)}")
+
+
+async def aget_llm_instruction_response_bool(query_condition: str, content: str, model: str = None, max_tokens: int = None) -> bool:
+    """
+    Async version of get_llm_instruction_response_bool using AsyncInferenceClient
+    
+    Args:
+        query_condition (str): The condition or question for the LLM to evaluate (should be answerable with yes/no or true/false)
+        content (str): The content to be evaluated by the LLM
+        model (str, optional): Model to use. If None, uses HUGGINGFACE_INSTRUCTION_MODEL from .env
+        max_tokens (int, optional): Maximum tokens to generate. If None, uses MAX_TOKENS from .env
+    
+    Returns:
+        bool: True if the condition is met, False otherwise
+    
+    Raises:
+        ValueError: If API token is not configured
+        Exception: If API call fails
+    """
+    model_name = model or os.getenv('HUGGINGFACE_INSTRUCTION_MODEL', 'Qwen/Qwen2.5-7B-Instruct-1M')
+    full_prompt = f"{query_condition}\n\nContent: {content}\n\nPlease respond with only 'true' or 'false'."
+    
+    try:
+        messages = [{"role": "user", "content": full_prompt}]
+        response = await _acomplete(messages, model_name, max_tokens, 'llm.bool')
+        return parse_bool_response(response)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to get LLM boolean response: {str(e)}")
+
+
+async def aget_llm_instruction_response_json(query_instruction: str, content: str, model: str = None, max_tokens: int = None) -> dict:
+    """
+    Async version of get_llm_instruction_response_json using AsyncInferenceClient
+    
+    Returns:
+        dict: The parsed JSON object
+    
+    Raises:
+        ValueError: If API token is not configured or the response is not a JSON object
+        Exception: If API call fails
+    """
+    response = await aget_llm_instruction_response(
+        query_instruction=f"{query_instruction}\n\nRespond with only a single JSON object and no other text.",
+        content=content,
+        model=model,
+        max_tokens=max_tokens
+    )
+    return parse_json_response(response)
+
+
+async def aget_llm_chat_response(messages: list, model: str = None, max_tokens: int = None) -> str:
+    """
+    Async version of get_llm_chat_response using AsyncInferenceClient
+    
+    Args:
+        messages (list): List of message dictionaries with 'role' and 'content'
+        model (str, optional): Model to use. If None, uses HUGGINGFACE_MODEL from .env
+        max_tokens (int, optional): Maximum tokens to generate. If None, uses MAX_TOKENS from .env
+    
+    Returns:
+        str: The LLM response
+    
+    Raises:
+        ValueError: If API token is not configured
+        Exception: If API call fails
+    """
+    model_name = model or os.getenv('HUGGINGFACE_MODEL', 'google/gemma-2-2b-it')
+    
+    try:
+        response = await _acomplete(messages, model_name, max_tokens, 'llm.chat', 'interactive')
+        return response.strip()
+    except ValueError:
+        raise
     except Exception as e:
         raise Exception(f"Failed to get LLM chat response: {str(e)}")
+
+
+async def astream_llm_chat_response(messages: list, model: str = None, max_tokens: int = None):
+    """
+    Async version of stream_llm_chat_response using AsyncInferenceClient
+    
+    Args:
+        messages (list): List of message dictionaries with 'role' and 'content'
+        model (str, optional): Model to use. If None, uses HUGGINGFACE_MODEL from .env
+        max_tokens (int, optional): Maximum tokens to generate. If None, uses MAX_TOKENS from .env
+    
+    Yields:
+        str: Pieces of the response text as they arrive
+    
+    Raises:
+        ValueError: If API token is not configured
+        Exception: If API call fails
+    """
+    model_name = model or os.getenv('HUGGINGFACE_MODEL', 'google/gemma-2-2b-it')
+    
+    manager = InferenceClientManager.get_instance()
+    
+    async def open_stream(model: str):
+        # The model's concurrency slot is held until the stream is fully read
+        slot = AsyncExitStack()
+        await slot.enter_async_context(manager.async_model_slot(model, 'interactive'))
+        try:
+            stream = await _acreate_completion(messages, model, max_tokens, stream=True)
+        except BaseException:
+            await slot.aclose()
+            raise
+        return model, stream, slot
+    
+    try:
+        # Not made current: a generator's steps can run in different tasks
+        llm_span = start_span('llm.chat_stream', model=model_name)
+        response = ""
+        error = None
+        try:
+            # Only opening the stream is retried; tokens already yielded cannot be taken back
+            served_by, stream, slot = await get_resilient_caller().acall(model_name, open_stream, measure=False, hedge=False)
+            llm_span.set(model=served_by)
+            async with slot:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not response:
+                            llm_span.set(first_token_ms=round(llm_span.elapsed_ms(), 1))
+                        response += chunk.choices[0].delta.content
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _record_usage(llm_span, messages, response)
+            llm_span.end(error)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to stream LLM chat response: {str(e)}")
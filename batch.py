@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Batch mode for the search-augmented chatbot
+Answers every prompt in a JSONL file concurrently and writes the results as JSONL
+"""
+
+import os
+import json
+import math
+import time
+import asyncio
+
+from chat import create_chatbot, run_coroutine
+from LLMfunc import get_connection_stats
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0.0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class BatchRunner:
+    """
+    Runs independent prompts from a JSONL file through the chatbot pipeline
+
+    Each input line is a JSON object with an 'id' (or 'request_id') and a 'prompt';
+    lines with 'title' and 'body' instead, like the backlog in requests.jsonl, are
+    asked as "title\\n\\nbody". Every prompt gets a fresh conversation. Each result
+    is written and flushed as soon as its prompt is done, so results appear in
+    completion order; match them to prompts by 'id'.
+
+    Rerunning with the same output file resumes: prompts that already have a
+    successful result are skipped and failed ones are retried.
+
+    Configuration (environment variables):
+        BATCH_CONCURRENCY: Prompts answered at once (default: 4)
+    """
+
+    def __init__(self, input_path: str, output_path: str, concurrency: int = None, settings: dict = None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency or int(os.getenv('BATCH_CONCURRENCY', 4)))
+        self.settings = settings or {}
+
+        self.latencies = []
+        self.failed = 0
+
+    def load_prompts(self) -> list:
+        """
+        Read the input file
+
+        Returns:
+            list: {'id', 'prompt'} dicts in file order
+
+        Raises:
+            ValueError: If a line is not a JSON object with a prompt
+        """
+        prompts = []
+        with open(self.input_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{self.input_path}:{line_number}: malformed JSON: {str(e)}")
+                if not isinstance(record, dict):
+                    raise ValueError(f"{self.input_path}:{line_number}: expected a JSON object")
+
+                prompt = record.get('prompt')
+                if not prompt and record.get('body'):
+                    prompt = f"{record['title']}\n\n{record['body']}" if record.get('title') else record['body']
+                if not isinstance(prompt, str) or not prompt.strip():
+                    raise ValueError(f"{self.input_path}:{line_number}: no 'prompt' (or 'body') field")
+
+                prompt_id = record.get('id', record.get('request_id', line_number))
+                prompts.append({'id': str(prompt_id), 'prompt': prompt.strip()})
+        return prompts
+
+    def load_completed(self) -> set:
+        """
+        Keep only the successful results of a previous run and return their ids
+
+        Failed results and a line cut off by an interruption are dropped from the
+        output file so their prompts are answered again.
+        """
+        if not os.path.exists(self.output_path):
+            return set()
+
+        kept = []
+        with open(self.output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and 'response' in record and not record.get('error'):
+                    kept.append(record)
+
+        # Rewrite atomically so an interruption here cannot lose finished results
+        temp_path = f"{self.output_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in kept:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.output_path)
+
+        return {record['id'] for record in kept}
+
+    async def answer(self, item: dict) -> dict:
+        """Answer one prompt in a fresh conversation and build its result record"""
+        chatbot = create_chatbot(self.settings)
+        start = time.perf_counter()
+        record = {'id': item['id'], 'prompt': item['prompt']}
+        try:
+            record['response'] = await chatbot.respond(item['prompt'], raise_errors=True)
+            record['web_search'] = any(
+                "[WEB SEARCH CONTEXT]" in message['content']
+                for message in chatbot.conversation_history if message['role'] == 'user'
+            )
+            if chatbot.turn_metadata:
+                record['deadline'] = chatbot.turn_metadata
+        except Exception as e:
+            record['error'] = chatbot.format_error(e)
+        record['latency'] = round(time.perf_counter() - start, 3)
+        return record
+
+    async def arun(self, prompts: list):
+        """Answer prompts with bounded concurrency, appending each result to the output file when done"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(item: dict, output_file):
+            async with semaphore:
+                record = await self.answer(item)
+
+            if 'error' in record:
+                self.failed += 1
+                print(f"❌ [{item['id']}] {record['error']}")
+            else:
+                self.latencies.append(record['latency'])
+                print(f"✅ [{item['id']}] answered in {record['latency']:.1f}s")
+
+            output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output_file.flush()
+
+        # Opened and closed on the event loop, so a cancelled run cannot write to a closed file
+        with open(self.output_path, 'a', encoding='utf-8') as output_file:
+            await asyncio.gather(*(run_one(item, output_file) for item in prompts))
+
+    def run(self):
+        """Run the batch, resuming from the output file, and print a throughput report"""
+        # Fail fast on a missing token instead of inside every prompt
+        create_chatbot(self.settings)
+
+        prompts = self.load_prompts()
+        completed = self.load_completed()
+        pending = [item for item in prompts if item['id'] not in completed]
+
+        print(f"📥 {len(prompts)} prompts in {self.input_path}")
+        if completed:
+            print(f"⏭️  Resuming: {len(prompts) - len(pending)} already answered in {self.output_path}")
+        if not pending:
+            print("✅ Nothing to do")
+            return
+        print(f"🚀 Answering {len(pending)} prompts, {self.concurrency} at a time")
+
+        llm_calls_before = get_connection_stats()['requests']
+        start = time.perf_counter()
+        try:
+            run_coroutine(self.arun(pending))
+        except KeyboardInterrupt:
+            print("\n⏸️  Interrupted - run the same command again to resume")
+        elapsed = time.perf_counter() - start
+
+        self.report(elapsed, get_connection_stats()['requests'] - llm_calls_before)
+
+    def report(self, elapsed: float, llm_calls: int):
+        """Print throughput, latency percentiles and LLM calls per prompt"""
+        done = len(self.latencies) + self.failed
+        print(f"\n📊 Batch report ({self.output_path}):")
+        print(f"  Prompts: {len(self.latencies)} answered, {self.failed} failed in {elapsed:.1f}s")
+        print(f"  Throughput: {done / elapsed if elapsed else 0.0:.2f} prompts/s")
+        print(f"  Latency: p50 {percentile(self.latencies, 0.5):.2f}s, p95 {percentile(self.latencies, 0.95):.2f}s")
+        print(f"  LLM calls: {llm_calls} ({llm_calls / done if done else 0.0:.1f} per prompt)")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Side-by-side benchmark of the streaming HTML extractor against the BeautifulSoup extractor
+
+Usage:
+    python benchmarks/bench_extract.py --corpus saved_pages/     # directory of saved .html pages
+    python benchmarks/bench_extract.py                           # synthetic pages of increasing size
+
+No saved pages are checked in (they are third-party content); save a few with
+e.g. "curl -o saved_pages/name.html <url>" to compare on real markup.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import extract_text_streaming, extract_text_soup
+
+
+CHUNK_SIZE = 16384
+
+
+def synthetic_corpus() -> dict:
+    """Build news-like pages with heavy scripts and page chrome, from 50 KB to several MB"""
+    corpus = {}
+    for paragraphs in (100, 1000, 10000):
+        parts = [
+            "<html><head><title>Synthetic article</title>",
+            "<script>" + "var tracking = {};" * 2000 + "</script>",
+            "<style>" + ".c{color:red}" * 2000 + "</style></head><body>",
+            "<header><nav>" + "<a href='#'>Section</a>" * 200 + "</nav></header>",
+        ]
+        for i in range(paragraphs):
+            parts.append(f"<p>Paragraph {i} of the article body with <b>some</b> markup and a <a href='#'>link</a>.</p>")
+            if i % 50 == 0:
+                parts.append("<aside>Related stories and advertising</aside>")
+        parts.append("<footer>" + "Cookie settings and legal links. " * 200 + "</footer></body></html>")
+        html = "".join(parts).encode('utf-8')
+        corpus[f"synthetic-{len(html) // 1024}KB"] = html
+    return corpus
+
+
+def load_corpus(directory: str) -> dict:
+    """Read every .html / .htm file in a directory"""
+    corpus = {}
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                corpus[name] = f.read()
+    return corpus
+
+
+def measure(func, repeats: int) -> dict:
+    """Median wall time over repeats and peak traced memory of one run"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - start)
+    
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {'median_ms': statistics.median(timings) * 1000, 'peak_kb': peak / 1024, 'chars': len(output), 'output': output}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming vs. BeautifulSoup HTML extraction')
+    parser.add_argument('--corpus', help='Directory of saved .html pages (default: synthetic pages)')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per page (default: 5)')
+    parser.add_argument('--max-chars', type=int, default=5000, help='Character budget (default: 5000)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+    
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not corpus:
+        print("No .html pages found in corpus")
+        sys.exit(1)
+    
+    results = []
+    for name, html in corpus.items():
+        chunks = [html[i:i + CHUNK_SIZE] for i in range(0, len(html), CHUNK_SIZE)]
+        soup = measure(lambda: extract_text_soup(html, max_chars=args.max_chars), args.repeats)
+        streaming = measure(lambda: extract_text_streaming(iter(chunks), max_chars=args.max_chars), args.repeats)
+        results.append({
+            'page': name,
+            'bytes': len(html),
+            'soup_ms': round(soup['median_ms'], 2),
+            'streaming_ms': round(streaming['median_ms'], 2),
+            'speedup': round(soup['median_ms'] / streaming['median_ms'], 1) if streaming['median_ms'] else None,
+            'soup_peak_kb': round(soup['peak_kb']),
+            'streaming_peak_kb': round(streaming['peak_kb']),
+            'same_output': soup['output'] == streaming['output'],
+        })
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    
+    print(f"{'page':<32} {'size KB':>8} {'soup ms':>9} {'stream ms':>10} {'speedup':>8} {'soup KB':>9} {'stream KB':>10} {'same':>5}")
+    for r in results:
+        print(f"{r['page'][:32]:<32} {r['bytes'] // 1024:>8} {r['soup_ms']:>9} {r['streaming_ms']:>10} "
+              f"{r['speedup']:>7}x {r['soup_peak_kb']:>9} {r['streaming_peak_kb']:>10} {'yes' if r['same_output'] else 'no':>5}")
+
+
+if __name__ == "__main__":
+    main()
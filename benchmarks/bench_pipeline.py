@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Hermetic benchmark of the search pipeline, stage by stage and end to end
+
+Runs against a local mock inference server, a fake DuckDuckGo provider and a local
+page server, so results depend only on the code and the configured fake latencies.
+
+Usage:
+    python benchmarks/bench_pipeline.py                                   # table of stage timings
+    python benchmarks/bench_pipeline.py --json --out bench.json           # machine-readable results
+    python benchmarks/bench_pipeline.py --baseline bench.json             # exit 1 on a regression
+    python benchmarks/bench_pipeline.py --corpus saved_pages/ --llm-latency 0.5 --token-rate 30
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import MockInferenceServer, PageCorpusServer, FakeDDGS
+
+
+def configure_environment(llm_base_url: str):
+    """Point the pipeline at the fakes and disable caches so every run does the full work"""
+    os.environ['HUGGINGFACE_BASE_URL'] = llm_base_url
+    os.environ.setdefault('HUGGINGFACE_API_TOKEN', 'hf_benchmark')
+    os.environ['FRIDAY_DATA_DIR'] = tempfile.mkdtemp(prefix='friday-bench-')
+    os.environ['SEARCH_CACHE'] = 'false'
+    os.environ['PAGE_CACHE'] = 'false'
+    os.environ['PRECLASSIFIER'] = 'false'
+    # All fake pages live on one host; politeness delays would measure the throttle, not the pipeline
+    os.environ.setdefault('SEARCH_HOST_MIN_INTERVAL', '0')
+    os.environ.setdefault('SEARCH_HOST_CONCURRENCY', '8')
+
+
+def measure(func, repeats: int) -> dict:
+    """Wall time statistics over repeats, with the pipeline's progress output suppressed"""
+    timings = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'runs': repeats,
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(0.95 * len(timings)))] * 1000, 2),
+        'min_ms': round(timings[0] * 1000, 2),
+        'max_ms': round(timings[-1] * 1000, 2),
+    }
+
+
+async def collect(iterator) -> list:
+    """Drain an async iterator into a list"""
+    return [item async for item in iterator]
+
+
+def run_benchmarks(args, llm: MockInferenceServer, pages: PageCorpusServer) -> dict:
+    """Time each pipeline stage on its own, then whole turns"""
+    # Imported after configure_environment so module-level settings see the fakes
+    import websearch
+    from chat import create_chatbot, run_coroutine
+    from LLMfunc import get_llm_chat_response
+
+    websearch.DDGS = FakeDDGS
+    query = "bitcoin price today"
+    chatbot = create_chatbot({'use_planner': not args.no_planner})
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = websearch.web_search(query, num_results=args.num_results)
+    messages = chatbot.conversation_history + [{'role': 'user', 'content': query}]
+
+    stages = {
+        'check_if_web_search_needed': lambda: chatbot.check_if_web_search_needed(query),
+        'clarify_search_request': lambda: chatbot.clarify_search_request(query),
+        'plan_search': lambda: chatbot.plan_search(query),
+        'web_search': lambda: websearch.web_search(query, num_results=args.num_results),
+        'aiter_web_search': lambda: run_coroutine(collect(websearch.aiter_web_search(query, num_results=args.num_results))),
+        'get_cleaned_content': lambda: websearch.get_cleaned_content(pages.urls()[0]),
+        'summarize_search_results': lambda: chatbot.summarize_search_results(results, query, query),
+        'map_reduce_search_results': lambda: chatbot.map_reduce_search_results(results, query, query),
+        'get_llm_chat_response': lambda: get_llm_chat_response(messages, model=chatbot.model, max_tokens=chatbot.max_tokens),
+        # Fresh conversation per turn so history growth does not skew later runs
+        'end_to_end': lambda: create_chatbot({'use_planner': not args.no_planner}).get_ai_response_with_search(query),
+    }
+
+    timings = {}
+    for name, func in stages.items():
+        if args.stages and name not in args.stages:
+            continue
+        calls_before = llm.calls
+        timings[name] = measure(func, args.repeats)
+        timings[name]['llm_calls_per_run'] = round((llm.calls - calls_before) / args.repeats, 2)
+    return timings
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Stages whose median is more than tolerance slower than the baseline"""
+    regressions = []
+    for name, timing in results['stages'].items():
+        previous = baseline.get('stages', {}).get(name)
+        if previous and timing['median_ms'] > previous['median_ms'] * (1 + tolerance):
+            regressions.append({'stage': name, 'baseline_ms': previous['median_ms'], 'median_ms': timing['median_ms']})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hermetic benchmark of the search pipeline stages')
+    parser.add_argument('--corpus', help='Directory of recorded .html pages (default: synthetic articles)')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per stage (default: 5)')
+    parser.add_argument('--stages', nargs='+', help='Only run these stages')
+    parser.add_argument('--num-results', type=int, default=3, help='Search results per query (default: 3)')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='Mock LLM seconds to first token (default: 0.2)')
+    parser.add_argument('--token-rate', type=float, default=50.0, help='Mock LLM tokens per second (default: 50)')
+    parser.add_argument('--search-latency', type=float, default=0.3, help='Fake DuckDuckGo seconds per query (default: 0.3)')
+    parser.add_argument('--page-latency', type=float, default=0.05, help='Page server seconds per response (default: 0.05)')
+    parser.add_argument('--no-planner', action='store_true', help='Benchmark turns with the step-by-step search analysis')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--out', help='Also write the JSON results to this file')
+    parser.add_argument('--baseline', help='JSON results of a previous run; exit 1 if any stage is slower')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown against --baseline (default: 0.2)')
+    args = parser.parse_args()
+
+    llm = MockInferenceServer(latency=args.llm_latency, token_rate=args.token_rate).start()
+    pages = PageCorpusServer(args.corpus, latency=args.page_latency).start()
+    if not pages.pages:
+        print("No .html pages found in corpus")
+        sys.exit(1)
+    FakeDDGS.urls = pages.urls()
+    FakeDDGS.latency = args.search_latency
+    configure_environment(f"{llm.base_url}/v1")
+
+    results = {
+        'config': {
+            'repeats': args.repeats,
+            'num_results': args.num_results,
+            'llm_latency': args.llm_latency,
+            'token_rate': args.token_rate,
+            'search_latency': args.search_latency,
+            'page_latency': args.page_latency,
+            'pages': len(pages.pages),
+            'planner': not args.no_planner,
+        },
+        'stages': run_benchmarks(args, llm, pages),
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results['regressions'] = regressions
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'stage':<28} {'median ms':>10} {'p95 ms':>9} {'min ms':>9} {'max ms':>9} {'LLM calls':>10}")
+        for name, r in results['stages'].items():
+            print(f"{name:<28} {r['median_ms']:>10} {r['p95_ms']:>9} {r['min_ms']:>9} {r['max_ms']:>9} {r['llm_calls_per_run']:>10}")
+        for r in regressions:
+            print(f"❌ {r['stage']}: {r['median_ms']} ms vs baseline {r['baseline_ms']} ms")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
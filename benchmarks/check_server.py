@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Hermetic end-to-end check of the OpenAI-compatible server (--serve)
+
+Starts the server against the same fakes as bench_pipeline.py (mock inference server,
+fake DuckDuckGo provider and local page server) and sends it real HTTP requests:
+a one-off conversation with a client system message, a streamed turn, a two-turn
+session and malformed requests. Exits 1 if any check fails.
+
+Usage:
+    python benchmarks/check_server.py
+    python benchmarks/check_server.py --verbose    # show the pipeline's output too
+"""
+
+import os
+import io
+import sys
+import json
+import argparse
+import threading
+import contextlib
+import urllib.request
+import urllib.error
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import MockInferenceServer, PageCorpusServer, FakeDDGS
+from bench_pipeline import configure_environment
+
+
+SYSTEM_MARKER = "Always answer in the voice of a ship's captain."
+
+
+def post(base_url: str, payload: dict, headers: dict = None) -> tuple:
+    """POST a chat completion request; returns (status, headers, raw body)"""
+    request = urllib.request.Request(
+        f"{base_url}/v1/chat/completions",
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json', **(headers or {})}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def chat_requests(llm: MockInferenceServer) -> list:
+    """Chat calls the mock received (helper calls send a single user message)"""
+    return [body['messages'] for body in list(llm.recent_requests)
+            if body['messages'] and body['messages'][0]['role'] == 'system']
+
+
+def run_checks(base_url: str, llm: MockInferenceServer) -> list:
+    """Send the requests and return (check name, passed, detail) tuples"""
+    checks = []
+
+    # One-off conversation: the client's system message must reach the chat model
+    llm.recent_requests.clear()
+    status, _, body = post(base_url, {'messages': [
+        {'role': 'system', 'content': SYSTEM_MARKER},
+        {'role': 'user', 'content': 'What is the bitcoin price today?'}
+    ]})
+    reply = json.loads(body) if status == 200 else {}
+    content = reply.get('choices', [{}])[0].get('message', {}).get('content', '')
+    checks.append(('non-streaming completion', status == 200 and reply.get('object') == 'chat.completion' and bool(content),
+                   f"status {status}"))
+    sent = chat_requests(llm)
+    checks.append(('client system message reaches the model',
+                   bool(sent) and SYSTEM_MARKER in sent[-1][0]['content'] and
+                   sum(m['role'] == 'system' for m in sent[-1]) == 1,
+                   f"{len(sent)} chat call(s)"))
+
+    # Streamed turn: role chunk, content chunks, then [DONE]
+    status, headers, body = post(base_url, {'stream': True, 'messages': [
+        {'role': 'user', 'content': 'Latest news about the stock market?'}
+    ]})
+    events = [line[len('data: '):] for line in body.decode('utf-8').splitlines() if line.startswith('data: ')]
+    chunks = [json.loads(event) for event in events if event != '[DONE]']
+    streamed = "".join(chunk['choices'][0]['delta'].get('content', '') for chunk in chunks)
+    checks.append(('streaming completion',
+                   status == 200 and headers.get('Content-Type') == 'text/event-stream'
+                   and events[-1:] == ['[DONE]'] and bool(streamed),
+                   f"status {status}, {len(chunks)} chunk(s)"))
+
+    # Session: the second turn is answered with the first one in its history
+    session = {'X-Session-Id': 'check-session'}
+    first_question = 'Who won the football match yesterday?'
+    post(base_url, {'messages': [{'role': 'user', 'content': first_question}]}, session)
+    llm.recent_requests.clear()
+    status, headers, _ = post(base_url, {'messages': [{'role': 'user', 'content': 'And who scored?'}]}, session)
+    sent = chat_requests(llm)
+    checks.append(('session keeps its history',
+                   status == 200 and headers.get('X-Session-Id') == 'check-session' and bool(sent)
+                   and any(first_question in m['content'] for m in sent[-1] if m['role'] == 'user'),
+                   f"status {status}"))
+
+    # Malformed request
+    status, _, body = post(base_url, {'messages': [{'role': 'assistant', 'content': 'hi'}]})
+    checks.append(('request without a final user message is rejected',
+                   status == 400 and 'error' in json.loads(body), f"status {status}"))
+
+    # A session id that could inject response headers is rejected before any turn runs
+    calls_before = llm.calls
+    status, headers, _ = post(base_url, {'session_id': 'evil\r\nSet-Cookie: x=1',
+                                         'messages': [{'role': 'user', 'content': 'hi'}]})
+    checks.append(('malformed session id is rejected',
+                   status == 400 and 'Set-Cookie' not in headers and llm.calls == calls_before,
+                   f"status {status}"))
+
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hermetic end-to-end check of the OpenAI-compatible server')
+    parser.add_argument('--verbose', action='store_true', help="Show the pipeline's output")
+    args = parser.parse_args()
+
+    llm = MockInferenceServer(latency=0.05, token_rate=500.0, reply_tokens=20).start()
+    pages = PageCorpusServer(latency=0.01).start()
+    FakeDDGS.urls = pages.urls()
+    FakeDDGS.latency = 0.05
+    configure_environment(f"{llm.base_url}/v1")
+
+    # Imported after configure_environment so module-level settings see the fakes
+    import websearch
+    from server import ChatServer
+
+    websearch.DDGS = FakeDDGS
+    output = io.StringIO()
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+        server = ChatServer(('127.0.0.1', 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            checks = run_checks(f"http://127.0.0.1:{server.server_port}", llm)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    for name, passed, detail in checks:
+        print(f"{'✅' if passed else '❌'} {name} ({detail})")
+    if not all(passed for _, passed, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Hermetic stand-ins for the pipeline's external services
+
+MockInferenceServer: OpenAI-compatible /v1/chat/completions with configurable latency and token rate
+FakeDDGS: Drop-in for ddgs.DDGS that returns hits pointing at a local page server
+PageCorpusServer: Serves a directory of recorded .html pages (or synthetic articles) over HTTP
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from bench_extract import load_corpus
+
+
+FILLER_WORDS = ("the report says prices rose sharply this week according to several analysts "
+                "who expect further changes as markets react to new data").split()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_one_request(self):
+        # Byte-capped page reads and abandoned streams hang up early by design
+        try:
+            super().handle_one_request()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class _BackgroundServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def start(self):
+        """Serve on a daemon thread and return self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class _InferenceHandler(_QuietHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        reply = self.server.reply_for(body)
+        model = body.get('model', 'mock')
+        words = reply.split(' ')
+        self.server.record_call(body)
+
+        # Time to first token, then the rest of the reply at the configured token rate
+        time.sleep(self.server.latency)
+        if not body.get('stream'):
+            time.sleep(len(words) / self.server.token_rate)
+            payload = json.dumps({
+                'id': 'mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': len(words), 'total_tokens': len(words)}
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i, word in enumerate(words):
+            chunk = {'id': 'mock', 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model,
+                     'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word}, 'finish_reason': None}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            time.sleep(1 / self.server.token_rate)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class MockInferenceServer(_BackgroundServer):
+    """
+    OpenAI-compatible chat completions server with configurable latency
+
+    Replies to yes/no prompts with needs_search, to JSON prompts with a search plan,
+    and to everything else with reply_tokens words (capped by max_tokens).
+
+    Args:
+        latency (float): Seconds before the first token
+        token_rate (float): Generated tokens per second
+        reply_tokens (int): Length of free-text replies
+        needs_search (bool): Answer to the needs-search check and the planner
+    """
+
+    def __init__(self, latency: float = 0.2, token_rate: float = 50.0, reply_tokens: int = 60, needs_search: bool = True):
+        super().__init__(('127.0.0.1', 0), _InferenceHandler)
+        self.latency = latency
+        self.token_rate = token_rate
+        self.reply_tokens = reply_tokens
+        self.needs_search = needs_search
+        self.calls = 0
+        self.recent_requests = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def record_call(self, body: dict):
+        with self._lock:
+            self.calls += 1
+            self.recent_requests.append(body)
+
+    def reply_for(self, body: dict) -> str:
+        prompt = body['messages'][-1]['content']
+        if "respond with only 'true' or 'false'" in prompt:
+            return 'true' if self.needs_search else 'false'
+        if "single JSON object" in prompt:
+            query = prompt.rsplit("Current query:", 1)[-1].strip()
+            return json.dumps({'needs_search': self.needs_search, 'context': 'No relevant context',
+                               'queries': [query] if self.needs_search else []})
+        length = min(self.reply_tokens, body.get('max_tokens') or self.reply_tokens)
+        return ' '.join(FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(length))
+
+
+class _PageHandler(_QuietHandler):
+    def do_GET(self):
+        page = self.server.pages.get(self.path.lstrip('/'))
+        time.sleep(self.server.latency)
+        if page is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+
+class PageCorpusServer(_BackgroundServer):
+    """
+    Serves recorded pages by file name
+
+    Args:
+        corpus_dir (str, optional): Directory of .html/.htm files (default: synthetic articles)
+        latency (float): Seconds before each response
+    """
+
+    def __init__(self, corpus_dir: str = None, latency: float = 0.05):
+        super().__init__(('127.0.0.1', 0), _PageHandler)
+        self.pages = load_corpus(corpus_dir) if corpus_dir else synthetic_articles()
+        self.latency = latency
+
+    def urls(self) -> list:
+        return [f"{self.base_url}/{name}" for name in sorted(self.pages)]
+
+
+def synthetic_articles(count: int = 5, paragraphs: int = 60) -> dict:
+    """News-like articles with scripts, navigation and footers around the body text"""
+    pages = {}
+    for n in range(count):
+        parts = [f"<html><head><title>Article {n}</title><script>" + "var t={};" * 500 + "</script></head><body>",
+                 "<nav>" + "<a href='#'>Section</a>" * 50 + "</nav>"]
+        for i in range(paragraphs):
+            parts.append(f"<p>Article {n} paragraph {i}: " + ' '.join(FILLER_WORDS) + ".</p>")
+        parts.append("<footer>" + "Cookie settings and legal links. " * 50 + "</footer></body></html>")
+        pages[f"article-{n}.html"] = "".join(parts).encode('utf-8')
+    return pages
+
+
+class FakeDDGS:
+    """
+    Drop-in for ddgs.DDGS returning hits from a PageCorpusServer
+
+    Set FakeDDGS.urls (and optionally FakeDDGS.latency) before use.
+    """
+
+    urls = []
+    latency = 0.3
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def text(self, query: str, max_results: int = 5) -> list:
+        time.sleep(self.latency)
+        return [{'href': url, 'title': f"Result {i} for {query}", 'body': f"Snippet {i} about {query}"}
+                for i, url in enumerate(self.urls[:max_results])]
@@ -6,15 +6,73 @@ Uses LLM functions to determine when web search is needed and processes results
 
 import os
 import sys
+import asyncio
+import threading
+from contextlib import aclosing
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
 import argparse
-from LLMfunc import get_llm_instruction_response_bool, get_llm_instruction_response, get_llm_chat_response
-from websearch import web_search
+from LLMfunc import (
+    aget_llm_instruction_response_bool,
+    aget_llm_instruction_response,
+    aget_llm_instruction_response_json,
+    aget_llm_chat_response,
+    astream_llm_chat_response,
+    awarm_up_connection,
+    get_connection_stats,
+    get_resilience_stats,
+)
+from websearch import (aiter_web_search, get_search_hits, fuse_hits, snippet_results, hit_budget, normalize_url,
+                       load_search_dependencies)
+from classifier import get_preclassifier
+from search_cache import get_search_cache, normalize_query, classify_query_ttl
+from ranking import select_passages
+from history import HistoryManager
+from memory import ConversationMemory
+from speculation import get_speculator
+from dedup import get_deduplicator
+from scheduler import get_scheduler
+from deadline import TurnDeadline, stage_estimate, default_turn_deadline, parse_duration
+from tracing import get_tracer, span, start_span, use_span, aiter_with_span
+
+
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
+
+def run_coroutine(coro):
+    """
+    Run a coroutine on the shared background event loop and wait for its result
+    
+    All chatbot sessions share one loop (and so one pool of async connections).
+    Must not be called from a coroutine running on that loop. On Ctrl+C the
+    coroutine is cancelled too, instead of running on in the background.
+    """
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            threading.Thread(target=_event_loop.run_forever, name='chatbot-event-loop', daemon=True).start()
+    if threading.current_thread().name == 'chatbot-event-loop':
+        coro.close()
+        raise RuntimeError("run_coroutine called from the chatbot event loop; await the async method instead")
+    future = asyncio.run_coroutine_threadsafe(coro, _event_loop)
+    try:
+        return future.result()
+    except KeyboardInterrupt:
+        future.cancel()
+        raise
+
 
 class HuggingFaceChatbot:
-    def __init__(self):
-        """Initialize the chatbot with web search capabilities"""
+    def __init__(self, verbose: bool = True):
+        """
+        Initialize the chatbot with web search capabilities
+        
+        Args:
+            verbose (bool): Print the startup banner (server sessions are created quietly)
+        """
+        self.verbose = verbose
+        
         # Load environment variables from .env file
         load_dotenv()
         
@@ -32,23 +90,43 @@ class HuggingFaceChatbot:
         self.instruction_model = os.getenv('HUGGINGFACE_INSTRUCTION_MODEL', 'Qwen/Qwen2.5-7B-Instruct-1M')
         self.max_tokens = int(os.getenv('MAX_TOKENS', '150'))
         self.temperature = float(os.getenv('TEMPERATURE', '0.7'))
+        self.stream = os.getenv('STREAM_RESPONSES', 'true').lower() == 'true'
+        self.use_planner = os.getenv('SEARCH_PLANNER', 'true').lower() == 'true'
+        self.max_search_queries = max(1, int(os.getenv('SEARCH_MAX_QUERIES', 3)))
+        self.summary_mode = os.getenv('SUMMARY_MODE', 'single').lower()
+        self.summary_deadline = float(os.getenv('SUMMARY_DEADLINE', 10))
+        # Optional per-turn latency budget in seconds (see TurnDeadline)
+        self.turn_deadline = default_turn_deadline()
+        self.turn_metadata = None
         
-        # Initialize Hugging Face Inference Client
-        try:
-            self.client = InferenceClient(api_key=self.api_token)
-            print("✅ Successfully connected to Hugging Face Inference Providers!")
-        except Exception as e:
-            print(f"❌ Failed to initialize Hugging Face client: {str(e)}")
-            sys.exit(1)
+        # Local pre-classifier answers obvious search decisions without an LLM call
+        self.preclassifier = get_preclassifier()
+        
+        # Optionally search for the raw input while the turn is being planned
+        self.speculator = get_speculator()
+        self.deduplicator = get_deduplicator()
+        
+        # The shared, connection-pooled Inference client is created on the first LLM call;
+        # interactive sessions warm it up in the background (see start_warmup)
+        self.warmup = os.getenv('STARTUP_WARMUP', 'true').lower() == 'true'
         
         # Load system prompt from file
         self.system_prompt = self.load_system_prompt()
         
+        # Keeps the history within the chat model's token budget
+        self.history_manager = HistoryManager(self.system_prompt)
+        
+        # Retrieval memory of past turns for search query clarification
+        self.memory = ConversationMemory()
+        
         # Conversation history for chat context (starts with system prompt)
         self.conversation_history = []
         if self.system_prompt:
             self.conversation_history.append({"role": "system", "content": self.system_prompt})
         
+        if not self.verbose:
+            return
+        
         print("🤗 AI Chatbot with Web Search initialized!")
         print(f"📡 Using model: {self.model}")
         print(f"🔍 Instruction model: {self.instruction_model}")
@@ -68,7 +146,8 @@ class HuggingFaceChatbot:
             if os.path.exists(system_prompt_file):
                 with open(system_prompt_file, 'r', encoding='utf-8') as f:
                     prompt = f.read().strip()
-                    print(f"📜 Loaded system prompt from: system_prompt.txt")
+                    if self.verbose:
+                        print(f"📜 Loaded system prompt from: system_prompt.txt")
                     return prompt
             else:
                 print("⚠️ No system_prompt.txt file found, using default behavior")
@@ -77,7 +156,27 @@ class HuggingFaceChatbot:
             print(f"⚠️ Error loading system prompt: {str(e)}")
             return None
 
-    def check_if_web_search_needed(self, user_query: str) -> bool:
+    def extend_system_prompt(self, instructions: str):
+        """
+        Append instructions to the system prompt for the rest of the session
+        
+        Used for a client's own system message in server mode: the history keeps a
+        single system message, so the client's instructions are merged into it.
+        
+        Args:
+            instructions (str): Text to add after the loaded system prompt
+        """
+        instructions = instructions.strip()
+        if not instructions:
+            return
+        self.system_prompt = f"{self.system_prompt}\n\n{instructions}" if self.system_prompt else instructions
+        self.history_manager.system_prompt = self.system_prompt
+        if self.conversation_history and self.conversation_history[0]['role'] == 'system':
+            self.conversation_history[0] = {"role": "system", "content": self.system_prompt}
+        else:
+            self.conversation_history.insert(0, {"role": "system", "content": self.system_prompt})
+
+    async def acheck_if_web_search_needed(self, user_query: str) -> bool:
         """
         Use LLM to determine if the user query requires web search
         """
@@ -97,7 +196,7 @@ class HuggingFaceChatbot:
             Answer 'true' if web search is needed, 'false' if the query can be answered with general knowledge.
             """
             
-            result = get_llm_instruction_response_bool(
+            result = await aget_llm_instruction_response_bool(
                 query_condition=query_condition,
                 content=user_query,
                 model=self.instruction_model,
@@ -110,11 +209,19 @@ class HuggingFaceChatbot:
             print(f"⚠️ Error checking web search requirement: {str(e)}")
             return False
 
-    def clarify_search_request(self, user_query: str) -> str:
+    async def aclarify_search_request(self, user_query: str, extract_context: bool = True) -> str:
         """
         Use LLM to clarify and optimize the search query using conversation context
+        
+        Args:
+            user_query (str): The user's message
+            extract_context (bool): Condense the conversation context with its own call first;
+                when False the retrieved context is used as is, saving one call
         """
         try:
+            # Only the latest messages and the older snippets relevant to this query
+            conversation_text = self.get_conversation_context(user_query)
+            
             # First, extract relevant context from conversation history
             context_extraction_instruction = """
             Based on the conversation history and the current user query, extract the most relevant context that would help optimize a web search.
@@ -127,24 +234,15 @@ class HuggingFaceChatbot:
             Return a brief summary (1-2 sentences) of the relevant context, or "No relevant context" if none exists.
             """
             
-            # Prepare conversation context (exclude system prompt and search contexts)
-            conversation_text = ""
-            for msg in self.conversation_history[1:]:  # Skip system prompt
-                if msg["role"] in ["user", "assistant"]:
-                    # Clean up any previous search contexts
-                    content = msg["content"]
-                    if "[WEB SEARCH CONTEXT]" in content:
-                        content = content.split("[WEB SEARCH CONTEXT]")[0].strip()
-                    if content.strip():
-                        conversation_text += f"{msg['role'].capitalize()}: {content}\n"
-            
             # Get relevant context from conversation
-            relevant_context = get_llm_instruction_response(
-                query_instruction=context_extraction_instruction,
-                content=f"Conversation history:\n{conversation_text}\n\nCurrent query: {user_query}",
-                model=self.instruction_model,
-                max_tokens=150
-            )
+            relevant_context = conversation_text
+            if extract_context:
+                relevant_context = await aget_llm_instruction_response(
+                    query_instruction=context_extraction_instruction,
+                    content=f"Conversation history:\n{conversation_text}\n\nCurrent query: {user_query}",
+                    model=self.instruction_model,
+                    max_tokens=150
+                )
             
             # Now optimize the search query with context
             clarification_instruction = """
@@ -157,7 +255,7 @@ class HuggingFaceChatbot:
             
             query_with_context = f"User query: {user_query}\n\nRelevant context: {relevant_context}"
             
-            clarified_query = get_llm_instruction_response(
+            clarified_query = await aget_llm_instruction_response(
                 query_instruction=clarification_instruction,
                 content=query_with_context,
                 model=self.instruction_model,
@@ -170,20 +268,152 @@ class HuggingFaceChatbot:
             print(f"⚠️ Error clarifying search request: {str(e)}")
             return user_query
 
-    def summarize_search_results(self, search_results: list, original_query: str) -> str:
+    def add_message(self, role: str, content: str):
+        """Append a message to the conversation history and index it in the retrieval memory"""
+        self.conversation_history.append({"role": role, "content": content})
+        self.memory.add(role, content)
+
+    def get_conversation_context(self, user_query: str) -> str:
+        """
+        Get the conversation context relevant to a query from the retrieval memory
+        
+        Returns the latest messages plus the older snippets (including past search
+        summaries) that best match the query, so its size does not grow with the session.
+        """
+        return self.memory.context(user_query) or "No previous conversation"
+
+    async def aplan_search(self, user_query: str):
+        """
+        Use a single LLM call to decide if web search is needed, extract relevant
+        conversation context and produce optimized search queries
+        
+        Returns:
+            dict: {'needs_search': bool, 'context': str, 'queries': list of str},
+            or None if the planner response could not be parsed
+        """
+        try:
+            planner_instruction = """
+            You plan web searches for a chatbot. Given the conversation history and the current user query, decide:
+            1. needs_search: true if the query requires current, real-time, or recent information (news, prices,
+               weather, sports results, recent releases, date-specific facts), false if general knowledge is enough.
+            2. context: a brief summary (1-2 sentences) of conversation context relevant to the query, or "No relevant context".
+            3. queries: if needs_search is true, 1 to 3 concise, specific web search queries that use the context
+               to add relevant terms; otherwise an empty list.
+            
+            Use exactly this format: {"needs_search": true, "context": "...", "queries": ["..."]}
+            """
+            
+            plan = await aget_llm_instruction_response_json(
+                query_instruction=planner_instruction,
+                content=f"Conversation history:\n{self.get_conversation_context(user_query)}\n\nCurrent query: {user_query}",
+                model=self.instruction_model,
+                max_tokens=200
+            )
+            
+            needs_search = plan.get("needs_search")
+            context = plan.get("context", "")
+            queries = plan.get("queries", [])
+            if not isinstance(needs_search, bool):
+                raise ValueError("'needs_search' must be a boolean")
+            if not isinstance(context, str):
+                raise ValueError("'context' must be a string")
+            if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+                raise ValueError("'queries' must be a list of strings")
+            
+            queries = [q.strip().strip('"').strip("'") for q in queries if q.strip()]
+            if needs_search and not queries:
+                raise ValueError("no search queries provided")
+            
+            return {"needs_search": needs_search, "context": context, "queries": queries}
+            
+        except Exception as e:
+            print(f"⚠️ Search planner failed, falling back to step-by-step analysis: {str(e)}")
+            return None
+
+    async def aplan_turn(self, user_input: str, deadline: TurnDeadline = None):
+        """
+        Decide whether the turn needs web search and which queries to run
+        
+        Obvious cases are decided by the local pre-classifier. Otherwise uses the
+        single-call planner when enabled, falling back to the separate needs-search
+        check and query clarification calls. With a turn deadline that is short on
+        time, clarification skips its context extraction call.
+        
+        Returns:
+            tuple: (needs_search, list of search queries)
+        """
+        print("🔍 Analyzing if web search is needed...")
+        local_decision = self.preclassifier.classify(user_input) if self.preclassifier else None
+        if local_decision is False:
+            return False, []
+        
+        if self.use_planner:
+            plan = await self.aplan_search(user_input)
+            if plan is not None:
+                if local_decision is None:
+                    if self.preclassifier:
+                        self.preclassifier.learn(user_input, plan["needs_search"])
+                    return plan["needs_search"], plan["queries"]
+                if plan["queries"]:
+                    return True, plan["queries"]
+        
+        if local_decision is None:
+            needs_search = await self.acheck_if_web_search_needed(user_input)
+            if self.preclassifier:
+                self.preclassifier.learn(user_input, needs_search)
+            if not needs_search:
+                return False, []
+        
+        # Clarify the search query with conversation context only once search is confirmed,
+        # so turns without search spend no instruction calls (or rate budget) on it
+        print("🧠 Analyzing conversation context for better search optimization...")
+        extract_context = not deadline or deadline.allows('llm.instruction', 'llm.instruction')
+        if not extract_context:
+            deadline.degrade('clarify', "context extraction skipped, query optimized in one call")
+        return True, [await self.aclarify_search_request(user_input, extract_context)]
+    
+    def local_plan(self, user_input: str, deadline: TurnDeadline, reason: str):
+        """
+        Plan the turn without LLM calls when the deadline leaves no time for it
+        
+        The pre-classifier's estimate decides (no search without one), and the raw
+        input is used as the search query.
+        
+        Returns:
+            tuple: (needs_search, list of search queries)
+        """
+        needs_search = bool(self.preclassifier) and self.preclassifier.probability(user_input) >= 0.5
+        deadline.degrade('plan', f"{reason}, decided locally to "
+                                 f"{'search the raw input' if needs_search else 'answer without search'}")
+        return needs_search, [user_input] if needs_search else []
+
+    async def asummarize_search_results(self, search_results: list, original_query: str, search_query: str = None,
+                                        cache_key: str = None) -> str:
         """
         Use LLM to summarize search results into a 200-word context
+        
+        Only the passages most relevant to the original and optimized queries are sent,
+        up to SUMMARY_TOKEN_BUDGET tokens across all sources. The summary is cached under
+        cache_key (by default, the question and the result URLs).
         """
         try:
+            # The same question answered from the same sources can reuse its summary
+            cache = get_search_cache()
+            cache_key = cache_key or self._summary_cache_key(search_results, original_query)
+            if cache:
+                summary = cache.get('summary', cache_key)
+                if summary:
+                    print("⚡ Using cached summary")
+                    return summary
+            
+            # Keep the passages that best match the question instead of each page's head
+            relevant_results = select_passages(search_results, [original_query, search_query])
+            
             # Combine all search results into a single text
             combined_content = ""
-            for i, result in enumerate(search_results, 1):
+            for i, result in enumerate(relevant_results, 1):
                 combined_content += f"Source {i} ({result['title']}):\n{result['content']}\n\n"
             
-            # Limit content to avoid token limits
-            if len(combined_content) > 8000:
-                combined_content = combined_content[:8000] + "..."
-            
             summarization_instruction = f"""
             Based on the following web search results, provide a comprehensive summary in exactly 200 words that directly answers this question: "{original_query}"
             
@@ -196,86 +426,484 @@ class HuggingFaceChatbot:
             Make the summary informative, accurate, and well-structured. Use exactly 200 words.
             """
             
-            summary = get_llm_instruction_response(
+            summary = await aget_llm_instruction_response(
                 query_instruction=summarization_instruction,
                 content=combined_content,
                 model=self.instruction_model,
                 max_tokens=200
             )
             
+            if cache:
+                cache.set('summary', cache_key, summary, classify_query_ttl(original_query))
+            
             return summary
             
         except Exception as e:
             print(f"⚠️ Error summarizing search results: {str(e)}")
             return "Error occurred while summarizing search results."
 
-    def get_ai_response_with_search(self, user_input: str):
-        """Get AI response with optional web search integration"""
+    def _summary_cache_key(self, search_results: list, original_query: str) -> str:
+        """Key of the summary for a question and its sources (hits or fetched results), whatever their order"""
+        urls = sorted(normalize_url(result.get('href') or result.get('url', '')) for result in search_results)
+        return "|".join([normalize_query(original_query)] + urls)
+
+    async def asummarize_source(self, result: dict, original_query: str, search_query: str = None) -> str:
+        """
+        Summarize one search source (the map step of map-reduce summarization)
+        
+        Each source gets the full SUMMARY_TOKEN_BUDGET of relevant passages.
+        """
+        with span('summarize_source', url=result['url']):
+            relevant_results = select_passages([result], [original_query, search_query])
+            if not relevant_results:
+                return ""
+            
+            source_instruction = f"""
+            Summarize what this web page says that helps answer this question: "{original_query}"
+            
+            Keep key facts, numbers, dates and names. Use at most 80 words.
+            If the page has nothing relevant to the question, reply with "Nothing relevant".
+            """
+            
+            return await aget_llm_instruction_response(
+                query_instruction=source_instruction,
+                content=f"{result['title']}:\n{relevant_results[0]['content']}",
+                model=self.instruction_model,
+                max_tokens=120
+            )
+
+    async def amap_reduce_search_results(self, search_results: list, original_query: str, search_query: str = None,
+                                         source_summaries: dict = None, cache_key: str = None) -> str:
+        """
+        Summarize each source with its own call, then merge the partial summaries into a 200-word context
+        
+        Args:
+            search_results (list): Search results ('url', 'title', 'content')
+            original_query (str): The user's question
+            search_query (str, optional): The optimized search query
+            source_summaries (dict, optional): URL -> task of map calls already started while
+                pages were downloading; the other sources are summarized now
+            cache_key (str, optional): Summary cache key (default: the question and the result URLs)
+        
+        Sources whose summary is not ready within summary_deadline seconds are left out.
+        """
+        tasks = dict(source_summaries or {})
         try:
-            # Check if web search is needed
-            print("🔍 Analyzing if web search is needed...")
-            needs_search = self.check_if_web_search_needed(user_input)
+            cache = get_search_cache()
+            cache_key = cache_key or self._summary_cache_key(search_results, original_query)
+            if cache:
+                summary = cache.get('summary', cache_key)
+                if summary:
+                    print("⚡ Using cached summary")
+                    return summary
             
-            search_context = ""
-            if needs_search:
-                print("🌐 Web search required - performing search...")
+            for result in search_results:
+                if result['url'] not in tasks:
+                    tasks[result['url']] = asyncio.create_task(self.asummarize_source(result, original_query, search_query))
+            source_tasks = [tasks[result['url']] for result in search_results]
+            
+            with span('summarize_map', sources=len(source_tasks)) as map_span:
+                done, not_done = await asyncio.wait(source_tasks, timeout=self.summary_deadline)
+                if not_done:
+                    print(f"⏱️ Summary deadline reached, leaving out {len(not_done)} slow source(s)")
+                map_span.set(left_out=len(not_done))
+            
+            partials = []
+            for result, task in zip(search_results, source_tasks):
+                if task not in done or task.cancelled():
+                    continue
+                if task.exception():
+                    print(f"⚠️ Error summarizing {result['url']}: {str(task.exception())}")
+                    continue
+                partial = task.result().strip()
+                if partial and not partial.lower().startswith("nothing relevant"):
+                    partials.append((result, partial))
+            
+            if not partials:
+                return "No search source could be summarized in time."
+            
+            if len(partials) == 1:
+                summary = partials[0][1]
+            else:
+                combined_content = ""
+                for i, (result, partial) in enumerate(partials, 1):
+                    combined_content += f"Source {i} ({result['title']}):\n{partial}\n\n"
                 
-                # Clarify the search query with conversation context
-                print("🧠 Analyzing conversation context for better search optimization...")
-                search_query = self.clarify_search_request(user_input)
-                print(f"🔎 Context-optimized search query: {search_query}")
+                reduce_instruction = f"""
+                Merge the following summaries of web search results into one summary of at most 200 words that directly answers this question: "{original_query}"
                 
-                # Perform web search
-                search_results = web_search(search_query, num_results=3)
+                Keep the key facts, resolve overlaps, and mention sources when relevant.
+                """
                 
-                if search_results:
-                    print(f"📊 Found {len(search_results)} results, summarizing...")
-                    
-                    # Summarize search results
-                    search_summary = self.summarize_search_results(search_results, user_input)
-                    
-                    # Add search context to conversation
-                    search_context = f"\n\n[WEB SEARCH CONTEXT]\n{search_summary}\n[END CONTEXT]\n"
-                    print("✅ Search completed and summarized")
-                else:
-                    print("⚠️ No search results found")
-                    search_context = "\n\n[WEB SEARCH CONTEXT]\nNo current information found for this query.\n[END CONTEXT]\n"
-            else:
-                print("💭 Using general knowledge (no web search needed)")
+                summary = await aget_llm_instruction_response(
+                    query_instruction=reduce_instruction,
+                    content=combined_content,
+                    model=self.instruction_model,
+                    max_tokens=200
+                )
             
-            # Add user message with search context to conversation history
-            user_message_with_context = user_input + search_context
-            self.conversation_history.append({"role": "user", "content": user_message_with_context})
+            # A summary missing sources is only good for this turn
+            if cache and not not_done:
+                cache.set('summary', cache_key, summary, classify_query_ttl(original_query))
             
-            # Keep conversation history manageable (last 10 exchanges)
-            if len(self.conversation_history) > 21:  # 1 system + 20 messages
-                # Keep system message and last 18 user/assistant messages
-                system_msg = self.conversation_history[0] if self.conversation_history[0]["role"] == "system" else None
-                recent_messages = self.conversation_history[-18:]
-                self.conversation_history = ([system_msg] if system_msg else []) + recent_messages
+            return summary
             
-            # Get AI response using the chat function
-            ai_response = get_llm_chat_response(
-                messages=self.conversation_history,
+        except Exception as e:
+            print(f"⚠️ Error summarizing search results: {str(e)}")
+            return "Error occurred while summarizing search results."
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    def raw_search_context(self, search_results: list, original_query: str, search_query: str = None) -> str:
+        """
+        Search context built from the sources themselves, for turns with no time to summarize
+        
+        Keeps the passages most relevant to the queries, up to RAW_CONTEXT_TOKENS tokens.
+        """
+        token_budget = int(os.getenv('RAW_CONTEXT_TOKENS', 600))
+        relevant_results = select_passages(search_results, [original_query, search_query], token_budget)
+        return "\n\n".join(f"Source {i} ({result['title']}, {result['url']}):\n{result['content']}"
+                           for i, result in enumerate(relevant_results, 1))
+
+    async def asearch_hits(self, search_queries: list, deadline: TurnDeadline = None, num_results: int = 3) -> list:
+        """
+        Look up every query concurrently (through the hit cache) and fuse the hits by reciprocal rank
+        
+        Returns:
+            list: The hits aiter_web_search would fetch for num_results good pages; empty if
+            the lookup fails or runs out of the turn's time
+        """
+        limit = hit_budget(num_results)
+        try:
+            hit_lists = await asyncio.wait_for(
+                asyncio.gather(*(asyncio.to_thread(get_search_hits, query, limit) for query in search_queries)),
+                timeout=max(0.0, deadline.remaining()) if deadline else None)
+        except asyncio.TimeoutError:
+            print("⚠️ Search ran out of time looking up results")
+            return []
+        except Exception as e:
+            print(f"Error during search: {str(e)}")
+            return []
+        return fuse_hits(hit_lists, limit=limit)
+
+    async def aprepare_conversation(self, user_input: str, deadline: TurnDeadline = None):
+        """
+        Run web search if needed and add the user message to conversation history
+        
+        With a turn deadline, stages that would not fit in the time left take cheaper
+        paths: planning without LLM calls, search snippets instead of fetched pages,
+        or source passages instead of a summary (see TurnDeadline). Each decision is
+        recorded on the deadline.
+        """
+        # Speculatively search for the raw input unless it clearly needs no search
+        speculation = None
+        if self.speculator and (not self.preclassifier or
+                                self.preclassifier.probability(user_input) > self.preclassifier.no_search_threshold):
+            speculation = self.speculator.start(user_input, num_results=3)
+        
+        # Check if web search is needed and get context-optimized queries
+        if deadline and not deadline.allows('plan_turn'):
+            # Not timed as plan_turn, so skipped planning does not lower its estimate
+            needs_search, search_queries = self.local_plan(user_input, deadline, "no time to plan")
+        else:
+            with span('plan_turn') as plan_span:
+                try:
+                    needs_search, search_queries = await asyncio.wait_for(
+                        self.aplan_turn(user_input, deadline), timeout=max(0.0, deadline.remaining()) if deadline else None)
+                except asyncio.TimeoutError:
+                    needs_search, search_queries = self.local_plan(user_input, deadline, "planning ran out of time")
+                plan_span.set(needs_search=needs_search, queries=len(search_queries))
+        
+        # With a deadline, pages are only fetched if there is time, and only summarized if there is time left after that
+        search_mode = 'pages'
+        if needs_search and deadline and not deadline.allows('web_search'):
+            search_mode = 'snippets' if deadline.allows('search_hits') else 'skip'
+            deadline.degrade('search', "using search result snippets instead of fetching pages" if search_mode == 'snippets'
+                                       else "search skipped, answering from general knowledge")
+        
+        # Snippets are looked up first, so a failed or slow lookup can still fall back to skipping search
+        snippets = None
+        if needs_search and search_mode == 'snippets':
+            try:
+                hit_lists = await asyncio.wait_for(
+                    asyncio.gather(*(asyncio.to_thread(get_search_hits, query, 3)
+                                     for query in search_queries[:self.max_search_queries])),
+                    timeout=max(0.0, deadline.remaining()))
+                snippets = snippet_results(fuse_hits(hit_lists, limit=3))
+            except Exception as e:
+                reason = "ran out of time" if isinstance(e, asyncio.TimeoutError) else f"failed: {str(e)}"
+                search_mode = 'skip'
+                deadline.degrade('search', f"snippet lookup {reason}, answering from general knowledge")
+        
+        search_context = ""
+        if needs_search and search_mode != 'skip':
+            print("🌐 Web search required - performing search...")
+            
+            search_queries = search_queries[:self.max_search_queries]
+            search_query = " ".join(search_queries)
+            for query in search_queries:
+                print(f"🔎 Context-optimized search query: {query}")
+            
+            # Perform web search, reusing the speculative search if it is close enough
+            search_results = None
+            if speculation and len(search_queries) == 1 and search_mode == 'pages':
+                search_results = await self.speculator.resolve(speculation, search_query, num_results=3)
+            elif speculation:
+                # A single speculative query can't stand in for a fan-out or a search without pages
+                self.speculator.discard(speculation, 'wasted_mismatch')
+            source_summaries = {}
+            cached_summary = None
+            summary_key = None
+            dedup_turn = self.deduplicator.start_turn() if self.deduplicator and search_mode == 'pages' else None
+            if search_results is not None and dedup_turn:
+                search_results = [{**result, 'content': dedup_turn.clean(result['url'], result['content'])}
+                                  for result in search_results]
+                search_results = [result for result in search_results if result['content']]
+            if search_mode == 'snippets':
+                search_results = snippets
+            elif search_results is None:
+                search_results = []
+                # Hits come from the hit cache when possible, so a repeated question finds its
+                # cached summary before any page is fetched
+                hits = await self.asearch_hits(search_queries, deadline)
+                summary_key = self._summary_cache_key(hits, user_input)
+                cache = get_search_cache()
+                cached_summary = cache.get('summary', summary_key) if cache and hits else None
+                if not cached_summary and hits:
+                    time_budget = None
+                    if deadline:
+                        # Leave time to summarize if there is enough for both
+                        summary_time = stage_estimate('summarize') if deadline.allows('web_search', 'summarize') else 0.0
+                        time_budget = min(float(os.getenv('SEARCH_TIME_BUDGET', 15)), max(0.0, deadline.remaining() - summary_time))
+                    # Several queries share one fetch budget; their hits are fused and deduplicated
+                    async with aclosing(aiter_web_search(search_queries, num_results=3, time_budget=time_budget,
+                                                         search_results=hits, dedup=dedup_turn)) as pages:
+                        async for result in pages:
+                            search_results.append(result)
+                            # In map-reduce mode each source is summarized as soon as its page arrives
+                            if self.summary_mode == 'map_reduce':
+                                source_summaries[result['url']] = asyncio.create_task(
+                                    self.asummarize_source(result, user_input, search_query))
+            
+            if dedup_turn:
+                dedup_report = dedup_turn.report()
+                if dedup_report['duplicates'] or dedup_report['boilerplate']:
+                    print(f"🧹 Removed {dedup_report['duplicates']} duplicate and {dedup_report['boilerplate']} boilerplate "
+                          f"passages (~{dedup_report['tokens_saved']} tokens saved)")
+            
+            if cached_summary:
+                print("⚡ Using cached summary")
+                search_context = f"\n\n[WEB SEARCH CONTEXT]\n{cached_summary}\n[END CONTEXT]\n"
+                print("✅ Search completed from the summary cache")
+            elif search_results and deadline and (search_mode == 'snippets' or not deadline.allows('summarize')):
+                for task in source_summaries.values():
+                    task.cancel()
+                if search_mode == 'pages':
+                    deadline.degrade('summarize', "summary skipped, injecting the most relevant source passages")
+                search_context = f"\n\n[WEB SEARCH CONTEXT]\n{self.raw_search_context(search_results, user_input, search_query)}\n[END CONTEXT]\n"
+                print("✅ Search completed (sources injected without summarizing)")
+            elif search_results:
+                print(f"📊 Found {len(search_results)} results, summarizing...")
+                
+                # Summarize search results
+                with span('summarize', sources=len(search_results), mode=self.summary_mode,
+                          tokens_saved=dedup_report['tokens_saved'] if dedup_turn else None):
+                    if self.summary_mode == 'map_reduce':
+                        summarizing = self.amap_reduce_search_results(search_results, user_input, search_query,
+                                                                      source_summaries, cache_key=summary_key)
+                    else:
+                        summarizing = self.asummarize_search_results(search_results, user_input, search_query,
+                                                                     cache_key=summary_key)
+                    try:
+                        search_summary = await asyncio.wait_for(
+                            summarizing, timeout=max(0.0, deadline.remaining()) if deadline else None)
+                    except asyncio.TimeoutError:
+                        deadline.degrade('summarize', "summary ran out of time, injecting the most relevant source passages")
+                        search_summary = self.raw_search_context(search_results, user_input, search_query)
+                
+                # Add search context to conversation
+                search_context = f"\n\n[WEB SEARCH CONTEXT]\n{search_summary}\n[END CONTEXT]\n"
+                print("✅ Search completed and summarized")
+            else:
+                for task in source_summaries.values():
+                    task.cancel()
+                print("⚠️ No search results found")
+                search_context = "\n\n[WEB SEARCH CONTEXT]\nNo current information found for this query.\n[END CONTEXT]\n"
+        else:
+            if not needs_search:
+                print("💭 Using general knowledge (no web search needed)")
+            if speculation:
+                self.speculator.discard(speculation)
+        
+        # Add user message with search context to conversation history
+        user_message_with_context = user_input + search_context
+        self.add_message("user", user_message_with_context)
+        
+        # Keep conversation history within the model's token budget
+        with span('history_trim'):
+            self.conversation_history = self.history_manager.trim(
+                self.conversation_history,
                 model=self.model,
-                max_tokens=self.max_tokens
+                reserve_tokens=self.max_tokens,
+                summary_model=self.instruction_model
+            )
+
+    def start_turn_deadline(self):
+        """Start the latency budget of a turn, or return None if turns have no deadline"""
+        return TurnDeadline(self.turn_deadline) if self.turn_deadline else None
+
+    def record_turn_metadata(self, deadline: TurnDeadline, turn_span):
+        """Keep the deadline decisions of the turn in turn_metadata and on the turn span"""
+        self.turn_metadata = deadline.metadata() if deadline else None
+        if self.turn_metadata:
+            turn_span.set(
+                deadline_s=self.turn_metadata['deadline_s'],
+                prepare_ms=round(self.turn_metadata['prepare_s'] * 1000, 1),
+                degradations="; ".join(f"{d['stage']}: {d['action']}" for d in self.turn_metadata['degradations']) or None
             )
+
+    async def respond(self, user_input: str, raise_errors: bool = False) -> str:
+        """
+        Get AI response with optional web search integration (async pipeline)
+        
+        Independent stages overlap on the event loop, and one loop can serve many
+        chatbot sessions at once. Errors are returned as a user-facing message unless
+        raise_errors is set.
+        """
+        try:
+            with span('turn', stream=False) as turn_span:
+                deadline = self.start_turn_deadline()
+                await self.aprepare_conversation(user_input, deadline)
+                self.record_turn_metadata(deadline, turn_span)
+                
+                # Get AI response using the chat function
+                with span('chat_response', model=self.model):
+                    ai_response = await aget_llm_chat_response(
+                        messages=self.conversation_history,
+                        model=self.model,
+                        max_tokens=self.max_tokens
+                    )
             
             # Add AI response to conversation history
-            self.conversation_history.append({"role": "assistant", "content": ai_response})
+            self.add_message("assistant", ai_response)
             
             return ai_response
             
         except Exception as e:
-            error_msg = str(e)
-            if "Model" in error_msg and "not found" in error_msg:
-                return f"❌ Model '{self.model}' not available. Try: google/gemma-2-2b-it, meta-llama/Meta-Llama-3.1-8B-Instruct, or microsoft/phi-4"
-            elif "token" in error_msg.lower() or "unauthorized" in error_msg.lower():
-                return "❌ Invalid token. Please check your HUGGINGFACE_API_TOKEN in .env file"
-            elif "quota" in error_msg.lower() or "rate" in error_msg.lower():
-                return "⚠️ Rate limit reached. Please wait a moment before trying again."
-            else:
-                return f"❌ Error: {error_msg}"
+            if raise_errors:
+                raise
+            return self.format_error(e)
+
+    async def respond_stream(self, user_input: str, raise_errors: bool = False):
+        """
+        Stream AI response with optional web search integration (async pipeline)
+        
+        Yields pieces of the response as they arrive; the complete response is added
+        to conversation history once the stream finishes. Errors are yielded as a
+        user-facing message unless raise_errors is set.
+        """
+        # Spans are not made current across yields; each step may run in a different task
+        turn_span = start_span('turn', stream=True)
+        error = None
+        try:
+            with use_span(turn_span):
+                deadline = self.start_turn_deadline()
+                await self.aprepare_conversation(user_input, deadline)
+                self.record_turn_metadata(deadline, turn_span)
+            
+            chat_span = start_span('chat_response', parent=turn_span, model=self.model)
+            ai_response = ""
+            try:
+                async for token in aiter_with_span(astream_llm_chat_response(
+                    messages=self.conversation_history,
+                    model=self.model,
+                    max_tokens=self.max_tokens
+                ), chat_span):
+                    # Drop leading whitespace so the output lines up like the non-streaming path
+                    if not ai_response:
+                        token = token.lstrip()
+                        if not token:
+                            continue
+                        turn_span.set(first_token_ms=round(turn_span.elapsed_ms(), 1))
+                    ai_response += token
+                    yield token
+            finally:
+                chat_span.end()
+            
+            # Add the complete AI response to conversation history
+            self.add_message("assistant", ai_response.strip())
+            
+        except Exception as e:
+            error = e
+            if raise_errors:
+                raise
+            yield self.format_error(e)
+        finally:
+            turn_span.end(error)
+
+    # Synchronous API: thin wrappers that run the async pipeline on the shared event loop
+
+    def check_if_web_search_needed(self, user_query: str) -> bool:
+        """Use LLM to determine if the user query requires web search"""
+        return run_coroutine(self.acheck_if_web_search_needed(user_query))
+
+    def clarify_search_request(self, user_query: str) -> str:
+        """Use LLM to clarify and optimize the search query using conversation context"""
+        return run_coroutine(self.aclarify_search_request(user_query))
+
+    def plan_search(self, user_query: str):
+        """Use a single LLM call to plan the web search (see aplan_search)"""
+        return run_coroutine(self.aplan_search(user_query))
+
+    def plan_turn(self, user_input: str):
+        """Decide whether the turn needs web search and which queries to run (see aplan_turn)"""
+        return run_coroutine(self.aplan_turn(user_input))
+
+    def summarize_search_results(self, search_results: list, original_query: str, search_query: str = None) -> str:
+        """Use LLM to summarize search results into a 200-word context"""
+        return run_coroutine(self.asummarize_search_results(search_results, original_query, search_query))
+
+    def map_reduce_search_results(self, search_results: list, original_query: str, search_query: str = None) -> str:
+        """Summarize each source separately and merge the partial summaries into a 200-word context"""
+        return run_coroutine(self.amap_reduce_search_results(search_results, original_query, search_query))
+
+    def prepare_conversation(self, user_input: str):
+        """Run web search if needed and add the user message to conversation history"""
+        return run_coroutine(self.aprepare_conversation(user_input))
+
+    def get_ai_response_with_search(self, user_input: str, raise_errors: bool = False):
+        """Get AI response with optional web search integration"""
+        return run_coroutine(self.respond(user_input, raise_errors))
+
+    def stream_ai_response_with_search(self, user_input: str, raise_errors: bool = False):
+        """
+        Stream AI response with optional web search integration
+        
+        Yields pieces of the response as they arrive; the complete response is added
+        to conversation history once the stream finishes.
+        """
+        stream = self.respond_stream(user_input, raise_errors)
+        try:
+            while True:
+                try:
+                    yield run_coroutine(stream.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            run_coroutine(stream.aclose())
+
+    def format_error(self, e: Exception) -> str:
+        """Turn an exception from the response pipeline into a user-facing message"""
+        error_msg = str(e)
+        if "Model" in error_msg and "not found" in error_msg:
+            return f"❌ Model '{self.model}' not available. Try: google/gemma-2-2b-it, meta-llama/Meta-Llama-3.1-8B-Instruct, or microsoft/phi-4"
+        elif "token" in error_msg.lower() or "unauthorized" in error_msg.lower():
+            return "❌ Invalid token. Please check your HUGGINGFACE_API_TOKEN in .env file"
+        elif "quota" in error_msg.lower() or "rate" in error_msg.lower():
+            return "⚠️ Rate limit reached. Please wait a moment before trying again."
+        else:
+            return f"❌ Error: {error_msg}"
 
     def clear_history(self):
         """Clear conversation history but keep system prompt"""
@@ -283,6 +911,8 @@ class HuggingFaceChatbot:
             self.conversation_history = [{"role": "system", "content": self.system_prompt}]
         else:
             self.conversation_history = []
+        self.history_manager.reset()
+        self.memory.clear()
         print("🧹 Conversation history cleared!")
 
     def show_help(self):
@@ -291,6 +921,7 @@ class HuggingFaceChatbot:
         print("  help    - Show this help message")
         print("  clear   - Clear conversation history")
         print("  status  - Show current settings")
+        print("  stats   - Show timing statistics for each pipeline stage")
         print("  models  - Show recommended models you can try")
         print("  search  - Toggle web search mode")
         print("  quit    - Exit the chatbot")
@@ -308,10 +939,97 @@ class HuggingFaceChatbot:
         print(f"  Instruction Model: {self.instruction_model}")
         print(f"  Temperature: {self.temperature}")
         print(f"  Max tokens: {self.max_tokens}")
+        print(f"  Streaming: {'✅ Enabled' if self.stream else '❌ Disabled'}")
         print(f"  System prompt: {'✅ Loaded' if self.system_prompt else '❌ Not loaded'}")
-        print(f"  Conversation length: {len(self.conversation_history)} messages")
+        history_stats = self.history_manager.stats(self.conversation_history, self.model)
+        print(f"  Conversation length: {len(self.conversation_history)} messages "
+              f"(~{history_stats['tokens']}/{history_stats['budget']} tokens"
+              f"{', older turns summarized' if history_stats['summary'] else ''})")
         print(f"  Using: Hugging Face Inference Providers")
         print(f"  Web Search: ✅ Enabled with intelligent detection")
+        print(f"  Search planner: {'✅ Single-call planner' if self.use_planner else '❌ Step-by-step analysis'}")
+        if self.summary_mode == 'map_reduce':
+            print(f"  Summarization: 🧩 Map-reduce per source ({self.summary_deadline:g}s deadline)")
+        else:
+            print("  Summarization: Single call")
+        if self.turn_deadline:
+            print(f"  Turn deadline: {self.turn_deadline:g}s (stages degrade to fit)")
+        else:
+            print("  Turn deadline: ❌ None")
+        if self.preclassifier:
+            classifier_stats = self.preclassifier.stats()
+            print(f"  Pre-classifier: {classifier_stats['hit_rate']:.0%} decided locally "
+                  f"({classifier_stats['local_search'] + classifier_stats['local_no_search']} local, "
+                  f"{classifier_stats['escalated']} escalated)")
+        else:
+            print("  Pre-classifier: ❌ Disabled")
+        cache = get_search_cache()
+        if cache:
+            cache_stats = cache.stats()
+            print(f"  Search cache: {cache_stats['hit_rate']:.0%} hit rate "
+                  f"({cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, {cache_stats['misses']} misses, "
+                  f"{cache_stats['entries']} entries)")
+        else:
+            print("  Search cache: ❌ Disabled")
+        if self.speculator:
+            speculation_stats = self.speculator.stats()
+            print(f"  Speculative search: {speculation_stats['hit_rate']:.0%} reused "
+                  f"({speculation_stats['hits']} hits, {speculation_stats['wasted_no_search']} not needed, "
+                  f"{speculation_stats['wasted_mismatch']} query changed, "
+                  f"{speculation_stats['wasted_requests']} wasted requests)")
+        else:
+            print("  Speculative search: ❌ Disabled")
+        if self.deduplicator:
+            dedup_stats = self.deduplicator.stats()
+            print(f"  Deduplication: {dedup_stats['saved_rate']:.0%} of page tokens removed "
+                  f"({dedup_stats['tokens_saved']} tokens over {dedup_stats['turns']} searches, "
+                  f"{dedup_stats['duplicates']} duplicate / {dedup_stats['boilerplate']} boilerplate passages, "
+                  f"{dedup_stats['domains']} sites learned)")
+        else:
+            print("  Deduplication: ❌ Disabled")
+        resilience_stats = get_resilience_stats()
+        print(f"  LLM resilience: {resilience_stats['retries']} retries, {resilience_stats['fallbacks']} fallbacks, "
+              f"{resilience_stats['hedges']} hedged ({resilience_stats['hedge_wins']} won), "
+              f"{resilience_stats['failures']} failed calls")
+        connection_stats = get_connection_stats()
+        print(f"  Connections: {connection_stats['new_connections']} opened, "
+              f"{connection_stats['reused_connections']} reused "
+              f"(pool size {connection_stats['pool_size']})")
+        print()
+
+    def show_stats(self):
+        """Show latency histograms of pipeline stages, LLM calls and page fetches"""
+        stats = get_tracer().stats()
+        if not stats['spans']:
+            print("\n📈 No timings recorded yet - ask something first")
+            print()
+            return
+        
+        print("\n📈 Stage timings (ms):")
+        print(f"  {'stage':<20} {'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8} {'errors':>7}")
+        for name, summary in stats['spans'].items():
+            print(f"  {name:<20} {summary['count']:>6} {summary['mean_ms']:>8.0f} {summary['p50_ms']:>8.0f} "
+                  f"{summary['p95_ms']:>8.0f} {summary['max_ms']:>8.0f} {summary['errors']:>7}")
+        for model, tokens in stats['tokens'].items():
+            print(f"  🔢 {model}: {tokens['calls']} calls, {tokens['input_tokens']} input / "
+                  f"{tokens['output_tokens']} output tokens")
+        print(f"  📥 Fetched: {stats['fetched_bytes'] / 1024:.0f} KB")
+        for model, health in get_resilience_stats()['models'].items():
+            latency = f"{health['mean_latency']:.2f}s mean, {health['p95_latency']:.2f}s p95" if health['mean_latency'] is not None else "latency not measured"
+            print(f"  🩺 {model}: {latency}, {health['error_rate']:.0%} errors over {health['calls']} recent calls")
+        scheduler_stats = get_scheduler().stats()
+        for upstream, queue in scheduler_stats['upstreams'].items():
+            rate = f"{queue['rate']:.2g}/s" if queue['rate'] is not None else "unlimited"
+            throttled = f", {queue['throttled']} rate limited ({queue['rate_factor']:.0%} of rate)" if queue['throttled'] else ""
+            print(f"  🚦 {upstream}: {queue['requests']} requests at {rate}, {queue['queued']} queued "
+                  f"(max depth {queue['max_queue_depth']}), {queue['mean_wait_seconds'] * 1000:.0f} ms mean / "
+                  f"{queue['max_wait_seconds'] * 1000:.0f} ms max wait{throttled}")
+        waits = [f"{name} {queue['mean_wait_seconds'] * 1000:.0f} ms" for name, queue in scheduler_stats['priorities'].items() if queue['requests']]
+        if waits:
+            print(f"  ⏳ Mean wait by priority: {', '.join(waits)}")
+        tracer = get_tracer()
+        if tracer.export_path:
+            print(f"  💾 Exporting spans to {tracer.export_path} ({tracer.export_format})")
         print()
 
     def show_models(self):
@@ -332,8 +1050,26 @@ class HuggingFaceChatbot:
         print("💡 These models are available through Hugging Face Inference Providers")
         print()
 
+    def start_warmup(self):
+        """
+        Prepare for the first turn in a background thread while the user types
+        
+        Imports the search dependencies and opens the inference connection. Failures
+        are ignored here; the first turn reports them.
+        """
+        def warm_up():
+            try:
+                load_search_dependencies()
+                run_coroutine(awarm_up_connection())
+            except Exception:
+                pass
+        
+        threading.Thread(target=warm_up, name='startup-warmup', daemon=True).start()
+
     def run(self):
         """Main chat loop"""
+        if self.warmup:
+            self.start_warmup()
         try:
             while True:
                 # Get user input
@@ -356,20 +1092,61 @@ class HuggingFaceChatbot:
                 elif user_input.lower() == 'status':
                     self.show_status()
                     continue
+                elif user_input.lower() == 'stats':
+                    self.show_stats()
+                    continue
                 elif user_input.lower() == 'models':
                     self.show_models()
                     continue
                 
                 # Get AI response with web search integration
                 print("\n🤖 AI: ", end="", flush=True)
-                response = self.get_ai_response_with_search(user_input)
-                print(response)
+                if self.stream:
+                    for token in self.stream_ai_response_with_search(user_input):
+                        print(token, end="", flush=True)
+                    print()
+                else:
+                    response = self.get_ai_response_with_search(user_input)
+                    print(response)
                 
         except KeyboardInterrupt:
             print("\n\n👋 Goodbye!")
         except Exception as e:
             print(f"\n❌ Unexpected error: {str(e)}")
 
+def create_chatbot(settings: dict = None) -> HuggingFaceChatbot:
+    """
+    Create a quiet chatbot for server sessions and batch prompts
+    
+    Args:
+        settings (dict, optional): Chatbot attributes to override (see get_settings_overrides)
+    """
+    chatbot = HuggingFaceChatbot(verbose=False)
+    for name, value in (settings or {}).items():
+        setattr(chatbot, name, value)
+    return chatbot
+
+
+def get_settings_overrides(args) -> dict:
+    """Collect the command line overrides that apply to every server session or batch prompt"""
+    settings = {}
+    if args.model:
+        settings['model'] = args.model
+    if args.instruction_model:
+        settings['instruction_model'] = args.instruction_model
+    if args.temperature is not None:
+        settings['temperature'] = args.temperature
+    if args.max_tokens:
+        settings['max_tokens'] = args.max_tokens
+    if args.no_planner:
+        settings['use_planner'] = False
+    if args.summary_mode:
+        settings['summary_mode'] = args.summary_mode
+    if args.turn_deadline is not None:
+        settings['turn_deadline'] = args.turn_deadline or None
+    return settings
+
+
 def main():
     """Main function with command line argument support"""
     parser = argparse.ArgumentParser(description='AI Chatbot with Web Search Integration')
@@ -378,9 +1155,45 @@ def main():
     parser.add_argument('--instruction-model', help='Override the Hugging Face instruction model')
     parser.add_argument('--temperature', type=float, help='Override the temperature setting')
     parser.add_argument('--max-tokens', type=int, help='Override the max tokens setting')
+    parser.add_argument('--no-stream', action='store_true', help='Wait for the full response instead of streaming tokens')
+    parser.add_argument('--no-planner', action='store_true', help='Use separate LLM calls for search detection and query clarification')
+    parser.add_argument('--summary-mode', choices=['single', 'map_reduce'], help='Summarize search sources in one call or one call per source plus a merge (default: SUMMARY_MODE or single)')
+    parser.add_argument('--turn-deadline', type=parse_duration, metavar='DURATION', help='Latency budget per turn, e.g. 8s; slow stages are skipped or simplified to meet it, 0 for none (default: TURN_DEADLINE)')
+    parser.add_argument('--speculative', action='store_true', help='Start searching for the raw input while the turn is being planned')
+    parser.add_argument('--trace-export', metavar='PATH', help='Append every timing span to this file (default: TRACE_EXPORT)')
+    parser.add_argument('--trace-format', choices=['jsonl', 'otlp'], help='Span export format: jsonl or OpenTelemetry OTLP/JSON (default: TRACE_FORMAT or jsonl)')
+    parser.add_argument('--no-warmup', action='store_true', help='Do not prepare search and the inference connection in the background at startup')
+    parser.add_argument('--profile-startup', action='store_true', help='Report where startup time goes (imports, chatbot creation, deferred dependencies) and exit')
+    parser.add_argument('--serve', action='store_true', help='Serve an OpenAI-compatible /v1/chat/completions API instead of the interactive chat')
+    parser.add_argument('--host', help='Interface for --serve to listen on (default: SERVER_HOST or 127.0.0.1)')
+    parser.add_argument('--port', type=int, help='Port for --serve to listen on (default: SERVER_PORT or 8000)')
+    parser.add_argument('--batch', metavar='IN_JSONL', help='Answer every prompt in a JSONL file instead of the interactive chat')
+    parser.add_argument('--out', metavar='OUT_JSONL', help='Where --batch writes results (default: <input>.out.jsonl); rerun to resume')
+    parser.add_argument('--concurrency', type=int, help='Prompts answered at once in --batch mode (default: BATCH_CONCURRENCY or 4)')
     
     args = parser.parse_args()
     
+    if args.speculative:
+        os.environ['SPECULATIVE_SEARCH'] = 'true'
+    if args.trace_export:
+        get_tracer().export_path = args.trace_export
+    if args.trace_format:
+        get_tracer().export_format = args.trace_format
+    
+    if args.profile_startup:
+        from startup import profile_startup
+        profile_startup()
+        return
+    if args.serve:
+        from server import serve
+        serve(args.host, args.port, get_settings_overrides(args))
+        return
+    if args.batch:
+        from batch import BatchRunner
+        output_path = args.out or os.path.splitext(args.batch)[0] + '.out.jsonl'
+        BatchRunner(args.batch, output_path, args.concurrency, get_settings_overrides(args)).run()
+        return
+    
     # Create and run chatbot
     chatbot = HuggingFaceChatbot()
     
@@ -397,6 +1210,20 @@ def main():
     if args.max_tokens:
         chatbot.max_tokens = args.max_tokens
         print(f"🔧 Max tokens overridden to: {args.max_tokens}")
+    if args.no_stream:
+        chatbot.stream = False
+        print("🔧 Response streaming disabled")
+    if args.no_planner:
+        chatbot.use_planner = False
+        print("🔧 Single-call search planner disabled")
+    if args.no_warmup:
+        chatbot.warmup = False
+    if args.summary_mode:
+        chatbot.summary_mode = args.summary_mode
+        print(f"🔧 Summary mode overridden to: {args.summary_mode}")
+    if args.turn_deadline is not None:
+        chatbot.turn_deadline = args.turn_deadline or None
+        print(f"🔧 Turn deadline overridden to: {f'{args.turn_deadline:g}s' if args.turn_deadline else 'none'}")
     
     # Start the chat
     chatbot.run()
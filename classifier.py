@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import math
+import time
+import atexit
+import threading
+from datetime import date
+from typing import Optional
+
+from storage import get_data_dir
+
+
+# Rules that point towards needing current information (pattern, log-odds weight)
+SEARCH_RULES = [
+    (re.compile(r"\b(today|tonight|yesterday|tomorrow|right now|now|currently|current|latest|recent|recently|"
+                r"this (week|weekend|month|year|season)|last (night|week|weekend|month)|breaking|live|upcoming|so far)\b"), 3.0),
+    (re.compile(r"\b(weather|forecast|stocks?|share price|prices?|exchange rate|bitcoin|crypto|scores?|standings|"
+                r"news|headlines|elections?|polls?|traffic|release date|released|launch|launched)\b"), 2.5),
+    (re.compile(r"\b(who won|who is winning|what happened|is it open|still alive)\b"), 3.0),
+]
+
+# Rules that point towards general knowledge being enough (pattern, log-odds weight)
+NO_SEARCH_RULES = [
+    (re.compile(r"^(explain|define|what is|what are|what does|how does|how do|how to|why is|why do|why does|"
+                r"how \w+( \w+)? works?|tell me about|describe|write|translate|summarize|rewrite|fix|debug|calculate|convert|give me an example)\b"), -3.0),
+    (re.compile(r"^(hi|hello|hey|thanks|thank you|good morning|good evening|good night|how are you|bye)\b"), -4.0),
+    (re.compile(r"```|\bdef |\bclass |\bfunction\b|\bpython\b|\bjavascript\b|\bsql\b|\bregex\b"), -1.5),
+    (re.compile(r"^[\d\s\+\-\*/\^\(\)\.=x%]+\??$"), -4.0),
+]
+
+YEAR_PATTERN = re.compile(r"\b(19|20)\d{2}\b")
+
+RULE_BIAS = -0.5
+
+
+class SearchPreClassifier:
+    """
+    Local first-stage classifier for whether a query needs web search
+    
+    Combines keyword, regex and temporal-expression rules with a small linear model
+    over word features that learns online from the LLM's decisions on ambiguous queries.
+    Confidently obvious queries are answered locally; everything in between is left
+    to the LLM.
+    
+    Configuration (environment variables):
+        PRECLASSIFIER_SEARCH_THRESHOLD: Probability at or above which search is decided locally (default: 0.9)
+        PRECLASSIFIER_NO_SEARCH_THRESHOLD: Probability at or below which no-search is decided locally (default: 0.1)
+        PRECLASSIFIER_MODEL_PATH: Where the learned weights are stored (default: <data dir>/preclassifier.json)
+        PRECLASSIFIER_SAVE_INTERVAL: Minimum seconds between writes of the learned weights (default: 30)
+    
+    learn() runs on the event loop, so it never writes to disk itself: changed weights
+    are written by a background thread at most every PRECLASSIFIER_SAVE_INTERVAL
+    seconds, and once more at exit.
+    """
+
+    def __init__(self, search_threshold: float = None, no_search_threshold: float = None,
+                 model_path: str = None, learning_rate: float = 0.1):
+        self.search_threshold = search_threshold if search_threshold is not None else float(os.getenv('PRECLASSIFIER_SEARCH_THRESHOLD', 0.9))
+        self.no_search_threshold = no_search_threshold if no_search_threshold is not None else float(os.getenv('PRECLASSIFIER_NO_SEARCH_THRESHOLD', 0.1))
+        self.model_path = model_path or os.getenv('PRECLASSIFIER_MODEL_PATH') or os.path.join(get_data_dir(), 'preclassifier.json')
+        self.learning_rate = learning_rate
+        self.save_interval = float(os.getenv('PRECLASSIFIER_SAVE_INTERVAL', 30))
+        
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self.weights = {}
+        self.bias = 0.0
+        self.trained_examples = 0
+        self.local_search = 0
+        self.local_no_search = 0
+        self.escalated = 0
+        
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        """Load learned weights from disk if present"""
+        try:
+            with open(self.model_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.weights = {k: float(v) for k, v in data.get('weights', {}).items()}
+            self.bias = float(data.get('bias', 0.0))
+            self.trained_examples = int(data.get('trained_examples', 0))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Could not load pre-classifier model, starting fresh: {str(e)}")
+
+    def flush(self):
+        """Atomically write learned weights to disk if they changed since the last write"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._last_save = time.monotonic()
+            data = {'weights': dict(self.weights), 'bias': self.bias, 'trained_examples': self.trained_examples}
+        
+        with self._save_lock:
+            try:
+                tmp_path = f"{self.model_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.model_path)
+            except Exception as e:
+                print(f"⚠️ Could not save pre-classifier model: {str(e)}")
+
+    @staticmethod
+    def _features(text: str) -> list:
+        """Word unigram and bigram features of a normalized query"""
+        words = re.findall(r"[a-z0-9']+", text)
+        return [f"w:{w}" for w in words] + [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+
+    @staticmethod
+    def _rule_logit(text: str) -> float:
+        """Log-odds contributed by the hand-written rules"""
+        logit = RULE_BIAS
+        for pattern, weight in SEARCH_RULES + NO_SEARCH_RULES:
+            if pattern.search(text):
+                logit += weight
+        
+        # Mentions of this year or last year usually mean recent events
+        this_year = date.today().year
+        if any(int(m.group(0)) >= this_year - 1 for m in YEAR_PATTERN.finditer(text)):
+            logit += 2.0
+        return logit
+
+    def probability(self, query: str) -> float:
+        """
+        Estimate the probability that the query needs web search
+        
+        Args:
+            query (str): The user query
+        
+        Returns:
+            float: Probability between 0 and 1
+        """
+        text = query.lower().strip()
+        logit = self._rule_logit(text)
+        with self._lock:
+            logit += self.bias + sum(self.weights.get(f, 0.0) for f in self._features(text))
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, logit))))
+
+    def classify(self, query: str) -> Optional[bool]:
+        """
+        Decide locally whether the query needs web search
+        
+        Args:
+            query (str): The user query
+        
+        Returns:
+            Optional[bool]: True or False when confident, None when the LLM should decide
+        """
+        p = self.probability(query)
+        with self._lock:
+            if p >= self.search_threshold:
+                self.local_search += 1
+                return True
+            if p <= self.no_search_threshold:
+                self.local_no_search += 1
+                return False
+            self.escalated += 1
+            return None
+
+    def learn(self, query: str, needs_search: bool):
+        """
+        Update the linear model with a decision made by the LLM
+        
+        Args:
+            query (str): The user query
+            needs_search (bool): The LLM's decision
+        """
+        text = query.lower().strip()
+        p = self.probability(query)
+        error = (1.0 if needs_search else 0.0) - p
+        with self._lock:
+            for f in self._features(text):
+                self.weights[f] = self.weights.get(f, 0.0) + self.learning_rate * error
+            self.bias += self.learning_rate * error
+            self.trained_examples += 1
+            self._dirty = True
+            save_due = time.monotonic() - self._last_save >= self.save_interval
+        
+        if save_due:
+            threading.Thread(target=self.flush, name='preclassifier-save', daemon=True).start()
+
+    def stats(self) -> dict:
+        """
+        Get pre-classifier counters
+        
+        Returns:
+            dict: local decisions, escalations to the LLM and the local hit rate
+        """
+        with self._lock:
+            local = self.local_search + self.local_no_search
+            total = local + self.escalated
+            return {
+                'local_search': self.local_search,
+                'local_no_search': self.local_no_search,
+                'escalated': self.escalated,
+                'hit_rate': local / total if total else 0.0,
+                'trained_examples': self.trained_examples
+            }
+
+
+_preclassifier = None
+_preclassifier_lock = threading.Lock()
+
+
+def get_preclassifier() -> Optional[SearchPreClassifier]:
+    """
+    Get the process-wide search pre-classifier
+    
+    Sessions share one learned model so every session benefits from what the others
+    learn, and the weights file has a single writer.
+    
+    Returns:
+        Optional[SearchPreClassifier]: The shared classifier, or None if disabled with PRECLASSIFIER=false
+    """
+    global _preclassifier
+    if os.getenv('PRECLASSIFIER', 'true').lower() != 'true':
+        return None
+    if _preclassifier is None:
+        with _preclassifier_lock:
+            if _preclassifier is None:
+                _preclassifier = SearchPreClassifier()
+    return _preclassifier
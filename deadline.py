@@ -0,0 +1,119 @@
+import os
+import re
+import time
+from typing import Optional
+
+from tracing import get_tracer
+
+
+# Seconds assumed for a stage until enough turns have been measured (keyed by span name)
+DEFAULT_STAGE_SECONDS = {
+    'plan_turn': 2.0,
+    'llm.instruction': 1.5,
+    'search_hits': 1.5,
+    'web_search': 5.0,
+    'summarize': 3.0,
+    'chat_response': 2.0,
+}
+
+# Measured turns needed before a stage's p95 replaces its default
+MIN_SAMPLES = 3
+
+DURATION_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s)?\s*$")
+
+
+def parse_duration(value: str) -> float:
+    """
+    Parse a duration such as "8s", "8" (seconds) or "8000ms"
+
+    Returns:
+        float: Seconds
+
+    Raises:
+        ValueError: If the value is not a duration
+    """
+    match = DURATION_PATTERN.match(str(value).lower())
+    if not match:
+        raise ValueError(f"Invalid duration: {value!r} (use e.g. 8s or 8000ms)")
+    seconds = float(match.group(1))
+    return seconds / 1000 if match.group(2) == 'ms' else seconds
+
+
+def stage_estimate(stage: str) -> float:
+    """Seconds a stage usually takes: its measured p95, or a default until it has been measured a few times"""
+    summary = get_tracer().summary(stage)
+    if summary and summary['count'] >= MIN_SAMPLES:
+        return summary['p95_ms'] / 1000
+    return DEFAULT_STAGE_SECONDS.get(stage, 1.0)
+
+
+class TurnDeadline:
+    """
+    Latency budget of one turn
+
+    Time for the final chat call (its measured p95, or TURN_CHAT_RESERVE seconds
+    until measured) is set aside up front; the search stages share what is left.
+    Before each stage the pipeline asks whether it fits and otherwise takes a
+    cheaper path, and every such decision is recorded with the time that was left.
+
+    Configuration (environment variables):
+        TURN_DEADLINE: Default turn deadline, e.g. 8s (default: none)
+        TURN_CHAT_RESERVE: Seconds kept for the chat call until its latency has been measured (default: 2)
+    """
+
+    def __init__(self, seconds: float, chat_reserve: float = None):
+        self.seconds = seconds
+        if chat_reserve is None:
+            summary = get_tracer().summary('chat_response')
+            measured = summary and summary['count'] >= MIN_SAMPLES
+            chat_reserve = summary['p95_ms'] / 1000 if measured else float(os.getenv('TURN_CHAT_RESERVE', 2))
+        self.chat_reserve = min(chat_reserve, seconds)
+        self._start = time.monotonic()
+        self.decisions = []
+
+    def remaining(self) -> float:
+        """Seconds left for the search stages (the chat reserve is not included)"""
+        return self.seconds - self.chat_reserve - (time.monotonic() - self._start)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def allows(self, *stages: str) -> bool:
+        """Whether the stages are expected to finish within the remaining time"""
+        return sum(stage_estimate(stage) for stage in stages) <= self.remaining()
+
+    def degrade(self, stage: str, action: str):
+        """
+        Record that a stage took a cheaper path to stay within the deadline
+
+        Args:
+            stage (str): Pipeline stage, e.g. 'plan', 'clarify', 'search' or 'summarize'
+            action (str): What was done instead
+        """
+        remaining = self.remaining()
+        self.decisions.append({'stage': stage, 'action': action, 'remaining_ms': round(remaining * 1000)})
+        print(f"⏱️ Turn deadline ({max(0.0, remaining):.1f}s left): {action}")
+
+    def metadata(self) -> dict:
+        """
+        Describe the turn's budget and the degradations it needed
+
+        Returns:
+            dict: deadline_s, chat_reserve_s, prepare_s (time until the chat call) and
+            degradations (stage, action and milliseconds left when decided)
+        """
+        return {
+            'deadline_s': self.seconds,
+            'chat_reserve_s': round(self.chat_reserve, 3),
+            'prepare_s': round(self.elapsed(), 3),
+            'degradations': list(self.decisions)
+        }
+
+
+def default_turn_deadline() -> Optional[float]:
+    """The TURN_DEADLINE setting in seconds, or None for no deadline"""
+    value = os.getenv('TURN_DEADLINE', '').strip()
+    if not value:
+        return None
+    seconds = parse_duration(value)
+    return seconds if seconds > 0 else None
@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from ranking import SENTENCE_PATTERN, tokenize, split_passages, estimate_tokens
+from storage import get_data_dir
+
+
+FINGERPRINT_BITS = 64
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text: str, shingle_size: int = 2) -> int:
+    """
+    64-bit SimHash of a passage over its word shingles
+
+    Passages that share most of their shingles get fingerprints that differ in only
+    a few bits, so near-duplicates are found by Hamming distance.
+
+    Args:
+        text (str): Passage text
+        shingle_size (int): Words per shingle (default: 2)
+
+    Returns:
+        int: The fingerprint (0 for text without words)
+    """
+    tokens = tokenize(text)
+    if len(tokens) < shingle_size:
+        shingles = [" ".join(tokens)] if tokens else []
+    else:
+        shingles = [" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+    hashes = [_hash64(shingle) for shingle in shingles]
+
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        if 2 * sum((h >> bit) & 1 for h in hashes) > len(hashes):
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints"""
+    return bin(a ^ b).count('1')
+
+
+def page_domain(url: str) -> str:
+    """Host of a URL without "www." (pages of one site share boilerplate)"""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class DedupTurn:
+    """
+    Passages seen so far in one turn
+
+    Pages are cleaned one by one as they arrive; a passage that is a near-duplicate
+    of one kept from an earlier page (or earlier in the same page) is dropped.
+    """
+
+    def __init__(self, deduplicator: "PassageDeduplicator"):
+        self.deduplicator = deduplicator
+        self.seen = []
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.duplicates = 0
+        self.boilerplate = 0
+        self._finished = False
+
+    def clean(self, url: str, content: str) -> str:
+        """
+        Strip learned boilerplate and near-duplicate passages from one page
+
+        Args:
+            url (str): Page URL (its domain selects the boilerplate fingerprints)
+            content (str): Cleaned page text
+
+        Returns:
+            str: The remaining text (empty if nothing new is left)
+        """
+        if not content:
+            return content
+
+        dedup = self.deduplicator
+        domain = page_domain(url)
+        kept = []
+        fingerprints = []
+        for passage in dedup.split(content):
+            fingerprint = simhash(passage, dedup.shingle_size)
+            # Fuzzy matching is only reliable on passages with enough words
+            max_distance = dedup.max_distance if len(passage.split()) >= dedup.min_fuzzy_words else 0
+            fingerprints.append(fingerprint)
+            if dedup.is_boilerplate(domain, fingerprint, max_distance):
+                self.boilerplate += 1
+            elif any(hamming_distance(fingerprint, seen) <= max_distance for seen in self.seen):
+                self.duplicates += 1
+            else:
+                self.seen.append(fingerprint)
+                kept.append(passage)
+
+        # Learned after cleaning, so a page never counts as evidence against itself
+        dedup.learn(domain, url, fingerprints)
+
+        cleaned = " ".join(kept)
+        self.tokens_before += estimate_tokens(content)
+        self.tokens_after += estimate_tokens(cleaned) if cleaned else 0
+        return cleaned
+
+    def report(self) -> dict:
+        """
+        Finish the turn: persist the learned fingerprints and add to the totals
+
+        Returns:
+            dict: duplicates and boilerplate passages removed, and tokens before, after and saved
+        """
+        report = {
+            'duplicates': self.duplicates,
+            'boilerplate': self.boilerplate,
+            'tokens_before': self.tokens_before,
+            'tokens_after': self.tokens_after,
+            'tokens_saved': self.tokens_before - self.tokens_after
+        }
+        if not self._finished:
+            self._finished = True
+            self.deduplicator.finish_turn(report)
+        return report
+
+
+class PassageDeduplicator:
+    """
+    Removes repeated text from fetched pages before summarization
+
+    Pages are split into sentence-sized passages fingerprinted with SimHash.
+    Within a turn, passages close to one already kept (syndicated copies of an
+    article, quotes shared between sources) are dropped. Across turns, each
+    domain's passage fingerprints are remembered with the pages they were seen on;
+    a passage found on several different pages of a site (cookie banners, footers,
+    newsletter boxes) is learned as boilerplate and stripped from that site's pages.
+
+    Configuration (environment variables):
+        DEDUP_MAX_DISTANCE: Fingerprint bits that may differ for passages to count as near-duplicates (default: 6)
+        BOILERPLATE_MIN_PAGES: Pages of a site a passage must appear on to count as boilerplate (default: 3)
+        BOILERPLATE_MAX_FINGERPRINTS: Fingerprints remembered per site, least recently seen forgotten first (default: 500)
+        BOILERPLATE_PATH: Where the fingerprints are stored (default: <data dir>/boilerplate.json)
+    """
+
+    def __init__(self, max_distance: int = None, min_pages: int = None, max_fingerprints: int = None,
+                 path: str = None, passage_words: int = 40, shingle_size: int = 2, min_fuzzy_words: int = 8):
+        self.max_distance = max_distance if max_distance is not None else int(os.getenv('DEDUP_MAX_DISTANCE', 6))
+        self.min_pages = min_pages or int(os.getenv('BOILERPLATE_MIN_PAGES', 3))
+        self.max_fingerprints = max_fingerprints or int(os.getenv('BOILERPLATE_MAX_FINGERPRINTS', 500))
+        self.path = path or os.getenv('BOILERPLATE_PATH') or os.path.join(get_data_dir(), 'boilerplate.json')
+        self.passage_words = passage_words
+        self.shingle_size = shingle_size
+        self.min_fuzzy_words = min_fuzzy_words
+
+        self._lock = threading.Lock()
+        # domain -> fingerprint -> {'pages': short hashes of the URLs it was seen on, 'seen': last seen time}
+        self.domains: Dict[str, Dict[int, dict]] = {}
+        self._dirty = False
+        self._stats = {'turns': 0, 'duplicates': 0, 'boilerplate': 0, 'tokens_before': 0, 'tokens_saved': 0}
+
+        self._load()
+
+    def _load(self):
+        """Load learned fingerprints from disk if present"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.domains = {
+                domain: {int(fingerprint, 16): entry for fingerprint, entry in fingerprints.items()}
+                for domain, fingerprints in data.get('domains', {}).items()
+            }
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Could not load boilerplate fingerprints, starting fresh: {str(e)}")
+
+    def _save(self):
+        """Atomically write learned fingerprints to disk"""
+        try:
+            data = {'domains': {
+                domain: {f"{fingerprint:016x}": entry for fingerprint, entry in fingerprints.items()}
+                for domain, fingerprints in self.domains.items()
+            }}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not save boilerplate fingerprints: {str(e)}")
+
+    def start_turn(self) -> DedupTurn:
+        """Start deduplicating the pages of a new turn"""
+        return DedupTurn(self)
+
+    def split(self, content: str) -> List[str]:
+        """Split page text into sentences, breaking up run-ons longer than passage_words"""
+        return [passage for sentence in SENTENCE_PATTERN.split(content)
+                for passage in split_passages(sentence, max_words=self.passage_words)]
+
+    def _match(self, fingerprints: Dict[int, dict], fingerprint: int, max_distance: int) -> Optional[int]:
+        """The remembered fingerprint closest to this one, if within max_distance"""
+        if fingerprint in fingerprints:
+            return fingerprint
+        if max_distance <= 0:
+            return None
+        for known in fingerprints:
+            if hamming_distance(known, fingerprint) <= max_distance:
+                return known
+        return None
+
+    def is_boilerplate(self, domain: str, fingerprint: int, max_distance: int = None) -> bool:
+        """Whether a passage fingerprint has been seen on enough different pages of the domain"""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        with self._lock:
+            fingerprints = self.domains.get(domain)
+            if not fingerprints:
+                return False
+            known = self._match(fingerprints, fingerprint, max_distance)
+            return known is not None and len(fingerprints[known]['pages']) >= self.min_pages
+
+    def learn(self, domain: str, url: str, fingerprints: List[int]):
+        """
+        Record the passages seen on one page of a domain
+
+        Args:
+            domain (str): The page's domain
+            url (str): Page URL; a page counts once however often it is fetched
+            fingerprints (List[int]): SimHash of every passage on the page
+        """
+        if not domain:
+            return
+        page = _hash64(url) & 0xffffffff
+        now = time.time()
+        with self._lock:
+            known_fingerprints = self.domains.setdefault(domain, {})
+            for fingerprint in set(fingerprints):
+                known = self._match(known_fingerprints, fingerprint, self.max_distance)
+                entry = known_fingerprints.setdefault(fingerprint if known is None else known, {'pages': [], 'seen': now})
+                if page not in entry['pages'] and len(entry['pages']) < self.min_pages:
+                    entry['pages'].append(page)
+                entry['seen'] = now
+
+            # Forget the least recently seen fingerprints of the domain
+            if len(known_fingerprints) > self.max_fingerprints:
+                by_age = sorted(known_fingerprints, key=lambda known: known_fingerprints[known]['seen'])
+                for fingerprint in by_age[:len(known_fingerprints) - self.max_fingerprints]:
+                    del known_fingerprints[fingerprint]
+            self._dirty = True
+
+    def finish_turn(self, report: dict):
+        """Add a turn's report to the totals and persist what was learned"""
+        with self._lock:
+            self._stats['turns'] += 1
+            for key in ('duplicates', 'boilerplate', 'tokens_before', 'tokens_saved'):
+                self._stats[key] += report[key]
+            if self._dirty:
+                self._dirty = False
+                self._save()
+
+    def stats(self) -> dict:
+        """
+        Get deduplication counters
+
+        Returns:
+            dict: turns, duplicate and boilerplate passages removed, tokens before and
+            saved, the saved share, and the number of domains with learned fingerprints
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['domains'] = len(self.domains)
+        stats['saved_rate'] = stats['tokens_saved'] / stats['tokens_before'] if stats['tokens_before'] else 0.0
+        return stats
+
+
+_deduplicator = None
+_deduplicator_lock = threading.Lock()
+
+
+def get_deduplicator() -> Optional[PassageDeduplicator]:
+    """
+    Get the process-wide passage deduplicator
+
+    Sessions share one set of learned boilerplate fingerprints, and the fingerprint
+    file has a single writer.
+
+    Returns:
+        Optional[PassageDeduplicator]: The shared deduplicator, or None if disabled with DEDUP=false
+    """
+    global _deduplicator
+    if os.getenv('DEDUP', 'true').lower() != 'true':
+        return None
+    if _deduplicator is None:
+        with _deduplicator_lock:
+            if _deduplicator is None:
+                _deduplicator = PassageDeduplicator()
+    return _deduplicator
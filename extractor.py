@@ -0,0 +1,182 @@
+import os
+import re
+from typing import Iterable, Optional
+from lxml import etree
+from bs4 import BeautifulSoup
+
+
+# Subtrees whose text never reaches the cleaned content
+SKIPPED_TAGS = {"script", "style", "nav", "header", "footer", "aside"}
+
+META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_\-]+)""", re.IGNORECASE)
+
+
+def clean_text(text: str) -> str:
+    """
+    Collapse raw page text into single-spaced phrases
+    
+    Args:
+        text (str): Raw text as extracted from HTML
+    
+    Returns:
+        str: Text with line breaks and runs of whitespace collapsed
+    """
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Cut text to the character budget, marking the cut with an ellipsis"""
+    if len(text) > max_chars:
+        return text[:max_chars] + "..."
+    return text
+
+
+class _TextCollector:
+    """lxml parser target that keeps text outside skipped subtrees"""
+
+    def __init__(self):
+        self.pieces = []
+        self.skip_depth = 0
+
+    def start(self, tag, attrib):
+        if isinstance(tag, str) and tag.lower() in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        if isinstance(tag, str) and tag.lower() in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if not self.skip_depth:
+            self.pieces.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return "".join(self.pieces)
+
+
+class StreamingExtractor:
+    """
+    Incremental HTML text extractor with a character budget and a download limit
+    
+    Feed the body chunk by chunk; feed() returns True once enough text has been
+    collected or the byte limit is reached, after which the caller should stop
+    reading and call finish().
+    """
+
+    def __init__(self, max_chars: int = None, max_bytes: int = None, encoding: Optional[str] = None):
+        self.max_chars = max_chars or int(os.getenv('PAGE_CHAR_BUDGET', 15000))
+        self.max_bytes = max_bytes or int(os.getenv('PAGE_MAX_DOWNLOAD_BYTES', 2000000))
+        self.encoding = encoding
+        self.received = 0
+        
+        self._collector = _TextCollector()
+        self._parser = None
+        # Characters of cleaned text kept so far, and how many collected pieces they cover
+        self._chars = 0
+        self._counted_pieces = 0
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Parse the next chunk of the body
+        
+        Args:
+            chunk (bytes): Next piece of the HTML body
+        
+        Returns:
+            bool: True if no more input is needed
+        """
+        if not chunk:
+            return False
+        if self._parser is None:
+            # Without a declared charset, look for a <meta> one and default to UTF-8
+            if not self.encoding:
+                match = META_CHARSET_PATTERN.search(chunk[:4096])
+                self.encoding = match.group(1).decode('ascii') if match else 'utf-8'
+            self._parser = etree.HTMLParser(target=self._collector, encoding=self.encoding, remove_comments=True)
+        
+        chunk = chunk[:self.max_bytes - self.received]
+        self.received += len(chunk)
+        self._parser.feed(chunk)
+        
+        # Only the new text is cleaned. Cleaning chunk by chunk never yields more characters
+        # than cleaning the whole text (at most a joining space is missed), so once _chars
+        # passes the budget the full cleaned text does too
+        new_text = clean_text("".join(self._collector.pieces[self._counted_pieces:]))
+        self._counted_pieces = len(self._collector.pieces)
+        self._chars += len(new_text)
+        if self._chars > self.max_chars:
+            return True
+        
+        return self.received >= self.max_bytes
+
+    def finish(self) -> str:
+        """
+        Finish parsing and get the extracted text
+        
+        Returns:
+            str: Cleaned text, truncated to the character budget
+        """
+        if self._parser is None:
+            return ""
+        try:
+            text = self._parser.close()
+        except etree.LxmlError:
+            text = self._collector.close()
+        
+        return truncate_text(clean_text(text), self.max_chars)
+
+
+def extract_text_streaming(chunks: Iterable[bytes], max_chars: int = None, max_bytes: int = None,
+                           encoding: Optional[str] = None) -> str:
+    """
+    Extract cleaned text from HTML fed incrementally, stopping as soon as the budget is met
+    
+    The HTML is pushed chunk by chunk into an lxml parser target that drops skipped
+    subtrees (scripts, styles, navigation, headers, footers, asides) as it goes, so no
+    document tree is built. Reading stops once enough text has been collected or the
+    byte limit is reached.
+    
+    Args:
+        chunks (Iterable[bytes]): HTML body, e.g. response.iter_content()
+        max_chars (int, optional): Character budget. If None, uses PAGE_CHAR_BUDGET from .env (default: 15000)
+        max_bytes (int, optional): Download limit. If None, uses PAGE_MAX_DOWNLOAD_BYTES from .env (default: 2000000)
+        encoding (str, optional): Declared charset; if None, uses a <meta> charset or UTF-8
+    
+    Returns:
+        str: Cleaned text, truncated to the character budget
+    """
+    extractor = StreamingExtractor(max_chars=max_chars, max_bytes=max_bytes, encoding=encoding)
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+    return extractor.finish()
+
+
+def extract_text_soup(html: bytes, max_chars: int = None) -> str:
+    """
+    Extract cleaned text by building a full BeautifulSoup tree
+    
+    The original extractor; kept for comparison and as a fallback.
+    
+    Args:
+        html (bytes): Complete HTML body
+        max_chars (int, optional): Character budget. If None, uses PAGE_CHAR_BUDGET from .env (default: 15000)
+    
+    Returns:
+        str: Cleaned text, truncated to the character budget
+    """
+    max_chars = max_chars or int(os.getenv('PAGE_CHAR_BUDGET', 15000))
+    
+    # Parse HTML content
+    soup = BeautifulSoup(html, 'lxml')
+    
+    # Remove script and style elements
+    for script in soup(list(SKIPPED_TAGS)):
+        script.decompose()
+    
+    return truncate_text(clean_text(soup.get_text()), max_chars)
@@ -0,0 +1,206 @@
+import os
+import re
+import queue
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from ranking import estimate_tokens
+from LLMfunc import get_llm_instruction_response
+
+
+SEARCH_CONTEXT_PATTERN = re.compile(r"\s*\[WEB SEARCH CONTEXT\].*?\[END CONTEXT\]\s*", re.DOTALL)
+SUMMARY_HEADER = "[CONVERSATION SUMMARY]"
+
+# Per-message overhead of the chat template (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def get_token_budget(model: str) -> int:
+    """
+    Get the conversation token budget for a chat model
+    
+    Configuration (environment variables):
+        HISTORY_TOKEN_BUDGETS: Per-model budgets, e.g. "google/gemma-2-2b-it=6000,microsoft/phi-4=12000"
+        HISTORY_TOKEN_BUDGET: Budget for models not listed (default: 6000)
+    
+    Args:
+        model (str): Chat model name
+    
+    Returns:
+        int: Maximum prompt tokens for the conversation, including the system prompt
+    """
+    for entry in os.getenv('HISTORY_TOKEN_BUDGETS', '').split(','):
+        name, _, budget = entry.strip().rpartition('=')
+        if name == model and budget.strip().isdigit():
+            return int(budget)
+    return int(os.getenv('HISTORY_TOKEN_BUDGET', 6000))
+
+
+class HistoryManager:
+    """
+    Keeps conversation history within a per-model token budget
+    
+    Token counts are computed once per message and memoized. When the history is
+    over budget, web search context blocks are removed from older messages first;
+    if that is not enough, the oldest user/assistant messages are evicted. Evicted
+    messages are folded into a compact rolling summary by a background thread, and
+    the summary is carried in the system message so earlier turns are not lost.
+    """
+
+    def __init__(self, system_prompt: Optional[str] = None, summarize: bool = True):
+        self.system_prompt = system_prompt
+        self.summarize = summarize
+        self.summary = ""
+        
+        self._token_counts = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._worker = None
+        # Bumped by reset(); summary jobs of an earlier conversation are discarded
+        self._generation = 0
+
+    def count_tokens(self, message: dict) -> int:
+        """
+        Estimate the tokens of one message, memoized by its content
+        
+        Args:
+            message (dict): Message with 'role' and 'content'
+        
+        Returns:
+            int: Estimated token count
+        """
+        key = (message['role'], message['content'])
+        count = self._token_counts.get(key)
+        if count is None:
+            count = estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+            self._token_counts[key] = count
+            if len(self._token_counts) > 1024:
+                self._token_counts.popitem(last=False)
+        return count
+
+    def system_message(self) -> Optional[dict]:
+        """Build the system message from the system prompt and the rolling summary"""
+        with self._lock:
+            summary = self.summary
+        parts = []
+        if self.system_prompt:
+            parts.append(self.system_prompt)
+        if summary:
+            parts.append(f"{SUMMARY_HEADER}\n{summary}")
+        if not parts:
+            return None
+        return {"role": "system", "content": "\n\n".join(parts)}
+
+    def trim(self, messages: List[dict], model: str, reserve_tokens: int = 0, summary_model: str = None) -> List[dict]:
+        """
+        Fit the conversation into the model's token budget
+        
+        Args:
+            messages (List[dict]): Conversation history, optionally starting with a system message
+            model (str): Chat model the history will be sent to
+            reserve_tokens (int): Tokens to leave free for the response (e.g. max_tokens)
+            summary_model (str, optional): Model used to summarize evicted messages
+        
+        Returns:
+            List[dict]: The trimmed history (the input list is not modified)
+        """
+        budget = get_token_budget(model) - reserve_tokens
+        
+        system = self.system_message()
+        turns = [dict(m) for m in messages if m['role'] != 'system']
+        
+        def total():
+            return sum(self.count_tokens(m) for m in ([system] if system else []) + turns)
+        
+        # Drop old web search context first; the latest user message keeps its context
+        for message in turns[:-1]:
+            if total() <= budget:
+                break
+            if message['role'] == 'user' and '[WEB SEARCH CONTEXT]' in message['content']:
+                message['content'] = SEARCH_CONTEXT_PATTERN.sub("\n", message['content']).strip()
+        
+        # Then evict the oldest messages, always keeping the latest one
+        evicted = []
+        while len(turns) > 1 and total() > budget:
+            evicted.append(turns.pop(0))
+        # Chat templates expect the conversation to open with a user message
+        while evicted and len(turns) > 1 and turns[0]['role'] == 'assistant':
+            evicted.append(turns.pop(0))
+        
+        if evicted:
+            print(f"🗜️ Folded {len(evicted)} older message(s) into the conversation summary")
+            if self.summarize:
+                self._queue_summary(evicted, summary_model)
+        
+        return ([system] if system else []) + turns
+
+    def _queue_summary(self, evicted: List[dict], summary_model: str = None):
+        """Hand evicted messages to the background summarizer"""
+        with self._lock:
+            self._pending.put((evicted, summary_model, self._generation))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._summarize_pending, name='history-summary', daemon=True)
+                self._worker.start()
+
+    def _summarize_pending(self):
+        """Fold queued evicted messages into the rolling summary"""
+        while True:
+            try:
+                evicted, summary_model, generation = self._pending.get(timeout=1)
+            except queue.Empty:
+                with self._lock:
+                    if self._pending.empty():
+                        self._worker = None
+                        return
+                continue
+            
+            transcript = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in evicted)
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                previous = self.summary
+            
+            try:
+                summary = get_llm_instruction_response(
+                    query_instruction="""
+                    Update the running summary of a conversation with the older messages below.
+                    Keep names, facts, decisions, preferences and open questions; drop small talk.
+                    Return only the updated summary in at most 120 words.
+                    """,
+                    content=f"Current summary: {previous or 'None'}\n\nOlder messages:\n{transcript}",
+                    model=summary_model,
+                    max_tokens=200
+                )
+                with self._lock:
+                    # The conversation may have been cleared while the summary was written
+                    if generation == self._generation:
+                        self.summary = summary.strip()
+            except Exception as e:
+                print(f"⚠️ Error summarizing conversation history: {str(e)}")
+
+    def reset(self):
+        """Forget the rolling summary (e.g. when the conversation is cleared), including summaries still being written"""
+        with self._lock:
+            self._generation += 1
+            self.summary = ""
+            while True:
+                try:
+                    self._pending.get_nowait()
+                except queue.Empty:
+                    break
+
+    def stats(self, messages: List[dict], model: str) -> dict:
+        """
+        Get token usage of a conversation
+        
+        Returns:
+            dict: tokens used, budget and whether a rolling summary exists
+        """
+        with self._lock:
+            has_summary = bool(self.summary)
+        return {
+            'tokens': sum(self.count_tokens(m) for m in messages),
+            'budget': get_token_budget(model),
+            'summary': has_summary
+        }
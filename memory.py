@@ -0,0 +1,113 @@
+import os
+from collections import deque
+from typing import List, Tuple
+
+from ranking import BM25Index, split_passages
+
+
+SEARCH_CONTEXT_START = "[WEB SEARCH CONTEXT]"
+SEARCH_CONTEXT_END = "[END CONTEXT]"
+
+
+class ConversationMemory:
+    """
+    Retrieval memory over the past turns of one conversation
+
+    Every user message, assistant reply and web search summary is split into short
+    snippets and added to a BM25 index once, when the message is added. Query
+    clarification then gets the few most recent messages plus the top-k older
+    snippets matching the query, so its prompt stays the same size however long
+    the session runs, and relevant context from turns that have already been
+    trimmed or summarized out of the chat history comes back.
+
+    Configuration (environment variables):
+        MEMORY_TOP_K: Older snippets retrieved per query (default: 4)
+        MEMORY_RECENT_MESSAGES: Latest messages always included, for follow-up questions (default: 2)
+        MEMORY_MAX_SNIPPETS: Snippets kept before the oldest are forgotten (default: 2000)
+    """
+
+    def __init__(self, top_k: int = None, recent_messages: int = None, max_snippets: int = None, snippet_words: int = 60):
+        self.top_k = top_k if top_k is not None else int(os.getenv('MEMORY_TOP_K', 4))
+        self.recent_messages = recent_messages if recent_messages is not None else int(os.getenv('MEMORY_RECENT_MESSAGES', 2))
+        self.max_snippets = max_snippets or int(os.getenv('MEMORY_MAX_SNIPPETS', 2000))
+        self.snippet_words = snippet_words
+        self.clear()
+
+    def clear(self):
+        """Forget everything"""
+        self.index = BM25Index()
+        self.snippets = {}
+        self.recent = deque(maxlen=max(1, self.recent_messages))
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.snippets)
+
+    def add(self, role: str, content: str):
+        """
+        Index one conversation message
+
+        Args:
+            role (str): 'user' or 'assistant' (other roles are ignored)
+            content (str): Message text; a web search context block is indexed as a search result
+        """
+        if role not in ('user', 'assistant'):
+            return
+
+        message, _, search_context = content.partition(SEARCH_CONTEXT_START)
+        message = message.strip()
+        search_summary = search_context.partition(SEARCH_CONTEXT_END)[0].strip()
+
+        message_ids = self._index(role.capitalize(), message)
+        # Search summaries are only ever retrieved, never shown in full
+        self._index("Search result", search_summary)
+
+        if message:
+            self.recent.append((role.capitalize(), message, message_ids))
+
+        # Forget the oldest snippets (ids increase with time)
+        while len(self.snippets) > self.max_snippets:
+            oldest = min(self.snippets)
+            del self.snippets[oldest]
+            self.index.remove(oldest)
+
+    def _index(self, label: str, text: str) -> List[int]:
+        """Add text to the index as snippets and return their ids"""
+        doc_ids = []
+        for passage in split_passages(text, max_words=self.snippet_words) if text else []:
+            doc_id = self._next_id
+            self._next_id += 1
+            self.index.add(doc_id, passage)
+            self.snippets[doc_id] = (label, passage)
+            doc_ids.append(doc_id)
+        return doc_ids
+
+    def _recent(self) -> list:
+        return list(self.recent)[-self.recent_messages:] if self.recent_messages > 0 else []
+
+    def retrieve(self, query: str) -> List[Tuple[str, str]]:
+        """
+        Get the older snippets most relevant to a query
+
+        Returns:
+            List[Tuple[str, str]]: Up to top_k (label, snippet) pairs in conversation order,
+            excluding the recent messages that are always included
+        """
+        recent_ids = {doc_id for _, _, doc_ids in self._recent() for doc_id in doc_ids}
+        ranked = [doc_id for doc_id, _ in self.index.search(query) if doc_id not in recent_ids and doc_id in self.snippets]
+        return [self.snippets[doc_id] for doc_id in sorted(ranked[:self.top_k])]
+
+    def context(self, query: str) -> str:
+        """
+        Build the conversation context for a query: relevant older snippets, then the latest messages
+
+        Returns:
+            str: A short transcript, or an empty string for a new conversation
+        """
+        lines = [f"{label} (earlier): {snippet}" for label, snippet in self.retrieve(query)]
+        for label, message, _ in self._recent():
+            words = message.split()
+            if len(words) > 2 * self.snippet_words:
+                message = " ".join(words[:2 * self.snippet_words]) + " ..."
+            lines.append(f"{label}: {message}")
+        return "\n".join(lines)
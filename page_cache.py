@@ -0,0 +1,235 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Optional
+
+from storage import get_data_dir
+
+
+class PageCache:
+    """
+    Content-addressed cache of extracted page text with HTTP validators
+    
+    For every URL the cache remembers the ETag / Last-Modified of the last response
+    together with the hash of its extracted text. Texts are stored once per hash, so
+    mirrors serving identical content share storage. Re-fetches send If-None-Match /
+    If-Modified-Since and a 304 reply returns the stored text without downloading or
+    parsing the page again. When stored text exceeds the disk quota, the least
+    recently used URLs are evicted.
+    
+    Configuration (environment variables):
+        PAGE_CACHE_PATH: SQLite database file (default: <data dir>/page_cache.sqlite3)
+        PAGE_CACHE_MAX_MB: Disk quota for stored text in megabytes (default: 100)
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        self.path = path or os.getenv('PAGE_CACHE_PATH') or os.path.join(get_data_dir(), 'page_cache.sqlite3')
+        self.max_bytes = max_bytes or int(float(os.getenv('PAGE_CACHE_MAX_MB', 100)) * 1024 * 1024)
+        
+        self._lock = threading.Lock()
+        self._stats = {'revalidated': 0, 'changed': 0, 'stored': 0, 'evictions': 0}
+        
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                content_hash TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access);
+        """)
+        self._db.commit()
+
+    def lookup(self, url: str) -> Optional[dict]:
+        """
+        Get the stored validators and text for a URL
+        
+        Args:
+            url (str): The page URL
+        
+        Returns:
+            Optional[dict]: 'etag', 'last_modified' and 'text', or None if the URL is not cached
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT p.etag, p.last_modified, b.text FROM pages p "
+                "JOIN blobs b ON b.content_hash = p.content_hash WHERE p.url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'text': row[2]}
+
+    def conditional_headers(self, cached: Optional[dict]) -> dict:
+        """
+        Build revalidation headers for a cached entry
+        
+        Args:
+            cached (Optional[dict]): Result of lookup()
+        
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers (empty if nothing is cached)
+        """
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+    def mark_revalidated(self, url: str):
+        """Record that the origin confirmed the cached copy is still current (HTTP 304)"""
+        with self._lock:
+            self._db.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+            self._stats['revalidated'] += 1
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str], text: str):
+        """
+        Store extracted text and the validators it was served with
+        
+        Pages without an ETag or Last-Modified cannot be revalidated and are not stored.
+        
+        Args:
+            url (str): The page URL
+            etag (Optional[str]): ETag response header
+            last_modified (Optional[str]): Last-Modified response header
+            text (str): Extracted page text
+        """
+        if not (etag or last_modified) or not text:
+            return
+        
+        content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            previous = self._db.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            if previous is not None and previous[0] != content_hash:
+                self._stats['changed'] += 1
+            
+            self._db.execute(
+                "INSERT OR IGNORE INTO blobs (content_hash, text, size) VALUES (?, ?, ?)",
+                (content_hash, text, len(text.encode('utf-8')))
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, time.time())
+            )
+            self._drop_orphan_blobs()
+            self._evict()
+            self._db.commit()
+            self._stats['stored'] += 1
+
+    def _drop_orphan_blobs(self):
+        """Delete texts no URL points to anymore (caller holds the lock)"""
+        self._db.execute("DELETE FROM blobs WHERE content_hash NOT IN (SELECT content_hash FROM pages)")
+
+    def _evict(self):
+        """Evict least recently used URLs until stored text fits the quota (caller holds the lock)"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        while total > self.max_bytes:
+            row = self._db.execute("SELECT url FROM pages ORDER BY last_access ASC LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", (row[0],))
+            self._drop_orphan_blobs()
+            self._stats['evictions'] += 1
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def stats(self) -> dict:
+        """
+        Get page cache counters
+        
+        Returns:
+            dict: revalidations (304s), changed pages, stores, evictions and stored urls/texts/bytes
+        """
+        with self._lock:
+            urls = self._db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            blobs, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            stats = dict(self._stats)
+        stats.update({'urls': urls, 'texts': blobs, 'bytes': size})
+        return stats
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """
+    Get the process-wide page cache
+    
+    Returns:
+        Optional[PageCache]: The shared cache, or None if disabled with PAGE_CACHE=false
+    """
+    global _page_cache
+    if os.getenv('PAGE_CACHE', 'true').lower() != 'true':
+        return None
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = PageCache()
+    return _page_cache
+
+
+# Self-check against a local origin server
+if __name__ == "__main__":
+    import tempfile
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    
+    class OriginHandler(BaseHTTPRequestHandler):
+        """Serves one page with an ETag and answers matching revalidations with 304"""
+        body = b"<html><body><nav>Menu</nav><p>Cached article text.</p></body></html>"
+        etag = '"v1"'
+        full_responses = 0
+        
+        def do_GET(self):
+            if self.headers.get('If-None-Match') == self.etag:
+                self.send_response(304)
+                self.send_header('ETag', self.etag)
+                self.end_headers()
+                return
+            OriginHandler.full_responses += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(self.body)))
+            self.send_header('ETag', self.etag)
+            self.end_headers()
+            self.wfile.write(self.body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OriginHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/article"
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ['PAGE_CACHE'] = 'true'
+        os.environ['PAGE_CACHE_PATH'] = os.path.join(tmp_dir, 'page_cache.sqlite3')
+        
+        # Import through the module name so websearch sees the same cache instance
+        import page_cache
+        from websearch import get_cleaned_content
+        
+        first = get_cleaned_content(url)
+        second = get_cleaned_content(url)
+        OriginHandler.body = OriginHandler.body.replace(b"Cached", b"Updated")
+        OriginHandler.etag = '"v2"'
+        third = get_cleaned_content(url)
+        
+        assert first == second == "Cached article text.", (first, second)
+        assert third == "Updated article text.", third
+        assert OriginHandler.full_responses == 2, OriginHandler.full_responses
+        print("✅ Page cache revalidation works:", page_cache.get_page_cache().stats())
+    
+    server.shutdown()
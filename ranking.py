@@ -0,0 +1,211 @@
+import os
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Tuple
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+# Very common words carry no ranking signal
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "how", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "when", "where", "which",
+    "who", "will", "with", "you", "your", "i", "me", "my", "we", "do", "does", "can", "about",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens without stopwords
+    
+    Args:
+        text (str): Text to tokenize
+    
+    Returns:
+        List[str]: Tokens in order of appearance
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def split_passages(text: str, max_words: int = 80) -> List[str]:
+    """
+    Split text into passages of whole sentences of up to about max_words words
+    
+    Args:
+        text (str): Cleaned page text
+        max_words (int): Target passage length in words (default: 80)
+    
+    Returns:
+        List[str]: Passages in document order
+    """
+    passages = []
+    current = []
+    current_words = 0
+    for sentence in SENTENCE_PATTERN.split(text):
+        words = sentence.split()
+        # Break up run-on "sentences" (menus, tables) that exceed the passage size on their own
+        while len(words) > max_words:
+            if current:
+                passages.append(" ".join(current))
+                current, current_words = [], 0
+            passages.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        if current_words + len(words) > max_words and current:
+            passages.append(" ".join(current))
+            current, current_words = [], 0
+        if words:
+            current.append(" ".join(words))
+            current_words += len(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+class BM25Index:
+    """
+    Incremental in-memory inverted index scored with Okapi BM25
+    
+    Documents can be added at any time; collection statistics are updated as they
+    arrive, so the index never needs rebuilding.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[object, int]] = {}
+        self.doc_lengths: Dict[object, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id, text: str):
+        """
+        Index a document
+        
+        Args:
+            doc_id: Any hashable identifier
+            text (str): Document text
+        """
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        for term, count in Counter(tokens).items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id):
+        """Remove a document from the index if present"""
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in list(self.postings):
+            docs = self.postings[term]
+            if docs.pop(doc_id, None) is not None and not docs:
+                del self.postings[term]
+
+    def scores(self, query: str) -> Dict[object, float]:
+        """
+        Score every document that shares a term with the query
+        
+        Args:
+            query (str): Query text
+        
+        Returns:
+            Dict: doc_id -> BM25 score (documents without matching terms are omitted)
+        """
+        n = len(self.doc_lengths)
+        if not n:
+            return {}
+        avg_length = self.total_length / n or 1.0
+        
+        scores: Dict[object, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, top_k: int = None) -> List[Tuple[object, float]]:
+        """
+        Get the best-matching documents for a query
+        
+        Args:
+            query (str): Query text
+            top_k (int, optional): Maximum number of results (default: all matches)
+        
+        Returns:
+            List[Tuple]: (doc_id, score) pairs, best first
+        """
+        ranked = sorted(self.scores(query).items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_k] if top_k else ranked
+
+
+def select_passages(search_results: List[Dict[str, str]], queries: List[str], token_budget: int = None) -> List[Dict[str, str]]:
+    """
+    Keep only the passages of each source that are most relevant to the queries
+    
+    All sources are split into passages and ranked together with BM25 against every
+    query. Each source's best passage is taken first so no source is lost, then the
+    remaining budget is filled with the highest-scoring passages overall.
+    
+    Args:
+        search_results (List[Dict]): Results from web_search ('url', 'title', 'content')
+        queries (List[str]): The original question and any optimized search queries
+        token_budget (int, optional): Total tokens of passages to keep. If None, uses SUMMARY_TOKEN_BUDGET from .env (default: 1500)
+    
+    Returns:
+        List[Dict]: The results, in the same order, with 'content' reduced to the
+        selected passages in document order (sources with no selected passage are dropped)
+    """
+    token_budget = token_budget or int(os.getenv('SUMMARY_TOKEN_BUDGET', 1500))
+    
+    index = BM25Index()
+    passages = {}
+    for source, result in enumerate(search_results):
+        for position, passage in enumerate(split_passages(result.get('content', ''))):
+            passages[(source, position)] = passage
+            index.add((source, position), passage)
+    
+    scores: Dict[Tuple[int, int], float] = {}
+    for query in queries:
+        if query:
+            for doc_id, score in index.scores(query).items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+    
+    # Every passage is a candidate; unmatched ones rank last, earlier passages first
+    ranked = sorted(passages, key=lambda doc_id: (-scores.get(doc_id, 0.0), doc_id[1], doc_id[0]))
+    best_per_source = {}
+    for doc_id in ranked:
+        best_per_source.setdefault(doc_id[0], doc_id)
+    
+    selected = set()
+    used = 0
+    for doc_id in list(best_per_source.values()) + ranked:
+        if doc_id in selected:
+            continue
+        cost = estimate_tokens(passages[doc_id])
+        if used + cost > token_budget:
+            continue
+        selected.add(doc_id)
+        used += cost
+    
+    reduced = []
+    for source, result in enumerate(search_results):
+        kept = [passages[doc_id] for doc_id in sorted(selected) if doc_id[0] == source]
+        if kept:
+            reduced.append({**result, 'content': " ... ".join(kept)})
+    return reduced
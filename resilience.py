@@ -0,0 +1,394 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, List
+
+from scheduler import get_scheduler, llm_upstream
+
+
+# Statuses worth trying again on the same model: timeouts, rate limits, overload and model loading
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Statuses no other model can fix
+FATAL_STATUSES = {401, 403}
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of a failed request, if the error carries a response"""
+    return getattr(getattr(error, 'response', None), 'status_code', None)
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Decide how to handle a failed LLM request
+
+    Returns:
+        str: 'retry' (transient, try the same model again), 'fallback' (this model
+        cannot serve the request, try the next one) or 'fatal' (raise immediately)
+    """
+    status = error_status(error)
+    if status is None:
+        try:
+            from httpx2 import TransportError
+        except ImportError:
+            from httpx import TransportError
+        if isinstance(error, (TransportError, TimeoutError, ConnectionError)):
+            return 'retry'
+        return 'fatal'
+    if status in FATAL_STATUSES:
+        return 'fatal'
+    if status in RETRYABLE_STATUSES:
+        return 'retry'
+    return 'fallback'
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (seconds or an HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def suggested_wait(error: Exception) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait before retrying
+
+    Uses the Retry-After header (seconds or an HTTP date), or the estimated_time of a
+    "model is currently loading" response.
+    """
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+
+    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+    if retry_after is not None:
+        return retry_after
+
+    if error_status(error) == 503:
+        try:
+            body = json.loads(response.text)
+        except Exception:
+            return None
+        if isinstance(body, dict) and 'loading' in str(body.get('error', '')).lower():
+            return float(body.get('estimated_time') or 0) or None
+    return None
+
+
+class ModelHealth:
+    """
+    Rolling latency and error rate per model
+
+    Keeps the outcomes of recent calls (at most window per model, none older than
+    ttl seconds, so a model that had a bad spell is tried again later) and scores
+    models by mean latency inflated by their error rate.
+    """
+
+    def __init__(self, window: int = 50, ttl: float = 300, min_samples: int = 3, error_penalty: float = 4.0):
+        self.window = window
+        self.ttl = ttl
+        self.min_samples = min_samples
+        self.error_penalty = error_penalty
+
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, model: str, latency: Optional[float], ok: bool):
+        """Record one call; latency None counts towards the error rate only (e.g. streams)"""
+        with self._lock:
+            samples = self._samples.setdefault(model, deque(maxlen=self.window))
+            samples.append((time.monotonic(), latency, ok))
+
+    def models(self) -> List[str]:
+        """Models with recorded calls"""
+        with self._lock:
+            return list(self._samples)
+
+    def _recent(self, model: str) -> list:
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            return [sample for sample in self._samples.get(model, ()) if sample[0] >= cutoff]
+
+    def summary(self, model: str) -> dict:
+        """
+        Get a model's recent behaviour
+
+        Returns:
+            dict: calls, error_rate, mean and p95 latency (seconds, None without enough
+            successful calls) and score (lower is better, None without enough calls)
+        """
+        samples = self._recent(model)
+        latencies = sorted(latency for _, latency, ok in samples if ok and latency is not None)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        error_rate = errors / len(samples) if samples else 0.0
+
+        mean = p95 = score = None
+        if len(latencies) >= self.min_samples:
+            mean = sum(latencies) / len(latencies)
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        if len(samples) >= self.min_samples:
+            if mean is not None:
+                score = mean * (1 + self.error_penalty * error_rate)
+            elif error_rate > 0.5:
+                # Failing most calls (or only streamed ones, which carry no latency)
+                score = float('inf')
+        return {'calls': len(samples), 'error_rate': error_rate, 'mean_latency': mean, 'p95_latency': p95, 'score': score}
+
+    def rank(self, models: List[str]) -> List[str]:
+        """
+        Order a fallback chain by score
+
+        Models without enough recent calls are scored like the best measured model,
+        so the configured order decides between them.
+        """
+        scores = {model: self.summary(model)['score'] for model in models}
+        measured = [score for score in scores.values() if score is not None]
+        default = min(measured) if measured else 0.0
+        return sorted(models, key=lambda model: (default if scores[model] is None else scores[model], models.index(model)))
+
+
+class ResilientCaller:
+    """
+    Runs LLM requests with retries, optional hedging and model fallback
+
+    Transient failures (rate limits, overload, model loading, timeouts) are retried
+    with exponential backoff and full jitter, waiting at least as long as the
+    provider's Retry-After or model-loading estimate. When a model keeps failing,
+    cannot serve the request, or asks for a longer wait than LLM_RETRY_MAX_DELAY,
+    the next model of its fallback chain is used. Chains are ordered by each
+    model's rolling latency and error rate, so slow or failing models lose traffic.
+
+    With hedging on, an async request that takes longer than the model's p95
+    latency gets a second request (to the next model of the chain, or the same
+    model if it has no fallbacks); the first answer wins and the other is cancelled.
+
+    Configuration (environment variables):
+        LLM_MAX_RETRIES: Retries per model for transient failures (default: 3)
+        LLM_RETRY_BASE_DELAY: Backoff before the first retry, doubling each time (default: 0.5)
+        LLM_RETRY_MAX_DELAY: Longest wait before a retry, in seconds (default: 20)
+        LLM_HEDGE: Send hedged requests for slow async calls (true/false, default: false)
+        LLM_HEDGE_MIN_DELAY: Never hedge sooner than this many seconds (default: 0.5)
+        MODEL_FALLBACKS: Fallback chains, e.g. "google/gemma-2-2b-it=microsoft/phi-4|meta-llama/Meta-Llama-3.1-8B-Instruct"
+        LLM_HEALTH_WINDOW: Recent calls per model used for ranking (default: 50)
+        LLM_HEALTH_TTL: Seconds a call counts towards ranking (default: 300)
+    """
+
+    def __init__(self, health: ModelHealth = None, max_retries: int = None, base_delay: float = None,
+                 max_delay: float = None, hedge: bool = None, hedge_min_delay: float = None):
+        self.health = health or ModelHealth(window=int(os.getenv('LLM_HEALTH_WINDOW', 50)),
+                                            ttl=float(os.getenv('LLM_HEALTH_TTL', 300)))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 3))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv('LLM_RETRY_MAX_DELAY', 20))
+        self.hedge = hedge if hedge is not None else os.getenv('LLM_HEDGE', 'false').lower() == 'true'
+        self.hedge_min_delay = hedge_min_delay if hedge_min_delay is not None else float(os.getenv('LLM_HEDGE_MIN_DELAY', 0.5))
+
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'retries': 0, 'fallbacks': 0, 'hedges': 0, 'hedge_wins': 0, 'failures': 0}
+
+    @staticmethod
+    def fallback_models(model: str) -> List[str]:
+        """Configured fallbacks for a model, in order"""
+        for entry in os.getenv('MODEL_FALLBACKS', '').split(','):
+            name, _, fallbacks = entry.strip().partition('=')
+            if name == model:
+                return [fallback.strip() for fallback in fallbacks.split('|') if fallback.strip() and fallback.strip() != model]
+        return []
+
+    def chain(self, model: str) -> List[str]:
+        """The model and its fallbacks, best first"""
+        return self.health.rank([model] + self.fallback_models(model))
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _retry_delay(self, error: Exception, retry: int, has_fallback: bool) -> Optional[float]:
+        """Seconds to wait before retrying, or None to move on to the next model"""
+        if retry >= self.max_retries:
+            return None
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+        wait = suggested_wait(error)
+        if wait is None:
+            return backoff
+        if wait > self.max_delay and has_fallback:
+            return None
+        return min(self.max_delay, max(wait, backoff))
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds after which a request to model is hedged, None if it is not"""
+        if not self.hedge:
+            return None
+        p95 = self.health.summary(model)['p95_latency']
+        return None if p95 is None else max(self.hedge_min_delay, p95)
+
+    def _failed(self, model: str, error: Exception, start: float, measure: bool) -> str:
+        """Record a failed attempt and decide what to do next"""
+        if error_status(error) == 429:
+            # Hold back the model's other requests too, not just this retry
+            get_scheduler().throttled(llm_upstream(model), suggested_wait(error))
+        decision = classify_error(error)
+        if decision != 'fatal':
+            self.health.record(model, time.perf_counter() - start if measure else None, False)
+        return decision
+
+    def call(self, model: str, attempt: Callable, measure: bool = True):
+        """
+        Run attempt(model_name) until it succeeds, retrying and falling back as needed
+
+        Args:
+            model (str): The requested model
+            attempt (Callable): Makes one request to the given model and returns its result
+            measure (bool): Record latencies for ranking (False for streams)
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            Exception: The last error once every model of the chain has failed, or a fatal one
+        """
+        self._count('calls')
+        chain = self.chain(model)
+        last_error = None
+        for index, model_name in enumerate(chain):
+            if index:
+                self._count('fallbacks')
+                print(f"🔀 Falling back to {model_name}")
+            for retry in range(self.max_retries + 1):
+                start = time.perf_counter()
+                try:
+                    result = attempt(model_name)
+                except Exception as e:
+                    last_error = e
+                    decision = self._failed(model_name, e, start, measure)
+                    if decision == 'fatal':
+                        raise
+                    delay = self._retry_delay(e, retry, index + 1 < len(chain)) if decision == 'retry' else None
+                    if delay is None:
+                        break
+                    self._count('retries')
+                    time.sleep(delay)
+                    continue
+                self.health.record(model_name, time.perf_counter() - start if measure else None, True)
+                return result
+        self._count('failures')
+        raise last_error
+
+    async def acall(self, model: str, attempt: Callable, measure: bool = True, hedge: bool = True):
+        """
+        Async version of call; attempt(model_name) returns an awaitable
+
+        Args:
+            hedge (bool): Allow a hedged request when this one is slow (False for streams)
+        """
+        self._count('calls')
+        chain = self.chain(model)
+        last_error = None
+        for index, model_name in enumerate(chain):
+            if index:
+                self._count('fallbacks')
+                print(f"🔀 Falling back to {model_name}")
+            for retry in range(self.max_retries + 1):
+                hedge_model = chain[index + 1] if index + 1 < len(chain) else model_name
+                try:
+                    if hedge and retry == 0:
+                        return await self._ahedged(model_name, hedge_model, attempt, measure)
+                    return await self._atimed(model_name, attempt, measure)
+                except Exception as e:
+                    last_error = e
+                    decision = classify_error(e)
+                    if decision == 'fatal':
+                        raise
+                    delay = self._retry_delay(e, retry, index + 1 < len(chain)) if decision == 'retry' else None
+                    if delay is None:
+                        break
+                    self._count('retries')
+                    await asyncio.sleep(delay)
+        self._count('failures')
+        raise last_error
+
+    async def _atimed(self, model: str, attempt: Callable, measure: bool, started: dict = None):
+        """Run one attempt and record its outcome"""
+        start = time.perf_counter()
+        if started is not None:
+            started[model] = start
+        try:
+            result = await attempt(model)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._failed(model, e, start, measure)
+            raise
+        self.health.record(model, time.perf_counter() - start if measure else None, True)
+        return result
+
+    async def _ahedged(self, model: str, hedge_model: str, attempt: Callable, measure: bool):
+        """Run an attempt, adding a second one if the first is slower than the model's p95"""
+        delay = self._hedge_delay(model)
+        if delay is None:
+            return await self._atimed(model, attempt, measure)
+
+        started = {}
+        primary = asyncio.create_task(self._atimed(model, attempt, measure, started))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self._count('hedges')
+        hedged = asyncio.create_task(self._atimed(hedge_model, attempt, measure, {}))
+        pending = {primary, hedged}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            self._count('hedge_wins')
+                            # The slow primary took at least this long; let the ranking see it
+                            if measure and primary in pending:
+                                self.health.record(model, time.perf_counter() - started[model], True)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """
+        Get retry, fallback and hedging counters plus each measured model's health
+
+        Returns:
+            dict: calls, retries, fallbacks, hedges, hedge_wins, failures and
+            'models' (model -> calls, error_rate, mean/p95 latency, score)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['models'] = {model: self.health.summary(model) for model in self.health.models()}
+        return stats
+
+
+_caller = None
+_caller_lock = threading.Lock()
+
+
+def get_resilient_caller() -> ResilientCaller:
+    """Get the process-wide resilient caller shared by all LLM functions"""
+    global _caller
+    if _caller is None:
+        with _caller_lock:
+            if _caller is None:
+                _caller = ResilientCaller()
+    return _caller
@@ -0,0 +1,334 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import urlparse
+
+
+# Lower runs first when requests to one upstream are queued
+PRIORITIES = {'interactive': 0, 'helper': 1, 'background': 2}
+
+_request_priority = contextvars.ContextVar('request_priority', default=None)
+
+
+@contextmanager
+def request_priority(priority: str):
+    """
+    Run every outbound request made inside the block (also in tasks and threads started with
+    asyncio.to_thread) at this priority class instead of its default
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority class: {priority}")
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def llm_upstream(model: str) -> str:
+    return f"llm:{model}"
+
+
+def host_upstream(url: str) -> str:
+    return f"host:{urlparse(url).netloc.lower()}"
+
+
+SEARCH_UPSTREAM = 'search'
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate is cut when the upstream answers 429
+
+    Each throttle halves the rate (down to 1/16 of the configured one) and blocks
+    the bucket for the Retry-After time; the rate then recovers linearly to the
+    configured one over recovery seconds without further 429s.
+    """
+
+    def __init__(self, rate: float, burst: float, recovery: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.recovery = recovery
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.penalty = 1.0
+        self.throttled_at = None
+
+    def factor(self, now: float) -> float:
+        """Share of the configured rate currently allowed"""
+        if self.throttled_at is None or self.recovery <= 0:
+            return 1.0
+        recovered = (now - self.throttled_at) / self.recovery
+        return min(1.0, self.penalty + (1.0 - self.penalty) * recovered)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate * self.factor(now))
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1.0:
+            wait = max(wait, (1.0 - self.tokens) / (self.rate * self.factor(now)))
+        return wait
+
+    def take(self):
+        self.tokens -= 1.0
+
+    def throttle(self, now: float, retry_after: Optional[float]):
+        self._refill(now)
+        self.penalty = max(1 / 16, self.factor(now) / 2)
+        self.throttled_at = now
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + (retry_after if retry_after is not None else 1.0 / (self.rate * self.penalty)))
+
+
+class _Waiter:
+    """A request queued for a token; notify() wakes it to check whether it is its turn"""
+
+    def __init__(self):
+        try:
+            self.loop = asyncio.get_running_loop()
+            self.event = asyncio.Event()
+        except RuntimeError:
+            self.loop = None
+            self.event = threading.Event()
+
+    def notify(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class _Upstream:
+    def __init__(self, bucket: Optional[TokenBucket]):
+        self.bucket = bucket
+        self.queue = []
+        self.stats = {'requests': 0, 'queued': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0,
+                      'max_queue_depth': 0, 'throttled': 0}
+
+
+class RateScheduler:
+    """
+    Client-side rate limiting of outbound LLM, search and page requests
+
+    Every upstream (each LLM model, the search backend, each website) has its own
+    token bucket. When requests to one upstream have to wait, they are served by
+    priority class, then in arrival order: the user-facing chat completion
+    ('interactive') goes ahead of helper calls like classification, planning and
+    summarization ('helper'), which go ahead of speculative and batch work
+    ('background'). A 429 from an upstream cuts its rate and honours Retry-After
+    (see TokenBucket), so bursts back off before the provider starts failing
+    whole turns.
+
+    Works from threads and from any event loop; async waiters do not block their loop.
+
+    Configuration (environment variables):
+        RATE_LIMIT_LLM: Requests per second to each LLM model, 0 for no limit (default: 2)
+        RATE_LIMIT_SEARCH: Search backend lookups per second, 0 for no limit (default: 1)
+        RATE_LIMIT_BURST: Requests an idle LLM or search upstream may send at once (default: 5)
+        RATE_LIMITS: Per-upstream rate overrides, e.g. "llm:microsoft/phi-4=0.5,search=0.2,host:example.com=0.2"
+        RATE_RECOVERY_SECONDS: Seconds for a throttled upstream to recover its full rate (default: 60)
+        SEARCH_HOST_MIN_INTERVAL: Minimum seconds between requests to one website, 0 for no limit (default: 1.0)
+    """
+
+    def __init__(self, llm_rate: float = None, search_rate: float = None, burst: float = None,
+                 host_min_interval: float = None, recovery: float = None):
+        self.llm_rate = llm_rate if llm_rate is not None else float(os.getenv('RATE_LIMIT_LLM', 2))
+        self.search_rate = search_rate if search_rate is not None else float(os.getenv('RATE_LIMIT_SEARCH', 1))
+        self.burst = burst or float(os.getenv('RATE_LIMIT_BURST', 5))
+        self.host_min_interval = host_min_interval if host_min_interval is not None else float(os.getenv('SEARCH_HOST_MIN_INTERVAL', 1.0))
+        self.recovery = recovery if recovery is not None else float(os.getenv('RATE_RECOVERY_SECONDS', 60))
+
+        self._lock = threading.Lock()
+        self._upstreams = {}
+        self._sequence = itertools.count()
+        self._priority_stats = {name: {'requests': 0, 'wait_seconds': 0.0} for name in PRIORITIES}
+
+    def limit(self, upstream: str) -> tuple:
+        """(requests per second, burst) for an upstream; a rate of 0 means no limit"""
+        if upstream.startswith('host:'):
+            rate, burst = (1.0 / self.host_min_interval if self.host_min_interval > 0 else 0.0), 1.0
+        elif upstream == SEARCH_UPSTREAM:
+            rate, burst = self.search_rate, self.burst
+        else:
+            rate, burst = self.llm_rate, self.burst
+        for entry in os.getenv('RATE_LIMITS', '').split(','):
+            name, _, value = entry.strip().rpartition('=')
+            if name == upstream:
+                try:
+                    rate = float(value)
+                except ValueError:
+                    pass
+        return rate, burst
+
+    def _upstream(self, upstream: str) -> _Upstream:
+        state = self._upstreams.get(upstream)
+        if state is None:
+            rate, burst = self.limit(upstream)
+            state = self._upstreams[upstream] = _Upstream(TokenBucket(rate, burst, self.recovery) if rate > 0 else None)
+        return state
+
+    def _enqueue(self, upstream: str, priority: str):
+        """Put a request in its upstream's queue, or grant it at once; returns (state, entry or None)"""
+        with self._lock:
+            state = self._upstream(upstream)
+            state.stats['requests'] += 1
+            if state.bucket is None:
+                return state, None
+            if not state.queue and state.bucket.wait_time(time.monotonic()) <= 0:
+                state.bucket.take()
+                return state, None
+            entry = (PRIORITIES[priority], next(self._sequence), _Waiter())
+            heapq.heappush(state.queue, entry)
+            state.stats['queued'] += 1
+            state.stats['max_queue_depth'] = max(state.stats['max_queue_depth'], len(state.queue))
+            return state, entry
+
+    def _try_take(self, state: _Upstream, entry: tuple) -> Optional[float]:
+        """Take a token if this request is first in line; returns 0 when granted, else seconds to wait (None: until notified)"""
+        with self._lock:
+            if state.queue[0] is not entry:
+                return None
+            wait = state.bucket.wait_time(time.monotonic())
+            if wait > 0:
+                return wait
+            state.bucket.take()
+            heapq.heappop(state.queue)
+            if state.queue:
+                state.queue[0][2].notify()
+            return 0.0
+
+    def _leave(self, state: _Upstream, entry: tuple):
+        """Remove a request that gave up waiting and let the next one in line check"""
+        with self._lock:
+            if entry in state.queue:
+                was_first = state.queue[0] is entry
+                state.queue.remove(entry)
+                heapq.heapify(state.queue)
+                if was_first and state.queue:
+                    state.queue[0][2].notify()
+
+    def _record(self, state: _Upstream, priority: str, waited: float):
+        with self._lock:
+            state.stats['wait_seconds'] += waited
+            state.stats['max_wait_seconds'] = max(state.stats['max_wait_seconds'], waited)
+            self._priority_stats[priority]['requests'] += 1
+            self._priority_stats[priority]['wait_seconds'] += waited
+
+    def acquire(self, upstream: str, priority: str = 'helper') -> float:
+        """
+        Block until a request to the upstream may be sent
+
+        Args:
+            upstream (str): Upstream name ('llm:<model>', 'search' or 'host:<netloc>')
+            priority (str): Default priority class; request_priority() overrides it
+
+        Returns:
+            float: Seconds waited
+        """
+        priority = _request_priority.get() or priority
+        start = time.monotonic()
+        state, entry = self._enqueue(upstream, priority)
+        if entry is not None:
+            try:
+                while True:
+                    wait = self._try_take(state, entry)
+                    if wait == 0:
+                        break
+                    entry[2].event.wait(wait)
+                    entry[2].event.clear()
+            finally:
+                self._leave(state, entry)
+        waited = time.monotonic() - start
+        self._record(state, priority, waited)
+        return waited
+
+    async def aacquire(self, upstream: str, priority: str = 'helper') -> float:
+        """Async version of acquire that waits without blocking the event loop"""
+        priority = _request_priority.get() or priority
+        start = time.monotonic()
+        state, entry = self._enqueue(upstream, priority)
+        if entry is not None:
+            try:
+                while True:
+                    wait = self._try_take(state, entry)
+                    if wait == 0:
+                        break
+                    try:
+                        await asyncio.wait_for(entry[2].event.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    entry[2].event.clear()
+            finally:
+                self._leave(state, entry)
+        waited = time.monotonic() - start
+        self._record(state, priority, waited)
+        return waited
+
+    def throttled(self, upstream: str, retry_after: Optional[float] = None):
+        """
+        Report a 429 (or equivalent) from an upstream, slowing down its future requests
+
+        Args:
+            upstream (str): Upstream name
+            retry_after (float, optional): Seconds the upstream asked us to wait
+        """
+        with self._lock:
+            state = self._upstream(upstream)
+            state.stats['throttled'] += 1
+            if state.bucket is None:
+                # Unlimited upstreams still honour the wait the provider asked for
+                state.bucket = TokenBucket(self.llm_rate or 1.0, self.burst, self.recovery)
+            state.bucket.throttle(time.monotonic(), retry_after)
+        print(f"🚦 {upstream} is rate limiting, slowing down"
+              f"{f' for {retry_after:.3g}s' if retry_after else ''}")
+
+    def stats(self) -> dict:
+        """
+        Get queue and wait metrics
+
+        Returns:
+            dict: 'upstreams' (name -> requests, queued, queue_depth, max_queue_depth,
+            mean/max wait seconds, throttled count and the current share of the
+            configured rate) and 'priorities' (class -> requests, mean wait seconds)
+        """
+        now = time.monotonic()
+        with self._lock:
+            upstreams = {}
+            for name, state in sorted(self._upstreams.items()):
+                stats = dict(state.stats)
+                stats['queue_depth'] = len(state.queue)
+                stats['mean_wait_seconds'] = stats['wait_seconds'] / stats['requests'] if stats['requests'] else 0.0
+                stats['rate_factor'] = state.bucket.factor(now) if state.bucket else 1.0
+                stats['rate'] = state.bucket.rate * stats['rate_factor'] if state.bucket else None
+                upstreams[name] = stats
+            priorities = {
+                name: {'requests': stats['requests'],
+                       'mean_wait_seconds': stats['wait_seconds'] / stats['requests'] if stats['requests'] else 0.0}
+                for name, stats in self._priority_stats.items()
+            }
+        return {'upstreams': upstreams, 'priorities': priorities}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RateScheduler:
+    """Get the process-wide request scheduler (shared by every session, so limits hold per process)"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RateScheduler()
+    return _scheduler
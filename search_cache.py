@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from storage import get_data_dir
+
+
+# Queries about fast-changing data get short TTLs, reference material long ones
+REALTIME_PATTERN = re.compile(r"\b(now|today|tonight|current|currently|live|weather|forecast|prices?|stocks?|"
+                              r"share price|exchange rate|bitcoin|crypto|scores?|standings|news|headlines|traffic)\b")
+RECENT_PATTERN = re.compile(r"\b(latest|recent|recently|this week|this month|this year|yesterday|upcoming|"
+                            r"release|released|launch|launched|(19|20)\d{2})\b")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially re-worded versions share a cache key
+    
+    Lowercases, drops punctuation and collapses whitespace, so "Bitcoin price now?"
+    and "bitcoin  price now" map to the same key.
+    
+    Args:
+        query (str): The raw query
+    
+    Returns:
+        str: The normalized query
+    """
+    return " ".join(re.findall(r"[a-z0-9]+", query.lower()))
+
+
+def classify_query_ttl(query: str) -> float:
+    """
+    Pick a cache TTL in seconds for results of a query based on how quickly its answer changes
+    
+    Configuration (environment variables):
+        SEARCH_CACHE_TTL_REALTIME: Weather, prices, scores, news (default: 600)
+        SEARCH_CACHE_TTL_RECENT: Latest releases, recent events (default: 21600)
+        SEARCH_CACHE_TTL_REFERENCE: Everything else (default: 604800)
+    
+    Args:
+        query (str): The query (raw or normalized)
+    
+    Returns:
+        float: TTL in seconds
+    """
+    normalized = normalize_query(query)
+    if REALTIME_PATTERN.search(normalized):
+        return float(os.getenv('SEARCH_CACHE_TTL_REALTIME', 600))
+    if RECENT_PATTERN.search(normalized):
+        return float(os.getenv('SEARCH_CACHE_TTL_RECENT', 21600))
+    return float(os.getenv('SEARCH_CACHE_TTL_REFERENCE', 604800))
+
+
+class SearchCache:
+    """
+    Persistent TTL cache for search hit lists and summaries
+    
+    Entries live in a SQLite database so they survive between sessions, with a
+    process-local LRU in front for repeated lookups. Values are grouped by namespace
+    ('hits', 'summary') and must be JSON-serializable. When the database grows
+    past its size limit, the least recently used entries are evicted. Page text is
+    not kept here: page_cache.PageCache revalidates it with the origin instead.
+    
+    Lookups only read: access times of disk hits are kept in memory and written with
+    the next set(), so a cache hit never waits for a commit.
+    
+    Configuration (environment variables):
+        SEARCH_CACHE_PATH: SQLite database file (default: <data dir>/search_cache.sqlite3)
+        SEARCH_CACHE_MAX_MB: Maximum size of stored values in megabytes (default: 50)
+        SEARCH_CACHE_MEMORY_ENTRIES: Entries kept in the in-memory LRU (default: 256)
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None, memory_entries: int = None):
+        self.path = path or os.getenv('SEARCH_CACHE_PATH') or os.path.join(get_data_dir(), 'search_cache.sqlite3')
+        self.max_bytes = max_bytes or int(float(os.getenv('SEARCH_CACHE_MAX_MB', 50)) * 1024 * 1024)
+        self.memory_entries = memory_entries or int(os.getenv('SEARCH_CACHE_MEMORY_ENTRIES', 256))
+        
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._pending_access = {}
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+        
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+        self._db.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Look up a cached value
+        
+        Args:
+            namespace (str): Kind of value ('hits', 'summary')
+            key (str): Cache key within the namespace
+        
+        Returns:
+            The cached value, or None on a miss or if the entry has expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end((namespace, key))
+                    self._stats['memory_hits'] += 1
+                    return value
+                del self._memory[(namespace, key)]
+            
+            row = self._db.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            if row[1] <= now:
+                # Expired rows are deleted by the next eviction pass
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            
+            self._pending_access[(namespace, key)] = now
+            value = json.loads(row[0])
+            self._remember(namespace, key, value, row[1])
+            self._stats['disk_hits'] += 1
+            return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        """
+        Store a value
+        
+        Args:
+            namespace (str): Kind of value ('hits', 'summary')
+            key (str): Cache key within the namespace
+            value: JSON-serializable value
+            ttl (float): Seconds until the entry expires
+        """
+        now = time.time()
+        serialized = json.dumps(value)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, serialized, len(serialized), now + ttl, now)
+            )
+            self._pending_access.pop((namespace, key), None)
+            self._flush_access()
+            self._evict()
+            self._db.commit()
+            self._remember(namespace, key, value, now + ttl)
+
+    def _remember(self, namespace: str, key: str, value: Any, expires_at: float):
+        """Put a value in the in-memory LRU (caller holds the lock)"""
+        self._memory[(namespace, key)] = (value, expires_at)
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_access(self):
+        """Write the access times of disk hits since the last write (caller holds the lock and commits)"""
+        if self._pending_access:
+            self._db.executemany(
+                "UPDATE cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                [(accessed, namespace, key) for (namespace, key), accessed in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until under the size limit (caller holds the lock)"""
+        self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        for namespace, key, size in self._db.execute(
+            "SELECT namespace, key, size FROM cache ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+            self._memory.pop((namespace, key), None)
+            total -= size
+            self._stats['evictions'] += 1
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._memory.clear()
+            self._pending_access.clear()
+            self._db.execute("DELETE FROM cache")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+        
+        Returns:
+            dict: memory/disk hits, misses, expirations, evictions, hit rate and stored entries/bytes
+        """
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+            stats = dict(self._stats)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = hits / lookups if lookups else 0.0
+        stats['entries'] = entries
+        stats['bytes'] = size
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    Get the process-wide search cache
+    
+    Returns:
+        Optional[SearchCache]: The shared cache, or None if disabled with SEARCH_CACHE=false
+    """
+    global _cache
+    if os.getenv('SEARCH_CACHE', 'true').lower() != 'true':
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache()
+    return _cache
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+OpenAI-compatible HTTP server for the search-augmented chatbot
+Serves /v1/chat/completions (with SSE streaming) to many sessions at once
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from chat import HuggingFaceChatbot, create_chatbot
+from LLMfunc import get_connection_stats
+from scheduler import get_scheduler
+from ranking import estimate_tokens
+
+
+# Session ids are echoed in a response header, so only plain tokens are accepted
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,128}")
+
+
+class ChatSession:
+    """One conversation: a chatbot with its own history, serialized by a lock"""
+
+    def __init__(self, session_id: str, chatbot: HuggingFaceChatbot):
+        self.session_id = session_id
+        self.chatbot = chatbot
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+        # Client system messages are taken from the session's first request only
+        self.started = False
+
+
+class SessionStore:
+    """
+    Bounded LRU store of chat sessions
+
+    Each session keeps its own conversation_history. When the store is full the
+    least recently used session is dropped; a turn already running on it still
+    completes.
+
+    Configuration (environment variables):
+        SERVER_MAX_SESSIONS: Maximum number of sessions kept (default: 256)
+    """
+
+    def __init__(self, create_chatbot, max_sessions: int = None):
+        self.create_chatbot = create_chatbot
+        self.max_sessions = max_sessions or int(os.getenv('SERVER_MAX_SESSIONS', 256))
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._created = 0
+        self._evicted = 0
+
+    def get(self, session_id: str) -> ChatSession:
+        """Return the session with this id, creating it (and evicting the oldest) if needed"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_used = time.time()
+                return session
+
+            session = ChatSession(session_id, self.create_chatbot())
+            self._sessions[session_id] = session
+            self._created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._evicted += 1
+            return session
+
+    def stats(self) -> dict:
+        """
+        Get session store counters
+
+        Returns:
+            dict: active sessions, capacity, sessions created and sessions evicted
+        """
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'created': self._created,
+                'evicted': self._evicted
+            }
+
+
+class ChatCompletionHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for the OpenAI-compatible API
+
+    Endpoints:
+        POST /v1/chat/completions: Run a turn through the search-augmented pipeline
+        GET /v1/models: List the chat model
+        GET /health: Liveness plus session and connection counters
+
+    A request with a session id (the X-Session-Id header or a 'session_id' field)
+    continues that session's server-side history, so only its last user message is
+    used (and, on the session's first request, its system messages). Without one,
+    the request's own messages are the history of a one-off session. Client system
+    messages are appended to the server's system prompt rather than replacing it.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "Friday"
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} - {format % args}")
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str, error_type: str = 'invalid_request_error'):
+        self._send_json(status, {'error': {'message': message, 'type': error_type, 'code': status}})
+
+    def _authorized(self) -> bool:
+        api_key = self.server.api_key
+        if not api_key:
+            return True
+        if self.headers.get('Authorization', '') == f"Bearer {api_key}":
+            return True
+        self._send_error(401, "Invalid API key", 'authentication_error')
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == '/health':
+            self._send_json(200, {
+                'status': 'ok',
+                'sessions': self.server.sessions.stats(),
+                'connections': get_connection_stats(),
+                'scheduler': get_scheduler().stats()
+            })
+        elif self.path == '/v1/models':
+            model = self.server.default_model
+            self._send_json(200, {'object': 'list', 'data': [
+                {'id': model, 'object': 'model', 'created': 0, 'owned_by': 'friday'}
+            ]})
+        else:
+            self._send_error(404, f"Unknown path: {self.path}")
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path != '/v1/chat/completions':
+            self._send_error(404, f"Unknown path: {self.path}")
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_error(400, f"Malformed JSON body: {str(e)}")
+            return
+
+        messages = request.get('messages')
+        if (not isinstance(messages, list) or not messages or not isinstance(messages[-1], dict)
+                or messages[-1].get('role') != 'user' or not isinstance(messages[-1].get('content'), str)):
+            self._send_error(400, "'messages' must be a list ending with a user message")
+            return
+
+        session_id = self.headers.get('X-Session-Id') or request.get('session_id')
+        if session_id:
+            if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+                self._send_error(400, "Session id must be 1-128 letters, digits, '.', '_' or '-'")
+                return
+            session = self.server.sessions.get(session_id)
+        else:
+            session = ChatSession(None, self.server.create_chatbot())
+            self._seed_history(session.chatbot, messages[:-1])
+
+        # Turns in one session run one at a time; different sessions run concurrently
+        with session.lock:
+            chatbot = session.chatbot
+            if session.session_id and not session.started:
+                self._seed_system_prompt(chatbot, messages[:-1])
+            session.started = True
+            chatbot.model = request.get('model') or self.server.default_model
+            if isinstance(request.get('max_tokens'), int) and request['max_tokens'] > 0:
+                chatbot.max_tokens = request['max_tokens']
+            else:
+                chatbot.max_tokens = self.server.default_max_tokens
+
+            if request.get('stream'):
+                self._stream_turn(session, messages[-1]['content'])
+            else:
+                self._complete_turn(session, messages[-1]['content'])
+
+    def _seed_history(self, chatbot: HuggingFaceChatbot, messages: list):
+        """Load the earlier messages of a sessionless request into a one-off chatbot"""
+        self._seed_system_prompt(chatbot, messages)
+        for message in messages:
+            if (isinstance(message, dict) and message.get('role') in ('user', 'assistant')
+                    and isinstance(message.get('content'), str)):
+                chatbot.add_message(message['role'], message['content'])
+
+    def _seed_system_prompt(self, chatbot: HuggingFaceChatbot, messages: list):
+        """Merge the client's system messages into the chatbot's system prompt"""
+        instructions = [message['content'] for message in messages
+                        if isinstance(message, dict) and message.get('role') == 'system'
+                        and isinstance(message.get('content'), str)]
+        if instructions:
+            chatbot.extend_system_prompt("\n\n".join(instructions))
+
+    def _completion_id(self) -> str:
+        return f"chatcmpl-{uuid.uuid4().hex}"
+
+    def _usage(self, chatbot: HuggingFaceChatbot, reply: str) -> dict:
+        """Estimated token usage of a turn (the prompt is the history the reply was generated from)"""
+        prompt_tokens = sum(estimate_tokens(m['content']) for m in chatbot.conversation_history[:-1])
+        completion_tokens = estimate_tokens(reply)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+
+    def _complete_turn(self, session: ChatSession, user_input: str):
+        chatbot = session.chatbot
+        try:
+            reply = chatbot.get_ai_response_with_search(user_input, raise_errors=True)
+        except Exception as e:
+            self._send_error(502, chatbot.format_error(e), 'upstream_error')
+            return
+
+        headers = {'X-Session-Id': session.session_id} if session.session_id else None
+        self._send_json(200, {
+            'id': self._completion_id(),
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': chatbot.model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'stop'
+            }],
+            'usage': self._usage(chatbot, reply)
+        }, headers)
+
+    def _send_event(self, payload) -> None:
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        self.wfile.write(f"data: {data}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _stream_turn(self, session: ChatSession, user_input: str):
+        chatbot = session.chatbot
+        completion_id = self._completion_id()
+        created = int(time.time())
+
+        def chunk(delta: dict, finish_reason: str = None) -> dict:
+            return {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': chatbot.model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            }
+
+        # Server-sent events have no length up front, so the connection ends with the stream
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        if session.session_id:
+            self.send_header('X-Session-Id', session.session_id)
+        self.end_headers()
+
+        tokens = chatbot.stream_ai_response_with_search(user_input, raise_errors=True)
+        try:
+            self._send_event(chunk({'role': 'assistant', 'content': ''}))
+            for token in tokens:
+                self._send_event(chunk({'content': token}))
+            self._send_event(chunk({}, 'stop'))
+        except (BrokenPipeError, ConnectionResetError):
+            print("⚠️ Client disconnected during streaming")
+            return
+        except Exception as e:
+            self._send_event({'error': {'message': chatbot.format_error(e), 'type': 'upstream_error', 'code': 502}})
+        finally:
+            tokens.close()
+
+        try:
+            self._send_event('[DONE]')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class ChatServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server sharing one session store and one set of upstream clients
+
+    Each request thread drives its turn on the chatbot's shared event loop, so
+    concurrent sessions overlap their LLM calls and page fetches. In-flight requests
+    per upstream model are capped by MODEL_CONCURRENCY / MODEL_CONCURRENCY_LIMITS.
+
+    Configuration (environment variables):
+        SERVER_API_KEY: If set, requests must send "Authorization: Bearer <key>"
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, settings: dict = None):
+        super().__init__(address, ChatCompletionHandler)
+        self.settings = settings or {}
+        self.api_key = os.getenv('SERVER_API_KEY') or None
+
+        # Fail fast on a missing token or system prompt problem instead of on the first request
+        template = self.create_chatbot()
+        self.default_model = template.model
+        self.default_max_tokens = template.max_tokens
+
+        self.sessions = SessionStore(self.create_chatbot)
+
+    def create_chatbot(self) -> HuggingFaceChatbot:
+        """Create a quiet chatbot with the command line overrides applied"""
+        return create_chatbot(self.settings)
+
+
+def serve(host: str = None, port: int = None, settings: dict = None):
+    """
+    Run the OpenAI-compatible server until interrupted
+
+    Configuration (environment variables):
+        SERVER_HOST: Interface to listen on (default: 127.0.0.1)
+        SERVER_PORT: Port to listen on (default: 8000)
+
+    Args:
+        host (str, optional): Overrides SERVER_HOST
+        port (int, optional): Overrides SERVER_PORT
+        settings (dict, optional): Chatbot attributes to override in every session
+    """
+    host = host or os.getenv('SERVER_HOST', '127.0.0.1')
+    port = port if port is not None else int(os.getenv('SERVER_PORT', 8000))
+
+    server = ChatServer((host, port), settings)
+    print(f"🚀 Serving OpenAI-compatible API on http://{host}:{server.server_port}/v1/chat/completions")
+    print(f"📡 Using model: {server.default_model}")
+    print(f"🗂️  Up to {server.sessions.max_sessions} sessions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down server")
+    finally:
+        server.server_close()
@@ -0,0 +1,139 @@
+import os
+import asyncio
+import threading
+from typing import List, Dict, Optional
+
+from ranking import tokenize
+from tracing import span
+from scheduler import request_priority
+from websearch import get_search_hits, aweb_search
+
+
+def query_overlap(a: str, b: str) -> float:
+    """Share of the shorter query's terms that also appear in the other query (0.0 to 1.0)"""
+    terms_a, terms_b = set(tokenize(a)), set(tokenize(b))
+    if not terms_a or not terms_b:
+        return 0.0
+    return len(terms_a & terms_b) / min(len(terms_a), len(terms_b))
+
+
+class Speculation:
+    """A search started for the raw user input before the turn was planned"""
+
+    def __init__(self, query: str, task: asyncio.Task, progress: dict):
+        self.query = query
+        self.task = task
+        self.progress = progress
+
+
+class SearchSpeculator:
+    """
+    Runs the search for the raw user input while the turn is still being planned
+
+    The DuckDuckGo lookup (and optionally the page fetches) starts at the same time
+    as the needs-search decision and query clarification. If the turn needs search
+    and the optimized query is close enough to the raw input, the speculative results
+    are used; otherwise they are cancelled or discarded. Hit and waste counters show
+    the latency saved against the extra outbound requests.
+
+    Configuration (environment variables):
+        SPECULATIVE_PREFETCH: Also fetch the result pages speculatively (default: false)
+        SPECULATIVE_MIN_OVERLAP: Term overlap with the optimized query needed to reuse results (default: 0.6)
+    """
+
+    def __init__(self, prefetch: bool = None, min_overlap: float = None):
+        self.prefetch = prefetch if prefetch is not None else os.getenv('SPECULATIVE_PREFETCH', 'false').lower() == 'true'
+        self.min_overlap = min_overlap if min_overlap is not None else float(os.getenv('SPECULATIVE_MIN_OVERLAP', 0.6))
+
+        self._lock = threading.Lock()
+        self._stats = {'started': 0, 'hits': 0, 'wasted_no_search': 0, 'wasted_mismatch': 0, 'failed': 0, 'wasted_requests': 0}
+
+    def start(self, user_input: str, num_results: int = 3) -> Speculation:
+        """Start searching for the raw user input on the running event loop"""
+        progress = {'requests': 0}
+
+        async def run():
+            # Speculative requests queue behind the turn's own requests
+            with request_priority('background'), span('speculative_search', query=user_input, prefetch=self.prefetch):
+                progress['requests'] += 1
+                hits = await asyncio.to_thread(get_search_hits, user_input, num_results)
+                if not self.prefetch:
+                    return hits
+                progress['requests'] += len(hits)
+                return await aweb_search(user_input, num_results, search_results=hits)
+
+        task = asyncio.create_task(run())
+        # A discarded speculation's failure is expected; don't report it as unretrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        with self._lock:
+            self._stats['started'] += 1
+        return Speculation(user_input, task, progress)
+
+    async def resolve(self, speculation: Speculation, search_query: str, num_results: int = 3) -> Optional[List[Dict[str, str]]]:
+        """
+        Use the speculative search for the optimized query if the two are close enough
+
+        Returns:
+            Optional[List[Dict[str, str]]]: Search results, or None if the speculation was
+            discarded (or failed) and the optimized query should be searched instead
+        """
+        overlap = query_overlap(speculation.query, search_query)
+        if overlap < self.min_overlap:
+            print(f"🎲 Speculative search discarded (query overlap {overlap:.0%})")
+            self.discard(speculation, 'wasted_mismatch')
+            return None
+
+        try:
+            results = await speculation.task
+            if not self.prefetch:
+                results = await aweb_search(speculation.query, num_results, search_results=results)
+        except Exception as e:
+            print(f"⚠️ Speculative search failed: {str(e)}")
+            self.discard(speculation, 'failed')
+            return None
+
+        print(f"🎯 Reusing speculative search results (query overlap {overlap:.0%})")
+        with self._lock:
+            self._stats['hits'] += 1
+        return results
+
+    def discard(self, speculation: Speculation, reason: str = 'wasted_no_search'):
+        """Cancel a speculation whose results will not be used and count the waste"""
+        speculation.task.cancel()
+        with self._lock:
+            self._stats[reason] += 1
+            self._stats['wasted_requests'] += speculation.progress['requests']
+
+    def stats(self) -> dict:
+        """
+        Get speculation counters
+
+        Returns:
+            dict: started, hits, wasted (no search needed / query mismatch), failed, wasted
+            outbound requests and the hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['hit_rate'] = stats['hits'] / stats['started'] if stats['started'] else 0.0
+        return stats
+
+
+_speculator = None
+_speculator_lock = threading.Lock()
+
+
+def get_speculator() -> Optional[SearchSpeculator]:
+    """
+    Get the process-wide search speculator
+
+    Returns:
+        Optional[SearchSpeculator]: The shared speculator, or None unless enabled with SPECULATIVE_SEARCH=true
+    """
+    global _speculator
+    if os.getenv('SPECULATIVE_SEARCH', 'false').lower() != 'true':
+        return None
+    if _speculator is None:
+        with _speculator_lock:
+            if _speculator is None:
+                _speculator = SearchSpeculator()
+    return _speculator
@@ -0,0 +1,93 @@
+"""
+Startup profiling for the chatbot
+Measures where time goes before the first prompt and what is deferred to the first search turn
+"""
+
+import os
+import re
+import sys
+import json
+import subprocess
+
+
+# Runs in a fresh interpreter with -X importtime; each phase is timed in milliseconds
+PROFILE_SCRIPT = """
+import json, time
+phases = {}
+start = time.perf_counter()
+import chat
+phases['import chat'] = time.perf_counter() - start
+
+start = time.perf_counter()
+try:
+    chat.HuggingFaceChatbot(verbose=False)
+    phases['create chatbot'] = time.perf_counter() - start
+except SystemExit:
+    phases['create chatbot'] = None
+
+import websearch
+start = time.perf_counter()
+websearch.load_search_dependencies()
+phases['search dependencies (first search)'] = time.perf_counter() - start
+
+start = time.perf_counter()
+try:
+    chat.run_coroutine(chat.awarm_up_connection())
+    phases['inference client + connection (first LLM call)'] = time.perf_counter() - start
+except Exception:
+    phases['inference client + connection (first LLM call)'] = None
+
+print(json.dumps({name: None if seconds is None else seconds * 1000 for name, seconds in phases.items()}))
+"""
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def parse_import_times(stderr: str) -> list:
+    """
+    Parse -X importtime output
+
+    Returns:
+        list: (module, self_ms, cumulative_ms, depth) tuples in import order
+    """
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us) / 1000, int(cumulative_us) / 1000, len(indent) // 2))
+    return imports
+
+
+def profile_startup(top: int = 15):
+    """
+    Print a startup report: time per startup phase and the slowest top-level imports
+
+    Phases run in a fresh interpreter, so the report reflects a cold start rather
+    than this already-initialized process.
+
+    Args:
+        top (int): Number of imports to list (default: 15)
+    """
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROFILE_SCRIPT],
+        cwd=project_dir, capture_output=True, text=True
+    )
+    imports = parse_import_times(result.stderr)
+    try:
+        phases = json.loads(result.stdout.strip().splitlines()[-1])
+    except (IndexError, json.JSONDecodeError):
+        print(f"❌ Startup profile failed:\n{result.stderr[-2000:]}")
+        return
+
+    print("\n⏱️  Startup profile (cold start):")
+    for name, ms in phases.items():
+        print(f"  {name:<48} {'skipped (no API token)' if ms is None else f'{ms:>8.1f} ms'}")
+
+    # Top-level imports only; their cumulative time includes everything they pulled in
+    top_level = sorted((entry for entry in imports if entry[3] == 0), key=lambda entry: -entry[2])
+    print(f"\n📦 Slowest imports (cumulative, of {len(imports)} modules loaded):")
+    for module, self_ms, cumulative_ms, _ in top_level[:top]:
+        print(f"  {module:<48} {cumulative_ms:>8.1f} ms")
+    print()
@@ -0,0 +1,16 @@
+import os
+
+
+def get_data_dir() -> str:
+    """
+    Get the directory where Friday keeps persistent local data (caches, learned models)
+    
+    Uses FRIDAY_DATA_DIR from .env, defaulting to ~/.cache/friday. The directory is
+    created if it does not exist.
+    
+    Returns:
+        str: Absolute path of the data directory
+    """
+    data_dir = os.path.abspath(os.path.expanduser(os.getenv('FRIDAY_DATA_DIR', '~/.cache/friday')))
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
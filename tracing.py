@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import asyncio
+import uuid
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is unbounded
+BUCKET_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """
+    One timed operation in a trace
+
+    Spans started with span() become the parent of spans started inside them (also
+    across awaits and asyncio tasks). Generators must use start_span()/end() instead,
+    since their steps can run in different contexts.
+    """
+
+    def __init__(self, tracer: "Tracer", name: str, parent: "Span" = None, attributes: dict = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, **attributes):
+        """Add or update span attributes"""
+        self.attributes.update(attributes)
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the span started"""
+        return (time.perf_counter() - self._start) * 1000
+
+    def end(self, error: Exception = None):
+        """Finish the span and hand it to the tracer (only the first call counts)"""
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = self.elapsed_ms()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer.record(self)
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_time': self.start_time,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+    def to_otlp(self) -> dict:
+        """The span as an OpenTelemetry (OTLP/JSON) span"""
+        def value(v):
+            if isinstance(v, bool):
+                return {'boolValue': v}
+            if isinstance(v, int):
+                return {'intValue': str(v)}
+            if isinstance(v, float):
+                return {'doubleValue': v}
+            return {'stringValue': str(v)}
+
+        start_ns = int(self.start_time * 1e9)
+        otlp = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(start_ns),
+            'endTimeUnixNano': str(start_ns + int(self.duration_ms * 1e6)),
+            'attributes': [{'key': k, 'value': value(v)} for k, v in self.attributes.items() if v is not None],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1}
+        }
+        if self.parent_id:
+            otlp['parentSpanId'] = self.parent_id
+        return otlp
+
+
+class Histogram:
+    """Latency histogram with fixed buckets plus count, sum, min and max"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.errors = 0
+
+    def add(self, duration_ms: float, error: bool = False):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, duration_ms)] += 1
+        self.count += 1
+        self.total += duration_ms
+        self.min = duration_ms if self.min is None else min(self.min, duration_ms)
+        self.max = duration_ms if self.max is None else max(self.max, duration_ms)
+        if error:
+            self.errors += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate a percentile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            if count and seen + count >= target:
+                lower = BUCKET_BOUNDS_MS[i - 1] if i > 0 else 0.0
+                upper = BUCKET_BOUNDS_MS[i] if i < len(BUCKET_BOUNDS_MS) else self.max
+                estimate = lower + (upper - lower) * (target - seen) / count
+                return min(max(estimate, self.min), self.max)
+            seen += count
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max or 0.0
+        }
+
+
+class Tracer:
+    """
+    Collects spans into per-name latency histograms and optionally exports them
+
+    LLM spans also add up input/output tokens per model, and fetch spans add up
+    downloaded bytes.
+
+    Configuration (environment variables):
+        TRACING: Record spans (true/false, default: true)
+        TRACE_EXPORT: Append every finished span to this file
+        TRACE_FORMAT: jsonl (one span per line) or otlp (one OTLP/JSON export request
+            per line, as written by the OpenTelemetry collector file exporter) (default: jsonl)
+    """
+
+    def __init__(self, enabled: bool = None, export_path: str = None, export_format: str = None):
+        self.enabled = enabled if enabled is not None else os.getenv('TRACING', 'true').lower() == 'true'
+        self.export_path = export_path or os.getenv('TRACE_EXPORT') or None
+        self.export_format = (export_format or os.getenv('TRACE_FORMAT', 'jsonl')).lower()
+
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._tokens = {}
+        self._fetched_bytes = 0
+        self._export_file = None
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """Start a span without making it the current span; call end() when done"""
+        return Span(self, name, parent if parent is not None else _current_span.get(), attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block as a child of the current span, making it current inside the block"""
+        if not self.enabled:
+            yield Span(self, name, None, attributes)
+            return
+
+        current = self.start_span(name, **attributes)
+        token = _current_span.set(current)
+        try:
+            yield current
+        except asyncio.CancelledError:
+            # Cancelled work (e.g. a straggler fetch) was not needed; it did not fail
+            current.set(cancelled=True)
+            raise
+        except BaseException as e:
+            current.end(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            current.end()
+
+    def record(self, span: Span):
+        """Aggregate a finished span and export it"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._histograms.setdefault(span.name, Histogram()).add(span.duration_ms, span.error is not None)
+            if 'model' in span.attributes and 'output_tokens' in span.attributes:
+                tokens = self._tokens.setdefault(span.attributes['model'], {'calls': 0, 'input_tokens': 0, 'output_tokens': 0})
+                tokens['calls'] += 1
+                tokens['input_tokens'] += span.attributes.get('input_tokens') or 0
+                tokens['output_tokens'] += span.attributes.get('output_tokens') or 0
+            self._fetched_bytes += span.attributes.get('bytes') or 0
+            if self.export_path:
+                self._export(span)
+
+    def _export(self, span: Span):
+        if self._export_file is None:
+            self._export_file = open(self.export_path, 'a', encoding='utf-8')
+        if self.export_format == 'otlp':
+            record = {'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': 'friday'}}]},
+                'scopeSpans': [{'scope': {'name': 'friday'}, 'spans': [span.to_otlp()]}]
+            }]}
+        else:
+            record = span.to_dict()
+        self._export_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._export_file.flush()
+
+    def summary(self, name: str) -> Optional[dict]:
+        """Latency summary of one span name (see Histogram.summary), or None if none was recorded"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            return histogram.summary() if histogram else None
+
+    def stats(self) -> dict:
+        """
+        Get aggregated span statistics
+
+        Returns:
+            dict: 'spans' (name -> count, errors, mean/p50/p95/max ms), 'tokens'
+            (model -> calls, input/output tokens) and 'fetched_bytes'
+        """
+        with self._lock:
+            return {
+                'spans': {name: histogram.summary() for name, histogram in sorted(self._histograms.items())},
+                'tokens': {model: dict(tokens) for model, tokens in self._tokens.items()},
+                'fetched_bytes': self._fetched_bytes
+            }
+
+    def reset(self):
+        """Clear aggregated statistics"""
+        with self._lock:
+            self._histograms = {}
+            self._tokens = {}
+            self._fetched_bytes = 0
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """Time a block as a span of the process-wide tracer (see Tracer.span)"""
+    return get_tracer().span(name, **attributes)
+
+
+def start_span(name: str, parent: Optional[Span] = None, **attributes) -> Span:
+    """Start a span of the process-wide tracer without making it current (see Tracer.start_span)"""
+    return get_tracer().start_span(name, parent, **attributes)
+
+
+async def aiter_with_span(iterator, current: Span):
+    """
+    Iterate an async iterator with a span current during each step
+
+    Lets spans started inside an async generator nest under a span of its consumer,
+    even when each step runs in a different task.
+    """
+    try:
+        while True:
+            with use_span(current):
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield item
+    finally:
+        await iterator.aclose()
+
+
+@contextmanager
+def use_span(current: Span):
+    """Make a span started with start_span() the current span inside a block"""
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
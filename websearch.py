@@ -1,106 +1,704 @@
-import requests
-from bs4 import BeautifulSoup
-from ddgs import DDGS
-from typing import List, Dict
+import os
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager, asynccontextmanager
+from typing import List, Dict, AsyncIterator, Union
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import math
 import time
+import contextvars
 
+from search_cache import get_search_cache, normalize_query, classify_query_ttl
+from page_cache import get_page_cache
+from tracing import span, start_span, use_span
+from resilience import parse_retry_after
+from scheduler import get_scheduler, host_upstream, SEARCH_UPSTREAM
 
-def web_search(query: str, num_results: int = 5) -> List[Dict[str, str]]:
+# The search client, HTTP libraries and HTML parsers are imported on the first search
+# (or by load_search_dependencies) so sessions that never search start faster.
+# Benchmarks replace DDGS with a fake provider.
+DDGS = None
+
+
+def _import_httpx():
+    try:
+        import httpx2 as httpx
+    except ImportError:
+        import httpx
+    return httpx
+
+
+def load_search_dependencies():
+    """Import the search client, HTTP libraries and HTML parsers ahead of the first search"""
+    global DDGS
+    import requests
+    import extractor
+    _import_httpx()
+    if DDGS is None:
+        from ddgs import DDGS
+
+
+# Set headers to mimic a real browser
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class HostThrottle:
+    """
+    Per-host politeness for page fetches
+
+    Caps how many requests to one host may be in flight at once, and spaces out
+    requests to the same host with the request scheduler's per-host rate limit, so
+    different sites can be fetched in parallel without hammering any single one.
+
+    Configuration (environment variables):
+        SEARCH_HOST_MIN_INTERVAL: Minimum seconds between requests to one host (default: 1.0, see RateScheduler)
+        SEARCH_HOST_CONCURRENCY: Maximum concurrent requests to one host (default: 2)
+    """
+
+    def __init__(self, max_per_host: int = None):
+        self.max_per_host = max_per_host or int(os.getenv('SEARCH_HOST_CONCURRENCY', 2))
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._async_semaphores = weakref.WeakKeyDictionary()
+
+    @contextmanager
+    def slot(self, url: str):
+        """Wait until a request to the URL's host is allowed, and hold a slot while it runs"""
+        upstream = host_upstream(url)
+        with self._lock:
+            semaphore = self._semaphores.setdefault(upstream, threading.BoundedSemaphore(self.max_per_host))
+        
+        with semaphore:
+            get_scheduler().acquire(upstream)
+            yield
+
+    @asynccontextmanager
+    async def async_slot(self, url: str):
+        """Async version of slot() for the running event loop"""
+        upstream = host_upstream(url)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._async_semaphores.setdefault(loop, {})
+            semaphore = semaphores.setdefault(upstream, asyncio.Semaphore(self.max_per_host))
+        
+        async with semaphore:
+            await get_scheduler().aacquire(upstream)
+            yield
+
+
+# Shared across searches so politeness also holds between consecutive turns
+_host_throttle = HostThrottle()
+
+
+def web_search(query: str, num_results: int = 5, concurrent: bool = None, time_budget: float = None) -> List[Dict[str, str]]:
     """
     Performs a web search using DuckDuckGo and returns cleaned content from the websites.
     
     Args:
         query (str): The search query
         num_results (int): Number of search results to return (default: 5)
+        concurrent (bool, optional): Fetch pages in parallel. If None, uses SEARCH_CONCURRENT from .env (default: true)
+        time_budget (float, optional): Wall-clock seconds for the whole search. If None, uses SEARCH_TIME_BUDGET from .env (default: 15)
     
     Returns:
         List[Dict[str, str]]: A list of dictionaries containing 'url' and 'content' keys
     """
+    if concurrent is None:
+        concurrent = os.getenv('SEARCH_CONCURRENT', 'true').lower() == 'true'
+    if time_budget is None:
+        time_budget = float(os.getenv('SEARCH_TIME_BUDGET', 15))
+    deadline = time.monotonic() + time_budget
+    
     results = []
     
-    try:
-        # Initialize DuckDuckGo search
-        with DDGS() as ddgs:
-            # Get search results
-            search_results = list(ddgs.text(query, max_results=num_results))
+    with span('web_search', query=query, concurrent=concurrent) as search_span:
+        try:
+            search_results = get_search_hits(query, num_results)
             
-            print(f"Found {len(search_results)} search results for: '{query}'")
+            if concurrent:
+                pages = _fetch_concurrently(search_results, deadline)
+            else:
+                pages = _fetch_sequentially(search_results, deadline)
             
-            # Process each search result
-            for i, result in enumerate(search_results, 1):
-                url = result.get('href', '')
-                title = result.get('title', '')
-                
-                print(f"Processing {i}/{len(search_results)}: {title}")
+            results = _build_results(search_results, pages)
+                    
+        except Exception as e:
+            print(f"Error during search: {str(e)}")
+            search_span.set(error=str(e))
+        search_span.set(results=len(results))
+    
+    return results
+
+
+async def aweb_search(query: str, num_results: int = 5, time_budget: float = None, search_results: list = None) -> List[Dict[str, str]]:
+    """
+    Async version of web_search
+    
+    The DuckDuckGo lookup runs in a worker thread; pages are fetched concurrently on an
+    async HTTP client, and fetches still running when the time budget ends are cancelled.
+    
+    Args:
+        query (str): The search query
+        num_results (int): Number of search results to return (default: 5)
+        time_budget (float, optional): Wall-clock seconds for the whole search. If None, uses SEARCH_TIME_BUDGET from .env (default: 15)
+        search_results (list, optional): Hits already looked up for this query; only their pages are fetched
+    
+    Returns:
+        List[Dict[str, str]]: A list of dictionaries containing 'url' and 'content' keys
+    """
+    if time_budget is None:
+        time_budget = float(os.getenv('SEARCH_TIME_BUDGET', 15))
+    deadline = time.monotonic() + time_budget
+    
+    results = []
+    
+    with span('web_search', query=query, concurrent=True) as search_span:
+        try:
+            if search_results is None:
+                search_results = await asyncio.to_thread(get_search_hits, query, num_results)
+            
+            workers = asyncio.Semaphore(int(os.getenv('SEARCH_MAX_WORKERS', 4)))
+            async with _import_httpx().AsyncClient(headers=BROWSER_HEADERS, follow_redirects=True) as client:
+                tasks = []
+                for i, result in enumerate(search_results, 1):
+                    print(f"Processing {i}/{len(search_results)}: {result.get('title', '')}")
+                    tasks.append(asyncio.create_task(_afetch_page(client, workers, result.get('href', ''), deadline)))
                 
-                # Get and clean content from the URL
-                content = get_cleaned_content(url)
+                done, not_done = await asyncio.wait(tasks, timeout=max(0, deadline - time.monotonic())) if tasks else (set(), set())
+                if not_done:
+                    print(f"  Search time budget exhausted, dropping {len(not_done)} slow result(s)")
+                    search_span.set(dropped=len(not_done))
+                    for task in not_done:
+                        task.cancel()
+                    await asyncio.gather(*not_done, return_exceptions=True)
+            
+            pages = [task.result() if task in done else "" for task in tasks]
+            results = _build_results(search_results, pages)
+            
+        except Exception as e:
+            print(f"Error during search: {str(e)}")
+            search_span.set(error=str(e))
+        search_span.set(results=len(results))
+    
+    return results
+
+
+def hit_budget(num_results: int, overfetch: float = None) -> int:
+    """
+    Hits aiter_web_search requests (per query) to find num_results good pages
+    
+    Args:
+        num_results (int): Number of good pages wanted
+        overfetch (float, optional): Hits requested per wanted page. If None, uses SEARCH_OVERFETCH from .env (default: 2)
+    
+    Returns:
+        int: Number of hits
+    """
+    if overfetch is None:
+        overfetch = float(os.getenv('SEARCH_OVERFETCH', 2))
+    return max(num_results, math.ceil(num_results * overfetch))
+
+
+async def aiter_web_search(query: Union[str, List[str]], num_results: int = 3, time_budget: float = None,
+                           search_results: list = None, overfetch: float = None, dedup=None) -> AsyncIterator[Dict[str, str]]:
+    """
+    Pipelined form of aweb_search that yields each result as soon as its page is ready
+    
+    More hits than needed are requested and fetched concurrently. Pages are yielded
+    in the order they finish, skipping pages that fail the content-quality check,
+    and once num_results good pages have been yielded the remaining fetches are
+    cancelled, so the slowest sources no longer set the search latency.
+    
+    Several queries are looked up concurrently and their hits merged with
+    reciprocal-rank fusion, fetching each page (by normalized URL) only once within
+    one shared fetch and time budget. The search keeps going past num_results
+    until every query has a good page, as long as one of its hits is still pending.
+    
+    To stop early, iterate inside contextlib.aclosing: closing the iterator cancels
+    the fetches still running, while merely breaking out of the loop leaves them
+    running until the generator is garbage collected.
+    
+    Args:
+        query (str or List[str]): The search query, or several queries for one question
+        num_results (int): Number of good pages wanted (default: 3)
+        time_budget (float, optional): Wall-clock seconds for the whole search. If None, uses SEARCH_TIME_BUDGET from .env (default: 15)
+        search_results (list, optional): Hits already looked up for this query; only their pages are fetched
+        overfetch (float, optional): Hits requested per wanted page. If None, uses SEARCH_OVERFETCH from .env (default: 2)
+        dedup (DedupTurn, optional): Strips boilerplate and passages already seen this turn from each
+            good page; a page with nothing new left does not count as a result
+    
+    Yields:
+        Dict[str, str]: Results with 'url', 'title' and 'content' keys
+    """
+    if time_budget is None:
+        time_budget = float(os.getenv('SEARCH_TIME_BUDGET', 15))
+    deadline = time.monotonic() + time_budget
+    queries = [query] if isinstance(query, str) else list(query)
+    fetch_budget = hit_budget(num_results, overfetch)
+    
+    search_span = start_span('web_search', query=" | ".join(queries), queries=len(queries), pipelined=True)
+    yielded = 0
+    covered = set()
+    error = None
+    try:
+        with use_span(search_span):
+            if search_results is None:
+                hit_lists = await asyncio.gather(*(asyncio.to_thread(get_search_hits, q, fetch_budget) for q in queries))
+                search_results = fuse_hits(hit_lists, limit=fetch_budget)
+                search_span.set(query_hits=sum(len(hits) for hits in hit_lists))
+        
+        def queries_of(index: int) -> set:
+            return set(search_results[index - 1].get('queries', [0]))
+        
+        workers = asyncio.Semaphore(int(os.getenv('SEARCH_MAX_WORKERS', 4)))
+        async with _import_httpx().AsyncClient(headers=BROWSER_HEADERS, follow_redirects=True) as client:
+            tasks = {}
+            try:
+                # Started under the search span so fetch spans nest under it
+                with use_span(search_span):
+                    for i, result in enumerate(search_results, 1):
+                        print(f"Processing {i}/{len(search_results)}: {result.get('title', '')}")
+                        tasks[asyncio.create_task(_afetch_page(client, workers, result.get('href', ''), deadline))] = i
                 
-                if content:
-                    results.append({
-                        'url': url,
-                        'title': title,
-                        'content': content
-                    })
-                else:
-                    print(f"  Failed to retrieve content from: {url}")
+                def satisfied() -> bool:
+                    # Enough pages, and no query without a page still has a hit in flight
+                    return yielded >= num_results and all(queries_of(tasks[task]) <= covered for task in pending)
                 
-                # Add a small delay to be respectful to websites
-                time.sleep(1)
+                pending = set(tasks)
+                while pending and not satisfied():
+                    done, pending = await asyncio.wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                                       return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        print(f"  Search time budget exhausted, dropping {len(pending)} slow result(s)")
+                        break
+                    
+                    # Pages finishing together are taken in ranking order
+                    for task in sorted(done, key=tasks.get):
+                        result = search_results[tasks[task] - 1]
+                        content = task.result() if not task.exception() else ""
+                        if not is_good_page(content):
+                            print(f"  Skipping low-quality page: {result.get('href', '')}")
+                            continue
+                        if dedup is not None:
+                            content = dedup.clean(result.get('href', ''), content)
+                            if not content:
+                                print(f"  Skipping page with nothing new: {result.get('href', '')}")
+                                continue
+                        # Past num_results, only pages for queries without one are wanted
+                        if yielded >= num_results and queries_of(tasks[task]) <= covered:
+                            continue
+                        yielded += 1
+                        covered |= queries_of(tasks[task])
+                        yield _build_results([result], [content])[0]
+                        if satisfied():
+                            break
                 
+                search_span.set(cancelled=len(pending))
+            finally:
+                # Stragglers are not needed once enough good pages are in
+                stragglers = [task for task in tasks if not task.done()]
+                for task in stragglers:
+                    task.cancel()
+                await asyncio.gather(*stragglers, return_exceptions=True)
+    
     except Exception as e:
         print(f"Error during search: {str(e)}")
+        error = e
+    finally:
+        search_span.set(results=yielded, hits=len(search_results or []))
+        search_span.end(error)
+
+
+# Query parameters that only track the visitor and never change the page
+_TRACKING_PARAM_PREFIXES = ('utm_',)
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'msclkid', 'ref', 'ref_src', 'mc_cid', 'mc_eid'}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for deduplication
     
-    return results
+    Lowercases the scheme and host, drops "www.", default ports, fragments,
+    tracking parameters and trailing slashes, and sorts the query string.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    params = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                    if not key.lower().startswith(_TRACKING_PARAM_PREFIXES) and key.lower() not in _TRACKING_PARAMS)
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https' if parts.scheme in ('http', 'https') else parts.scheme, host, path, urlencode(params), ''))
 
 
-def get_cleaned_content(url: str) -> str:
+def fuse_hits(hit_lists: List[List[Dict[str, str]]], limit: int = None, k: int = 60) -> List[Dict[str, str]]:
     """
-    Retrieves and cleans content from a given URL using BeautifulSoup.
+    Merge the hits of several queries with reciprocal-rank fusion
+    
+    A page's score is the sum of 1 / (k + rank) over the queries that returned it,
+    so pages found by several queries, or ranked high by one, come first. Hits are
+    deduplicated by normalized URL.
     
     Args:
-        url (str): The URL to fetch content from
+        hit_lists (List[List[Dict]]): Hits of each query, best first
+        limit (int, optional): Maximum number of fused hits
+        k (int): Rank damping constant (default: 60)
     
     Returns:
-        str: Cleaned text content from the webpage
+        List[Dict]: Copies of the hits, best first, each with a 'queries' list of
+        the indices of the queries that returned it
     """
-    try:
-        # Set headers to mimic a real browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Make request with timeout
-        response = requests.get(url, headers=headers, timeout=10)
+    fused = {}
+    for query_index, hits in enumerate(hit_lists):
+        for rank, hit in enumerate(hits, 1):
+            key = normalize_url(hit.get('href', ''))
+            entry = fused.setdefault(key, {'hit': hit, 'score': 0.0, 'queries': [], 'order': len(fused)})
+            entry['score'] += 1 / (k + rank)
+            if query_index not in entry['queries']:
+                entry['queries'].append(query_index)
+    
+    ranked = sorted(fused.values(), key=lambda entry: (-entry['score'], entry['order']))
+    return [dict(entry['hit'], queries=entry['queries']) for entry in ranked[:limit]]
+
+
+def is_good_page(content: str, min_chars: int = None) -> bool:
+    """
+    Check that extracted page text looks like real content
+    
+    Rejects empty and very short pages, and short pages that are bot checks or
+    cookie/JavaScript walls rather than articles.
+    
+    Args:
+        content (str): Extracted page text
+        min_chars (int, optional): Minimum length. If None, uses SEARCH_MIN_PAGE_CHARS from .env (default: 300)
+    """
+    min_chars = min_chars if min_chars is not None else int(os.getenv('SEARCH_MIN_PAGE_CHARS', 300))
+    if not content or len(content) < min_chars:
+        return False
+    if len(content) < 2000:
+        lowered = content.lower()
+        return not any(marker in lowered for marker in _BLOCKED_PAGE_MARKERS)
+    return True
+
+
+# Phrases of interstitial pages served instead of the article
+_BLOCKED_PAGE_MARKERS = (
+    'enable javascript', 'access denied', 'verify you are human', 'are you a robot',
+    'captcha', 'accept cookies to continue', 'checking your browser',
+)
+
+
+def get_search_hits(query: str, num_results: int = 5) -> List[Dict[str, str]]:
+    """
+    Get search hits for a query, using the search cache when possible
+    
+    Args:
+        query (str): The search query
+        num_results (int): Number of hits to request (default: 5)
+    
+    Returns:
+        List[Dict[str, str]]: Search results with 'href', 'title' and 'body' keys
+    """
+    # Hits are cached for as long as answers to this kind of query stay fresh
+    cache = get_search_cache()
+    cache_key = f"{num_results}:{normalize_query(query)}"
+    
+    with span('search_hits', query=query) as hits_span:
+        search_results = cache.get('hits', cache_key) if cache else None
+        hits_span.set(cached=search_results is not None)
+        if search_results is None:
+            search_results = _query_search_backend(query, num_results)
+            if cache and search_results:
+                cache.set('hits', cache_key, search_results, classify_query_ttl(query))
+        else:
+            print("  Using cached search results")
+        hits_span.set(hits=len(search_results))
+    
+    print(f"Found {len(search_results)} search results for: '{query}'")
+    return search_results
+
+
+def _query_search_backend(query: str, num_results: int) -> List[Dict[str, str]]:
+    """
+    Run a query against the search backend
+    
+    Uses DuckDuckGo unless SEARCH_BACKEND_URL points at an HTTP endpoint that takes
+    'q' and 'max_results' query parameters and returns a JSON list of hits with the
+    same 'href', 'title' and 'body' keys (e.g. a mock backend for end-to-end tests).
+    """
+    get_scheduler().acquire(SEARCH_UPSTREAM)
+    backend_url = os.getenv('SEARCH_BACKEND_URL')
+    if backend_url:
+        import requests
+        response = requests.get(backend_url, params={'q': query, 'max_results': num_results}, timeout=10)
+        if response.status_code == 429:
+            get_scheduler().throttled(SEARCH_UPSTREAM, parse_retry_after(response.headers.get('Retry-After')))
         response.raise_for_status()
+        return list(response.json())[:num_results]
+    
+    # Initialize DuckDuckGo search
+    load_search_dependencies()
+    try:
+        with DDGS() as ddgs:
+            # Get search results
+            return list(ddgs.text(query, max_results=num_results))
+    except Exception as e:
+        # DuckDuckGo signals rate limiting with its own exception type rather than a status
+        if 'ratelimit' in type(e).__name__.lower():
+            get_scheduler().throttled(SEARCH_UPSTREAM)
+        raise
+
+
+def snippet_results(search_results: list) -> List[Dict[str, str]]:
+    """
+    Use the search engine's own snippets as results, without fetching any page
+    
+    Much faster than web_search but far less content; for turns short on time.
+    
+    Returns:
+        List[Dict[str, str]]: Results with 'url', 'title' and 'content' (the snippet) keys
+    """
+    return [{'url': result.get('href', ''), 'title': result.get('title', ''), 'content': result.get('body', '')}
+            for result in search_results if result.get('body')]
+
+
+def _build_results(search_results: list, pages: List[str]) -> List[Dict[str, str]]:
+    """Pair hits with their fetched content, keeping the search engine's ranking order"""
+    results = []
+    for result, content in zip(search_results, pages):
+        url = result.get('href', '')
+        if content:
+            results.append({
+                'url': url,
+                'title': result.get('title', ''),
+                'content': content
+            })
+        else:
+            print(f"  Failed to retrieve content from: {url}")
+    return results
+
+
+def _fetch_page(url: str, deadline: float) -> str:
+    """Fetch one page under the host throttle, giving up if the search deadline has passed"""
+    with _host_throttle.slot(url):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return ""
+        return get_cleaned_content(url, timeout=min(10, remaining))
+
+
+async def _afetch_page(client, workers: asyncio.Semaphore, url: str, deadline: float) -> str:
+    """Async version of _fetch_page, bounded by the shared worker semaphore"""
+    async with workers, _host_throttle.async_slot(url):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return ""
+        return await aget_cleaned_content(client, url, timeout=min(10, remaining))
+
+
+def _fetch_sequentially(search_results: list, deadline: float) -> List[str]:
+    """Fetch pages one after another until the deadline"""
+    pages = []
+    for i, result in enumerate(search_results, 1):
+        print(f"Processing {i}/{len(search_results)}: {result.get('title', '')}")
+        if time.monotonic() >= deadline:
+            print("  Search time budget exhausted, skipping remaining results")
+            pages.extend([""] * (len(search_results) - len(pages)))
+            break
+        pages.append(_fetch_page(result.get('href', ''), deadline))
+    return pages
+
+
+def _fetch_concurrently(search_results: list, deadline: float) -> List[str]:
+    """Fetch pages on a bounded worker pool; pages not done by the deadline are dropped"""
+    if not search_results:
+        return []
+    
+    max_workers = min(int(os.getenv('SEARCH_MAX_WORKERS', 4)), len(search_results))
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='websearch')
+    try:
+        futures = []
+        for i, result in enumerate(search_results, 1):
+            print(f"Processing {i}/{len(search_results)}: {result.get('title', '')}")
+            # Run in a copy of this context so fetch spans nest under the search span
+            futures.append(executor.submit(contextvars.copy_context().run, _fetch_page, result.get('href', ''), deadline))
         
-        # Parse HTML content
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "header", "footer", "aside"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text()
-        
-        # Clean up the text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        # Limit content length (optional - adjust as needed)
-        if len(text) > 5000:
-            text = text[:5000] + "..."
-        
-        return text
+        done, not_done = wait(futures, timeout=max(0, deadline - time.monotonic()))
+        if not_done:
+            print(f"  Search time budget exhausted, dropping {len(not_done)} slow result(s)")
         
-    except requests.exceptions.RequestException as e:
-        print(f"  Request error for {url}: {str(e)}")
-        return ""
-    except Exception as e:
-        print(f"  Error processing {url}: {str(e)}")
-        return ""
+        return [future.result() if future in done else "" for future in futures]
+    finally:
+        # Don't block the turn on stragglers; they finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _MeteredChunks:
+    """Iterates response chunks, counting the bytes received and the time spent waiting for them"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.bytes = 0
+        self.wait = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            chunk = next(self.chunks)
+        finally:
+            self.wait += time.perf_counter() - start
+        self.bytes += len(chunk)
+        return chunk
+
+
+def get_cleaned_content(url: str, timeout: float = 10) -> str:
+    """
+    Retrieves and cleans content from a given URL.
+    
+    The response is streamed into an incremental HTML text extractor that skips
+    scripts, styles and page chrome and stops reading once the character budget
+    (PAGE_CHAR_BUDGET) or download limit (PAGE_MAX_DOWNLOAD_BYTES) is reached.
+    Set HTML_EXTRACTOR=soup to use the full BeautifulSoup parse instead.
+    
+    Pages seen before are revalidated with If-None-Match / If-Modified-Since, and a
+    304 response returns the previously extracted text without re-parsing.
+    
+    Args:
+        url (str): The URL to fetch content from
+        timeout (float): Request timeout in seconds (default: 10)
+    
+    Returns:
+        str: Cleaned text content from the webpage
+    """
+    import requests
+    from extractor import extract_text_streaming, extract_text_soup
+    
+    with span('fetch', url=url) as fetch_span:
+        try:
+            headers = dict(BROWSER_HEADERS)
+            
+            # Revalidate a previously extracted copy instead of downloading it again
+            page_cache = get_page_cache()
+            cached = page_cache.lookup(url) if page_cache else None
+            if cached:
+                headers.update(page_cache.conditional_headers(cached))
+            
+            # Make request with timeout, reading the body only as far as needed
+            with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                fetch_span.set(status=response.status_code)
+                if response.status_code == 304 and cached:
+                    page_cache.mark_revalidated(url)
+                    return cached['text']
+                if response.status_code == 429:
+                    get_scheduler().throttled(host_upstream(url), parse_retry_after(response.headers.get('Retry-After')))
+                response.raise_for_status()
+                
+                if os.getenv('HTML_EXTRACTOR', 'streaming').lower() == 'soup':
+                    content = response.content
+                    start = time.perf_counter()
+                    text = extract_text_soup(content)
+                    fetch_span.set(bytes=len(content), parse_ms=round((time.perf_counter() - start) * 1000, 2))
+                else:
+                    # Only trust the charset if the server declared one
+                    declared = 'charset' in response.headers.get('Content-Type', '').lower()
+                    chunks = _MeteredChunks(response.iter_content(chunk_size=16384))
+                    start = time.perf_counter()
+                    text = extract_text_streaming(chunks, encoding=response.encoding if declared else None)
+                    parse_seconds = time.perf_counter() - start - chunks.wait
+                    fetch_span.set(bytes=chunks.bytes, parse_ms=round(parse_seconds * 1000, 2))
+            
+            if page_cache:
+                page_cache.store(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), text)
+            
+            return text
+            
+        except requests.exceptions.RequestException as e:
+            print(f"  Request error for {url}: {str(e)}")
+            fetch_span.set(error=str(e))
+            return ""
+        except Exception as e:
+            print(f"  Error processing {url}: {str(e)}")
+            fetch_span.set(error=str(e))
+            return ""
+
+
+async def aget_cleaned_content(client, url: str, timeout: float = 10) -> str:
+    """
+    Async version of get_cleaned_content
+    
+    Args:
+        client: Async HTTP client (httpx.AsyncClient) to fetch with
+        url (str): The URL to fetch content from
+        timeout (float): Request timeout in seconds (default: 10)
+    
+    Returns:
+        str: Cleaned text content from the webpage
+    """
+    httpx = _import_httpx()
+    from extractor import extract_text_soup, StreamingExtractor
+    
+    with span('fetch', url=url) as fetch_span:
+        try:
+            headers = {}
+            
+            # Revalidate a previously extracted copy instead of downloading it again
+            page_cache = get_page_cache()
+            cached = page_cache.lookup(url) if page_cache else None
+            if cached:
+                headers.update(page_cache.conditional_headers(cached))
+            
+            async with client.stream('GET', url, headers=headers, timeout=timeout) as response:
+                fetch_span.set(status=response.status_code)
+                if response.status_code == 304 and cached:
+                    page_cache.mark_revalidated(url)
+                    return cached['text']
+                if response.status_code == 429:
+                    get_scheduler().throttled(host_upstream(url), parse_retry_after(response.headers.get('Retry-After')))
+                response.raise_for_status()
+                
+                if os.getenv('HTML_EXTRACTOR', 'streaming').lower() == 'soup':
+                    content = await response.aread()
+                    start = time.perf_counter()
+                    text = extract_text_soup(content)
+                    fetch_span.set(bytes=len(content), parse_ms=round((time.perf_counter() - start) * 1000, 2))
+                else:
+                    extractor = StreamingExtractor(encoding=response.charset_encoding)
+                    received = 0
+                    parse_seconds = 0.0
+                    async for chunk in response.aiter_bytes(16384):
+                        received += len(chunk)
+                        start = time.perf_counter()
+                        done = extractor.feed(chunk)
+                        parse_seconds += time.perf_counter() - start
+                        if done:
+                            break
+                    start = time.perf_counter()
+                    text = extractor.finish()
+                    parse_seconds += time.perf_counter() - start
+                    fetch_span.set(bytes=received, parse_ms=round(parse_seconds * 1000, 2))
+            
+            if page_cache:
+                page_cache.store(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), text)
+            
+            return text
+            
+        except httpx.HTTPError as e:
+            print(f"  Request error for {url}: {str(e)}")
+            fetch_span.set(error=str(e))
+            return ""
+        except Exception as e:
+            print(f"  Error processing {url}: {str(e)}")
+            fetch_span.set(error=str(e))
+            return ""
 
 
 # Example usage